@@ -116,16 +116,11 @@ const useFileUpload = ({ parent_id }: UseFileUploadProps) => {
     }
 
     async function uploadOne(chunk: { index: number; blob: Blob }) {
-      const formData = new FormData();
-      formData.append("upload_id", uploadId);
-      formData.append("chunk_index", String(chunk.index));
-      formData.append("chunk_size", String(chunk.blob.size));
-      formData.append("file", chunk.blob);
-
       for (let attempt = 0; attempt < MAX_RETRIES; attempt++) {
         if (abortRef.current) return;
         try {
-          await apiService.uploadChunk(formData);
+          // Raw body — streamed straight into storage, no multipart parsing
+          await apiService.putChunk(uploadId, chunk.index, chunk.blob);
           return;
         } catch (err) {
           if (attempt === MAX_RETRIES - 1) throw err;
@@ -208,7 +203,7 @@ const useFileUpload = ({ parent_id }: UseFileUploadProps) => {
       // 2. Init — server decides chunk_size & total_chunks
       setUploadStage("initializing");
       setStatusMessage("Initialising upload…");
-      const { upload_id, chunk_size, total_chunks } = await apiService.uploadInit({
+      const { upload_id, chunk_size, total_chunks, status } = await apiService.uploadInit({
         file_name: selectedFile.name,
         file_size: selectedFile.size,
         mime_type: selectedFile.type || "application/octet-stream",
@@ -216,24 +211,27 @@ const useFileUpload = ({ parent_id }: UseFileUploadProps) => {
         parent_id: parent_id,
       });
 
-      // 3. Upload chunks
-      setUploadStage("uploading");
-      setProgress(0);
-      await uploadChunks(selectedFile, upload_id, total_chunks, chunk_size);
-
-      if (abortRef.current) return;
+      // Content already stored — the server completed the upload instantly
+      if (status !== "completed" && upload_id) {
+        // 3. Upload chunks
+        setUploadStage("uploading");
+        setProgress(0);
+        await uploadChunks(selectedFile, upload_id, total_chunks, chunk_size);
 
-      // 4. Complete
-      setUploadStage("completing");
-      setProgress(100);
-      setStatusMessage("Finalising upload…");
-      await apiService.uploadComplete(upload_id);
+        if (abortRef.current) return;
 
-      // 5. Stream background processing progress via SSE
-      setUploadStage("processing");
-      setProgress(0);
-      setStatusMessage("Processing file…");
-      await listenProgress(upload_id);
+        // 4. Complete
+        setUploadStage("completing");
+        setProgress(100);
+        setStatusMessage("Finalising upload…");
+        await apiService.uploadComplete(upload_id);
+
+        // 5. Stream background processing progress via SSE
+        setUploadStage("processing");
+        setProgress(0);
+        setStatusMessage("Processing file…");
+        await listenProgress(upload_id);
+      }
 
       // 6. Done
       setUploadStage("success");
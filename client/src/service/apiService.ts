@@ -270,6 +270,24 @@ class APIService {
     }
   };
 
+  putChunk = async (uploadId: string, chunkIndex: number, blob: Blob) => {
+    try {
+      const response = await axiosInstance.put(
+        ENDPOINTS.PUT_CHUNK(uploadId, chunkIndex),
+        blob,
+        {
+          headers: {
+            "Content-Type": "application/octet-stream",
+          },
+        },
+      );
+      return response.data;
+    } catch (error) {
+      const err = handleApiError(error);
+      throw new Error(err.message);
+    }
+  };
+
   uploadInit = async (data: {
     file_name: string;
     file_size: number;
@@ -280,11 +298,12 @@ class APIService {
     try {
       const response = await axiosInstance.post(ENDPOINTS.UPLOAD_INIT, data);
       return response.data as {
-        upload_id: string;
+        upload_id: string | null;
         chunk_size: number;
         total_chunks: number;
         status: string;
         message: string;
+        file?: Record<string, unknown> | null;
       };
     } catch (error) {
       const err = handleApiError(error);
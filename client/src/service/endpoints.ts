@@ -22,6 +22,8 @@ export const ENDPOINTS = {
   UPLOAD_FILE: `${API_BASE_URL}/upload/fast`,
   UPLOAD_INIT: `${API_BASE_URL}/upload/init`,
   CHUNK_FILE: `${API_BASE_URL}/upload/chunk`,
+  PUT_CHUNK: (upload_id: string, chunk_index: number) =>
+    `${API_BASE_URL}/upload/${encodeURIComponent(upload_id)}/chunks/${chunk_index}`,
   UPLOAD_COMPLETE: `${API_BASE_URL}/upload/complete`,
   UPLOAD_PROGRESS: (upload_id: string) =>
     `${API_BASE_URL}/upload/progress/${encodeURIComponent(upload_id)}`,
@@ -7,15 +7,40 @@ from fastapi import Request
 
 from app.db.db import get_db
 from app.dependencies.auth import get_current_user
-from app.dependencies.rate_limit import rate_limiter
+from app.dependencies.internal import require_internal_token
+from app.dependencies.rate_limit import open_rate_limiter, rate_limiter
 from app.logger import logger
 from app.schemas.file import FileUpdate
+from app.services.files.block_cache import block_cache
 from app.services.files.file_manager import file_manager
 from app.services.files.file_stream_manager import file_stream_manager
+from app.services.files.hedging import fetch_hedger
+from app.services.files.single_flight import block_flights
+from app.services.telegram.cdn import cdn_downloads
+from app.services.telegram.client_manager import telegram_client_manager
 router = APIRouter()
 
 @router.get(
+    "/stream/stats",
+    dependencies=[Depends(require_internal_token), Depends(open_rate_limiter(60, 60, key_prefix="internal"))],
+)
+async def get_stream_stats(user_id: Optional[int] = Query(None)):
+    """
+    Block cache, fetch-coalescing, hedging and CDN counters for this process,
+    plus *user_id*'s account scheduler.  Internal only — covers every user.
+    """
+    return {
+        "block_cache": block_cache.stats(),
+        "single_flight": block_flights.stats(),
+        "hedging": fetch_hedger.stats(),
+        "cdn": cdn_downloads.stats(),
+        "scheduler": telegram_client_manager.get_scheduler_stats(user_id) if user_id else None,
+    }
+
+
+@router.api_route(
     "/{file_id}/view",
+    methods=["GET", "HEAD"],
     dependencies=[Depends(rate_limiter(300, 60))],
 )
 async def get_file(
@@ -50,8 +75,9 @@ async def get_file(
         )
 
 
-@router.get(
+@router.api_route(
     "/{file_id}/download",
+    methods=["GET", "HEAD"],
     dependencies=[Depends(rate_limiter(300, 60))],
 )
 async def download_file(
@@ -89,8 +89,9 @@ async def verify_share_link(token: str, share  :FileShareVerify, db = Depends(ge
         logger.error(e)
         raise e
 
-@router.get(
+@router.api_route(
     "/{token}/stream",
+    methods=["GET", "HEAD"],
     dependencies=[Depends(open_rate_limiter(300, 60))],
 )
 async def stream_shared_file(
@@ -3,12 +3,15 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.db import get_db
 from app.dependencies.auth import get_current_user
-from app.dependencies.rate_limit import rate_limiter
+from app.dependencies.internal import require_internal_token
+from app.dependencies.rate_limit import open_rate_limiter, rate_limiter
 from app.logger import logger
 from app.schemas.folder import FileMetadata
 from app.schemas.telegram import TelegramLoginBase, TelegramAuthResponse, TelegramAuth
 from app.services.telegram.auth_service import TelegramAuthService
+from app.services.telegram.client_lifecycle import client_lifecycle
 from app.services.telegram.client_manager import telegram_client_manager
+from app.services.telegram.session_cache import session_cache
 from app.services.telegram.storage_service import tele_storage_service
 
 router = APIRouter()
@@ -82,3 +85,12 @@ async def check_session_status(user=Depends(get_current_user), db: AsyncSession
             "message": "Error checking Telegram session status"
         }
 
+
+
+@router.get(
+    "/connections/stats",
+    dependencies=[Depends(require_internal_token), Depends(open_rate_limiter(60, 60, key_prefix="internal"))],
+)
+async def get_connection_stats():
+    """Session cache and client lifecycle counters for this process. Internal only."""
+    return {"session_cache": session_cache.stats(), "clients": client_lifecycle.stats()}
@@ -1,12 +1,11 @@
 import asyncio
-import hashlib
 import json
 import math
 
 from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Form, Request
 from fastapi.responses import StreamingResponse
+from starlette.requests import ClientDisconnect
 from sqlalchemy.ext.asyncio import AsyncSession
-from io import BytesIO
 
 from app.db.db import get_db
 from app.dependencies.auth import get_current_user
@@ -15,13 +14,21 @@ from app.schemas.folder import FileMetadata
 from app.schemas.upload import (
     UploadInitRequest,
     UploadInitResponse,
+    ChunkAckRequest,
     ChunkUploadResponse,
     UploadCompleteRequest,
     UploadCompleteResponse,
     UploadStatusResponse,
 )
+from app.services.jobs.queue import JobType, job_queue
 from app.services.telegram.telegram_upload_service import upload_service
 from app.services.telegram.file_manager import FileManager, file_manager
+from app.services.upload.chunk_integrity import (
+    HashingReader,
+    find_digest_mismatch,
+    parse_expected_digests,
+)
+from app.services.upload.stream_reader import AsyncBodyReader
 from app.services.upload.upload_state import upload_state, UploadStatus
 from app.repositories.telegram.storage import storage_repository
 from app.logger import logger
@@ -30,7 +37,7 @@ from app.storage import storage
 router = APIRouter()
 
 
-# ─── 1. POST /upload/fast  (small-file shortcut, unchanged) ─────
+# ─── 1. POST /upload/fast  (small-file shortcut, streamed) ──────
 
 @router.post(
     "/fast",
@@ -46,25 +53,11 @@ async def upload_ultra_fast_method(
         # ── Validate file before reading ─────────────────────────
         await file_manager.is_valid_file(file)
 
-        buffer = BytesIO()
-        hasher = hashlib.sha256()
-        file_size = 0
-
-        while chunk := await file.read(1024 * 1024):
-            buffer.write(chunk)
-            hasher.update(chunk)
-            file_size += len(chunk)
-
-        buffer.seek(0)
-        await file.seek(0)
-
-        file_hash = hasher.hexdigest()
-
+        # The spooled upload is hashed, then its parts are streamed straight
+        # to Telegram, so the file is never held in memory as a whole.
         result = await upload_service.upload_file(
             file_metadata=file_metadata,
-            file=buffer,
             raw_file=file,
-            file_hash=file_hash,
             user_id=user.get("id"),
             db=db,
         )
@@ -105,6 +98,24 @@ async def upload_init(
                 detail="File already exists in the current folder",
             )
 
+        # ── Content already in the channel → complete instantly ──
+        channel_file = await storage_repository.is_file_exists_in_channel(
+            body.parent_id, user.get("id"), db, body.content_hash
+        )
+        if channel_file and channel_file.size == body.file_size:
+            file_record = await upload_service.reuse_channel_file(
+                channel_file, body.file_name, body.parent_id, user.get("id"), db
+            )
+            logger.info(f"⚡ Instant upload — reused Telegram file for {body.file_name}")
+            return UploadInitResponse(
+                upload_id=None,
+                chunk_size=0,
+                total_chunks=0,
+                status="completed",
+                message="File already stored — no upload needed",
+                file=file_record,
+            )
+
         # ── Compute chunk size and total chunks server-side ───────
         # Use 10 MB chunks for files ≤ 100 MB, 50 MB for everything larger,
         # capped to never exceed Telegram's 512 KB part-upload limit in practice.
@@ -129,10 +140,17 @@ async def upload_init(
             parent_id=body.parent_id,
         )
 
+        # Presigned URLs let chunk bytes bypass the API entirely;
+        # the client then confirms each chunk via /upload/chunk/ack
+        chunk_urls = (
+            storage.presign_chunk_urls(upload_id, total_chunks) if body.presign else None
+        )
+
         return UploadInitResponse(
             upload_id=upload_id,
             chunk_size=chunk_size,
             total_chunks=total_chunks,
+            chunk_urls=chunk_urls,
         )
 
     except HTTPException:
@@ -142,6 +160,69 @@ async def upload_init(
         raise HTTPException(status_code=500, detail="Failed to initialise upload")
 
 
+# ─── Chunk helpers ──────────────────────────────────────────────
+
+def _chunk_session(upload_id: str, chunk_index: int, user) -> dict:
+    """Validate the upload session, ownership and chunk index; returns meta."""
+    meta = upload_state.get_meta(upload_id)
+    if not meta:
+        raise HTTPException(status_code=404, detail="Upload session not found or expired")
+    if meta["user_id"] != user.get("id"):
+        raise HTTPException(status_code=403, detail="Not authorised for this upload")
+
+    # Validate chunk index bounds
+    if chunk_index < 0 or chunk_index >= meta["total_chunks"]:
+        raise HTTPException(status_code=400, detail=f"Invalid chunk index {chunk_index}")
+    return meta
+
+
+def _already_uploaded(upload_id: str, chunk_index: int) -> ChunkUploadResponse | None:
+    # Idempotent: skip if already stored (Redis is the source of truth)
+    if not upload_state.has_chunk(upload_id, chunk_index):
+        return None
+    received = upload_state.get_status(upload_id) or {}
+    return ChunkUploadResponse(
+        status="already_uploaded",
+        chunk_index=chunk_index,
+        progress=received.get("progress", 0),
+    )
+
+
+async def _store_chunk(
+    request: Request,
+    meta: dict,
+    upload_id: str,
+    chunk_index: int,
+    source,
+    size: int,
+) -> ChunkUploadResponse:
+    """Stream *source* into MinIO, hashing it on the way in, and record the chunk."""
+    # Optional client digest (Content-MD5 / Digest / Repr-Digest)
+    try:
+        expected = parse_expected_digests(request.headers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    reader = HashingReader(source, md5="md5" in expected)
+    etag = await storage.save_chunk(upload_id, chunk_index, reader, size)
+
+    mismatch = find_digest_mismatch(expected, reader)
+    if mismatch:
+        await storage.delete_chunk(upload_id, chunk_index)
+        logger.warning(f"⚠️ Chunk {chunk_index} of {upload_id} failed {mismatch} check — discarded")
+        raise HTTPException(status_code=400, detail=f"Chunk {chunk_index} {mismatch} digest mismatch")
+
+    # Track in Redis — record_chunk returns the new received count
+    received_count = upload_state.record_chunk(upload_id, chunk_index, size, etag, reader.sha256)
+    progress = round((received_count / meta["total_chunks"]) * 100, 1)
+
+    return ChunkUploadResponse(
+        status="uploaded",
+        chunk_index=chunk_index,
+        progress=progress,
+    )
+
+
 # ─── 3. POST /upload/chunk ──────────────────────────────────────
 
 @router.post(
@@ -150,6 +231,7 @@ async def upload_init(
     dependencies=[Depends(rate_limiter(600, 60))],
 )
 async def upload_chunk(
+    request: Request,
     upload_id: str = Form(...),
     chunk_index: int = Form(...),
     chunk_size: int = Form(...),
@@ -157,46 +239,120 @@ async def upload_chunk(
     user=Depends(get_current_user),
 ):
     try:
-        # Validate upload session exists and belongs to this user
-        meta = upload_state.get_meta(upload_id)
-        if not meta:
-            raise HTTPException(status_code=404, detail="Upload session not found or expired")
-        if meta["user_id"] != user.get("id"):
-            raise HTTPException(status_code=403, detail="Not authorised for this upload")
+        meta = _chunk_session(upload_id, chunk_index, user)
 
-        # Validate chunk index bounds
-        if chunk_index < 0 or chunk_index >= meta["total_chunks"]:
-            raise HTTPException(status_code=400, detail=f"Invalid chunk index {chunk_index}")
-
-        # Idempotent: skip if already stored
-        if await storage.chunk_exists(upload_id, chunk_index):
-            received = upload_state.get_status(upload_id) or {}
-            return ChunkUploadResponse(
-                status="already_uploaded",
-                chunk_index=chunk_index,
-                progress=received.get("progress", 0),
-            )
+        already = _already_uploaded(upload_id, chunk_index)
+        if already:
+            return already
 
-        # Stream chunk into MinIO.
         # Use the actual received size (file.size may be set by FastAPI from Content-Length).
         # For the last chunk it is smaller than the declared chunk_size.
         actual_size = file.size if file.size else chunk_size
-        await storage.save_chunk(upload_id, chunk_index, file.file, actual_size)
+        return await _store_chunk(request, meta, upload_id, chunk_index, file.file, actual_size)
 
-        # Track in Redis — record_chunk returns the new received count
-        received_count = upload_state.record_chunk(upload_id, chunk_index)
-        progress = round((received_count / meta["total_chunks"]) * 100, 1)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Chunk upload error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+# ─── 3b. PUT /upload/{upload_id}/chunks/{chunk_index}  (raw body) ─
 
+@router.put(
+    "/{upload_id}/chunks/{chunk_index}",
+    response_model=ChunkUploadResponse,
+    dependencies=[Depends(rate_limiter(600, 60))],
+)
+async def put_chunk(
+    upload_id: str,
+    chunk_index: int,
+    request: Request,
+    user=Depends(get_current_user),
+):
+    """
+    Same as POST /upload/chunk, but the request body *is* the chunk.
+    No multipart parsing and no temp-file spooling: the body is streamed
+    from the socket straight into MinIO with the length from Content-Length.
+    """
+    try:
+        meta = _chunk_session(upload_id, chunk_index, user)
+
+        content_length = request.headers.get("content-length")
+        if content_length is None or not content_length.isdigit():
+            raise HTTPException(status_code=411, detail="Content-Length required")
+        size = int(content_length)
+        expected_size = upload_state.expected_chunk_size(meta, chunk_index)
+        if size != expected_size:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Chunk {chunk_index} must be {expected_size} bytes, got {size}",
+            )
+
+        already = _already_uploaded(upload_id, chunk_index)
+        if already:
+            return already
+
+        body = AsyncBodyReader(request.stream(), size, asyncio.get_running_loop())
+        return await _store_chunk(request, meta, upload_id, chunk_index, body, size)
+
+    except HTTPException:
+        raise
+    except ClientDisconnect:
+        logger.warning(f"⚠️ Client disconnected while sending chunk {chunk_index} of {upload_id}")
+        raise HTTPException(status_code=400, detail="Client disconnected")
+    except Exception as e:
+        logger.error(f"❌ Chunk upload error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+# ─── 3c. POST /upload/chunk/ack  (presigned uploads) ──────────
+
+@router.post(
+    "/chunk/ack",
+    response_model=ChunkUploadResponse,
+    dependencies=[Depends(rate_limiter(600, 60))],
+)
+async def ack_chunk(
+    body: ChunkAckRequest,
+    user=Depends(get_current_user),
+):
+    """Record a chunk the client PUT directly to storage with a presigned URL."""
+    upload_id, chunk_index = body.upload_id, body.chunk_index
+
+    try:
+        meta = _chunk_session(upload_id, chunk_index, user)
+
+        already = _already_uploaded(upload_id, chunk_index)
+        if already:
+            return already
+
+        # One HEAD — confirms the object landed and gives its size / ETag
+        stored = await storage.stat_chunk(upload_id, chunk_index)
+        if stored is None:
+            raise HTTPException(status_code=404, detail=f"Chunk {chunk_index} not found in storage")
+
+        expected_size = upload_state.expected_chunk_size(meta, chunk_index)
+        if stored["size"] != expected_size:
+            await storage.delete_chunk(upload_id, chunk_index)
+            raise HTTPException(
+                status_code=400,
+                detail=f"Chunk {chunk_index} must be {expected_size} bytes, got {stored['size']}",
+            )
+
+        received_count = upload_state.record_chunk(
+            upload_id, chunk_index, stored["size"], stored["etag"]
+        )
         return ChunkUploadResponse(
             status="uploaded",
             chunk_index=chunk_index,
-            progress=progress,
+            progress=round((received_count / meta["total_chunks"]) * 100, 1),
         )
 
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Chunk upload error: {e}", exc_info=True)
+        logger.error(f"❌ Chunk ack error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
@@ -229,27 +385,38 @@ async def upload_complete(
                 message="Upload is already being processed",
             )
 
-        # Validate all chunks are in MinIO — run checks concurrently
-        total = meta["total_chunks"]
-        exists_flags = await asyncio.gather(
-            *[storage.chunk_exists(upload_id, i) for i in range(total)],
-            return_exceptions=True,
-        )
-        missing = [i for i, ok in enumerate(exists_flags) if not ok]
+        # Validate all chunks from the Redis manifest — one round-trip.
+        # Only when it disagrees with the agreed layout is MinIO listed once
+        # to reconcile (e.g. a stored chunk whose Redis record was lost).
+        manifest = upload_state.get_chunk_manifest(upload_id)
+        missing = upload_state.find_chunk_problems(meta, manifest)
+        if missing:
+            logger.warning(f"Chunk manifest mismatch for {upload_id} ({len(missing)} chunk(s)) — reconciling with storage")
+            manifest = upload_state.reconcile_chunks(upload_id, await storage.list_chunks(upload_id))
+            missing = upload_state.find_chunk_problems(meta, manifest)
 
         if missing:
             upload_state.set_failed(upload_id, f"Missing chunks: {missing[:10]}")
+            # Let the client re-send the missing chunks and call /complete again
+            upload_state.release_complete_lock(upload_id)
             raise HTTPException(
                 status_code=400,
                 detail=f"Missing {len(missing)} chunk(s): {missing[:10]}"
             )
 
-        # Mark processing & launch background job
+        # Mark processing & hand the transfer to the job workers
         upload_state.set_processing(upload_id)
 
-        asyncio.create_task(
-            upload_service.process_chunked_upload(upload_id, meta, user.get("id"))
-        )
+        try:
+            await job_queue.submit(JobType.CHUNKED_UPLOAD, user.get("id"), upload_id=upload_id)
+        except Exception as e:
+            logger.error(f"❌ Could not queue upload {upload_id}: {e}", exc_info=True)
+            upload_state.set_failed(upload_id, "Could not queue the upload — please retry")
+            upload_state.release_complete_lock(upload_id)
+            raise HTTPException(
+                status_code=503,
+                detail="Upload could not be queued, please retry",
+            )
 
         return UploadCompleteResponse(
             status="processing",
@@ -291,6 +458,7 @@ async def get_upload_status(
         progress=status.get("progress", 0),
         message=status.get("message", ""),
         file=status.get("file"),
+        transfer=status.get("transfer"),
     )
 
 
@@ -308,7 +476,8 @@ async def upload_progress_sse(
     completes, fails, or the connection is dropped.
 
     Event format:
-        data: {"status": "...", "progress": 0-100, "message": "...", "file": {...}|null}
+        data: {"status": "...", "progress": 0-100, "message": "...", "file": {...}|null,
+               "transfer": {"window": ..., "throughput_mbps": ..., ...}|null}
     """
     # Ownership check up-front
     meta = upload_state.get_meta(upload_id)
@@ -340,6 +509,7 @@ async def upload_progress_sse(
                 "progress": current.get("progress", 0),
                 "message": current.get("message", ""),
                 "file": current.get("file"),
+                "transfer": current.get("transfer"),
             }
 
             # Only push when something actually changed
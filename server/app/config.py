@@ -25,6 +25,7 @@ class Settings(BaseSettings):
     access_token_secret: str
     refresh_token_secret: str
     algorithm: str
+    internal_api_token: str = ""  # X-Internal-Token for process-wide stats endpoints; empty disables them
 
     # Telegram Auth
     telegram_api_id: str
@@ -38,8 +39,43 @@ class Settings(BaseSettings):
     # File Upload Limit Config
     max_file_size: int = int(1.9 * 1024 * 1024 * 1024)  # ~1.9 GiB
 
+    # Telegram Upload Pipeline
+    upload_memory_budget: int = 256 * 1024 * 1024  # part buffers held across all uploads in a process
+    upload_memory_per_upload: int = 32 * 1024 * 1024  # part buffers held by a single chunked upload
+    upload_relay_fetch_parts: int = 8  # Telegram parts per MinIO range request (8 × 512 KB = 4 MB)
+    upload_relay_prefetch: int = 4  # MinIO range requests kept in flight per upload
+
+    # Background Jobs
+    job_backend: str = "redis"  # "redis" (Redis Streams) or "memory" (in-process, tests / local dev)
+    job_embedded_worker: bool = False  # also run a worker inside the API process; only for setups without `python -m app.worker` (always on with the "memory" backend)
+    job_worker_concurrency: int = 4  # jobs one worker process runs at once
+    job_global_concurrency: int = 16  # jobs running at once across all workers
+    job_user_concurrency: int = 2  # jobs running at once per user
+    job_visibility_timeout: int = 120  # seconds without a heartbeat before a job is re-delivered
+    job_max_attempts: int = 5
+    job_retry_base_delay: float = 5.0  # seconds, doubled per attempt
+    job_retry_max_delay: float = 300.0
+    job_shutdown_grace: float = 30.0  # seconds running jobs get to finish on shutdown
+
+    # Telegram Connections
+    telegram_dc_senders: int = 4  # exported senders kept per foreign DC per client (parallel downloads)
+    telegram_transfer_senders: int = 4  # extra home-DC connections per client for part uploads and block downloads; 0 = main connection only
+    telegram_account_concurrency: int = 32  # RPCs in flight per Telegram account, shared by uploads and downloads
+    telegram_gateway_socket: str = ""  # Unix socket of the Telegram gateway (python -m app.gateway); empty = each worker owns its clients
+    telegram_gateway_max_inflight: int = 256  # gateway calls in flight per worker connection before backpressure
+    telegram_client_idle_timeout: int = 15 * 60  # seconds without use before a cached client is disconnected
+    telegram_client_check_interval: int = 60  # seconds between idle / health sweeps of cached clients
+    telegram_prewarm_clients: int = 20  # most recently active users whose clients are connected at startup
+    telegram_prewarm_window: int = 24 * 60 * 60  # only pre-warm users active within this many seconds
+
     # File Download Limit Config
     download_chunk_size: int = 1048576  # 1MB
+    download_cache_memory: int = 128 * 1024 * 1024  # in-process LRU of Telegram file blocks
+    download_cache_dir: str = ""  # directory for the on-disk block LRU; empty disables it
+    download_cache_disk: int = 2 * 1024 * 1024 * 1024  # byte budget of the on-disk block LRU
+    download_hedge_percentile: float = 0.95  # block fetches slower than this latency percentile get a hedged duplicate
+    download_hedge_budget: float = 0.05  # hedged fetches allowed per block fetch (caps the extra RPC volume)
+    download_cdn: bool = True  # accept FileCdnRedirect and fetch popular files from Telegram's CDN DCs
 
     allowed_origins: Union[str, List[str]]
 
@@ -68,6 +104,9 @@ class Settings(BaseSettings):
     minio_access_key: str
     minio_secret_key: str
     minio_bucket: str
+    minio_public_endpoint: str = ""  # e.g. "https://files.example.com" — host presigned URLs point at; defaults to minio_endpoint
+    minio_region: str = "us-east-1"  # fixed so presigning never needs a bucket-location lookup
+    minio_presign_expiry: int = 60 * 60 * 2  # seconds a presigned chunk URL stays valid (matches the upload TTL)
   
 
 settings = Settings()
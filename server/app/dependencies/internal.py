@@ -0,0 +1,19 @@
+import secrets
+
+from fastapi import HTTPException, Request, status
+
+from app.config import settings
+
+
+async def require_internal_token(request: Request):
+    """
+    Guard for operational endpoints that expose process-wide state.
+    Callers send ``X-Internal-Token``; with no token configured the
+    endpoints don't exist.
+    """
+    if not settings.internal_api_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+    token = request.headers.get("x-internal-token", "")
+    if not secrets.compare_digest(token.encode(), settings.internal_api_token.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorised")
@@ -0,0 +1,49 @@
+"""
+Telegram gateway process.
+
+Owns every user's Telegram client so each account has one set of MTProto
+connections however many API workers run.  Start it next to the API and
+point the workers at its socket with TELEGRAM_GATEWAY_SOCKET:
+
+    python -m app.gateway
+"""
+
+import asyncio
+import signal
+
+from app.config import settings
+from app.db.db import check_db
+from app.logger import logger
+from app.services.telegram.client_lifecycle import client_lifecycle
+from app.services.telegram.client_manager import telegram_client_manager
+from app.services.telegram.gateway.client import telegram_gateway
+from app.services.telegram.gateway.server import GatewayServer
+
+
+async def main():
+    if not settings.telegram_gateway_socket:
+        raise SystemExit("TELEGRAM_GATEWAY_SOCKET is not set")
+
+    await check_db()
+
+    # Serve requests with real clients instead of forwarding them to ourselves
+    telegram_gateway.serving = True
+    server = GatewayServer(settings.telegram_gateway_socket, settings.telegram_gateway_max_inflight)
+    await server.start()
+    client_lifecycle.start(prewarm=True)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await stop.wait()
+    logger.info("Stopping gateway - closing Telegram clients...")
+    await server.stop()
+    await client_lifecycle.stop()
+    await telegram_client_manager.clean_up_all_local_cache()
+    logger.info("Gateway stopped")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,3 +1,4 @@
+import asyncio
 from contextlib import asynccontextmanager
 from urllib.request import Request
 
@@ -12,7 +13,10 @@ from app.config import settings
 from app.logger import logger
 from app.api.v1.router import router as api_router
 from app.db.db import check_db
+from app.services.jobs.worker import JobWorker
+from app.services.telegram.client_lifecycle import client_lifecycle
 from app.services.telegram.client_manager import telegram_client_manager
+from app.services.telegram.gateway.client import telegram_gateway
 
 
 @asynccontextmanager
@@ -22,9 +26,34 @@ async def lifespan(app: FastAPI):
         logger.info("Started server on port {}".format(settings.port))
     else :
         logger.info("Started App server")
+
+    # Jobs are consumed by dedicated workers (`python -m app.worker`).
+    # Single-process setups opt in to an in-process worker; the in-memory
+    # backend can't reach any other process, so it always gets one.
+    worker, worker_task = None, None
+    if settings.job_embedded_worker or settings.job_backend == "memory":
+        worker = JobWorker()
+        worker_task = asyncio.create_task(worker.run())
+    else:
+        logger.warning(
+            "⚠️ No embedded job worker — chunked uploads stay queued until "
+            "`python -m app.worker` is running (or set JOB_EMBEDDED_WORKER=true)"
+        )
+
+    # Idle eviction and pings; pre-warming is left to the gateway / job worker
+    client_lifecycle.start()
+
     yield
+
+    if worker:
+        logger.info("Stopping Server - Stopping embedded job worker...")
+        worker_task.cancel()
+        await asyncio.gather(worker_task, return_exceptions=True)
+        await worker.stop(grace=settings.job_shutdown_grace)
     logger.info("Stopping Server - Cleaning up Telegram clients...")
+    await client_lifecycle.stop()
     await telegram_client_manager.clean_up_all_local_cache()
+    await telegram_gateway.close()
     logger.info("Server stopped")
 
 
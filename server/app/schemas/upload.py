@@ -10,6 +10,12 @@ class UploadInitRequest(BaseModel):
     mime_type: str = Field(..., min_length=1, max_length=100)
     content_hash: str = Field(..., min_length=64, max_length=64, description="SHA-256 hex digest")
     parent_id: Optional[int] = None
+    presign: bool = False  # return presigned PUT URLs so chunks go straight to storage
+
+
+class ChunkAckRequest(BaseModel):
+    upload_id: str = Field(..., min_length=1)
+    chunk_index: int = Field(..., ge=0)
 
 
 class UploadCompleteRequest(BaseModel):
@@ -19,11 +25,13 @@ class UploadCompleteRequest(BaseModel):
 # ── Response schemas ─────────────────────────────────────────────
 
 class UploadInitResponse(BaseModel):
-    upload_id: str
+    upload_id: Optional[str] = None  # None when the upload completed instantly
     chunk_size: int
     total_chunks: int
     status: str = "pending"
     message: str = "Upload session created"
+    file: Optional[dict] = None
+    chunk_urls: Optional[list[str]] = None  # presigned PUT URL per chunk index
 
 
 class ChunkUploadResponse(BaseModel):
@@ -44,3 +52,4 @@ class UploadStatusResponse(BaseModel):
     progress: float
     message: str
     file: Optional[dict] = None
+    transfer: Optional[dict] = None
@@ -0,0 +1,198 @@
+"""
+Two-tier cache for Telegram file blocks (GetFileRequest results).
+
+Blocks are keyed by (document id, aligned offset, request size), so a block
+is only reused by requests that would have asked Telegram for exactly the
+same bytes.
+
+  memory → OrderedDict LRU bounded by ``download_cache_memory`` bytes
+  disk   → optional LRU of block files under ``download_cache_dir`` bounded by
+           ``download_cache_disk`` bytes; a disk hit is promoted to memory
+
+Access control happens before a block is requested, so the cache never
+decides who may read a document.
+"""
+
+import asyncio
+import os
+from collections import OrderedDict
+from typing import Optional
+
+from app.config import settings
+from app.logger import logger
+
+
+class BlockCache:
+
+    def __init__(self, memory_budget: int, disk_dir: str = "", disk_budget: int = 0):
+        self.memory_budget = memory_budget
+        self.disk_dir = disk_dir
+        self.disk_budget = disk_budget if disk_dir else 0
+
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: OrderedDict[str, int] = OrderedDict()   # key → size on disk
+        self._disk_bytes = 0
+        self._disk_ready = False
+
+        self._hits_memory = 0
+        self._hits_disk = 0
+        self._misses = 0
+        self._evictions_memory = 0
+        self._evictions_disk = 0
+
+    @staticmethod
+    def key(document_id: int, offset: int, size: int) -> str:
+        return f"{document_id}_{offset}_{size}"
+
+    # ── Lookup ───────────────────────────────────────────────────
+
+    async def get(self, key: str) -> Optional[bytes]:
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+            self._hits_memory += 1
+            return data
+
+        if self.disk_budget:
+            await self._ensure_disk_index()
+            if key in self._disk:
+                data = await asyncio.to_thread(self._read_disk, key)
+                if data is not None:
+                    self._disk.move_to_end(key)
+                    self._hits_disk += 1
+                    self._put_memory(key, data)
+                    return data
+                self._forget_disk(key)
+
+        self._misses += 1
+        return None
+
+    async def put(self, key: str, data: bytes):
+        if not data:
+            return
+        self._put_memory(key, data)
+
+        if self.disk_budget and len(data) <= self.disk_budget:
+            await self._ensure_disk_index()
+            if key in self._disk:
+                return
+            try:
+                await asyncio.to_thread(self._write_disk, key, data)
+            except OSError as e:
+                logger.warning(f"Block cache disk write failed for {key}: {e}")
+                return
+            self._disk[key] = len(data)
+            self._disk_bytes += len(data)
+            await self._evict_disk()
+
+    # ── Memory tier ──────────────────────────────────────────────
+
+    def _put_memory(self, key: str, data: bytes):
+        if len(data) > self.memory_budget:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+
+        while self._memory_bytes > self.memory_budget:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self._evictions_memory += 1
+
+    # ── Disk tier ────────────────────────────────────────────────
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.blk")
+
+    async def _ensure_disk_index(self):
+        if self._disk_ready:
+            return
+        self._disk_ready = True
+        entries = await asyncio.to_thread(self._scan_disk)
+        for key, size in entries:
+            self._disk[key] = size
+            self._disk_bytes += size
+        if entries:
+            logger.info(f"Block cache | restored {len(entries)} block(s) from {self.disk_dir}")
+        await self._evict_disk()
+
+    def _scan_disk(self) -> list[tuple[str, int]]:
+        """Existing block files, least recently used first."""
+        os.makedirs(self.disk_dir, exist_ok=True)
+        entries = []
+        with os.scandir(self.disk_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(".blk"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+        entries.sort()
+        return [(key, size) for _, key, size in entries]
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)   # keeps LRU order across restarts
+            return data
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, data: bytes):
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _forget_disk(self, key: str):
+        size = self._disk.pop(key, None)
+        if size is not None:
+            self._disk_bytes -= size
+
+    async def _evict_disk(self):
+        victims = []
+        while self._disk_bytes > self.disk_budget and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            self._evictions_disk += 1
+            victims.append(key)
+        if victims:
+            await asyncio.to_thread(self._remove_files, victims)
+
+    def _remove_files(self, keys: list[str]):
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    # ── Reporting ────────────────────────────────────────────────
+
+    def stats(self) -> dict:
+        lookups = self._hits_memory + self._hits_disk + self._misses
+        hits = self._hits_memory + self._hits_disk
+        return {
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "hits_memory": self._hits_memory,
+            "hits_disk": self._hits_disk,
+            "misses": self._misses,
+            "memory_blocks": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "memory_budget": self.memory_budget,
+            "evictions_memory": self._evictions_memory,
+            "disk_blocks": len(self._disk),
+            "disk_bytes": self._disk_bytes,
+            "disk_budget": self.disk_budget,
+            "evictions_disk": self._evictions_disk,
+        }
+
+
+block_cache = BlockCache(
+    memory_budget=settings.download_cache_memory,
+    disk_dir=settings.download_cache_dir,
+    disk_budget=settings.download_cache_disk,
+)
@@ -1,21 +1,47 @@
 import asyncio
-import re
-from typing import Optional, AsyncGenerator
+import collections
+import time
+from typing import Optional, AsyncGenerator, Awaitable, Callable
 from urllib.parse import quote
 
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 from fastapi import Request
 
+from telethon import errors
 from telethon.tl.functions.upload import GetFileRequest
-from telethon.tl.types import InputDocumentFileLocation
+from telethon.tl.types.upload import FileCdnRedirect
 
 from app.config import settings
 from app.logger import logger
+from app.services.files.block_cache import block_cache
+from app.services.files.hedging import fetch_hedger
+from app.services.files.http_ranges import (
+    RangeNotSatisfiable,
+    closing_boundary,
+    http_date,
+    if_range_matches,
+    is_not_modified,
+    make_etag,
+    multipart_length,
+    new_boundary,
+    parse_range_header,
+    part_header,
+)
+from app.services.files.single_flight import block_flights
+from app.services.files.stream_tuner import StreamTuner
+from app.services.telegram.cdn import CdnVerificationError, cdn_downloads
+from app.services.telegram.client_manager import telegram_client_manager
+from app.services.telegram.document_cache import TelegramDocument
+from app.services.telegram.rpc_scheduler import AccountScheduler, Priority
+from app.services.telegram.sender_pool import DcSenderPool
 from app.services.telegram.storage_service import tele_storage_service
 
 
 class FileStreamManager:
 
+    DISCONNECT_CHECK_INTERVAL = 1.0  # seconds between request.is_disconnected() polls
+    MAX_STREAM_FLOOD_WAIT = 10       # FloodWaits up to this many seconds are waited out mid-stream
+
     @staticmethod
     def get_optimal_params(file_size: int, mime_type: str | None):
 
@@ -50,126 +76,249 @@ class FileStreamManager:
     # -----------------------------------------------------
 
     @staticmethod
-    async def download_chunk(client, location, offset: int, file_size: int, request_size: int):
+    async def fetch_from_dc(
+        sender_pool: DcSenderPool,
+        dc_id: int | None,
+        location,
+        offset: int,
+        limit: int,
+        used: list | None = None,
+    ) -> bytes:
+        """
+        One block from the document's DC, following a CDN redirect when the
+        origin offers one and falling back to the origin if the CDN fails.
+        """
+        document_id = location.id
+        cdn_errors = (CdnVerificationError, errors.RPCError, ConnectionError, ValueError)
+
+        cdn_file = cdn_downloads.get(document_id) if settings.download_cdn else None
+        if cdn_file is not None:
+            try:
+                return await cdn_downloads.fetch(sender_pool, dc_id, cdn_file, offset, limit, used)
+            except cdn_errors as e:
+                cdn_downloads.fall_back(document_id, e)
+
+        cdn_supported = settings.download_cdn and cdn_downloads.supported(document_id)
+        request = GetFileRequest(
+            location=location,
+            offset=offset,
+            limit=limit,
+            cdn_supported=cdn_supported or None,
+        )
+        result = await sender_pool.call(dc_id, request, used)
+
+        if isinstance(result, FileCdnRedirect):
+            cdn_file = cdn_downloads.remember(document_id, result)
+            try:
+                return await cdn_downloads.fetch(sender_pool, dc_id, cdn_file, offset, limit, used)
+            except cdn_errors as e:
+                cdn_downloads.fall_back(document_id, e)
+                request.cdn_supported = None
+                result = await sender_pool.call(dc_id, request, used)
+
+        return result.bytes
+
+    @staticmethod
+    async def download_chunk(
+        client,
+        location,
+        offset: int,
+        file_size: int,
+        request_size: int,
+        dc_id: int | None = None,
+        sender_pool: DcSenderPool | None = None,
+        on_rpc_latency: Callable[[float], None] | None = None,
+        scheduler: AccountScheduler | None = None,
+        priority: str = Priority.INTERACTIVE,
+    ):
 
         aligned_offset = (offset // request_size) * request_size
 
         if aligned_offset >= file_size:
             return aligned_offset, b""
 
-        result = await client(
-            GetFileRequest(
-                location=location,
-                offset=aligned_offset,
-                limit=request_size
-            )
-        )
+        cache_key = block_cache.key(location.id, aligned_offset, request_size)
+
+        async def fetch():
+            cached = await block_cache.get(cache_key)
+            if cached is not None:
+                return cached
 
-        return aligned_offset, result.bytes
+            # Senders already carrying this block, so a hedge uses another
+            used_senders = []
+
+            async def send():
+                started = time.monotonic()
+                if sender_pool is not None:
+                    # Straight to the DC that stores the document (or its CDN)
+                    data = await FileStreamManager.fetch_from_dc(
+                        sender_pool, dc_id, location, aligned_offset, request_size, used_senders
+                    )
+                else:
+                    request = GetFileRequest(location=location, offset=aligned_offset, limit=request_size)
+                    data = (await client(request)).bytes
+                if on_rpc_latency is not None:
+                    on_rpc_latency(time.monotonic() - started)
+                return data
+
+            async def hedged_send():
+                # A hedge shares the original's account slot; the hedger's
+                # budget caps how often that happens
+                return await fetch_hedger.run(dc_id or 0, send)
+
+            if scheduler is None:
+                data = await hedged_send()
+            else:
+                try:
+                    async with scheduler.slot(priority, request_size):
+                        data = await hedged_send()
+                except errors.FloodWaitError as e:
+                    if e.seconds > FileStreamManager.MAX_STREAM_FLOOD_WAIT:
+                        raise
+                    # The scheduler holds every slot until the wait is over
+                    async with scheduler.slot(priority, request_size):
+                        data = await hedged_send()
+
+            await block_cache.put(cache_key, data)
+            return data
+
+        # Identical concurrent requests (overlapping ranges, many viewers of
+        # one share link) share a single GetFileRequest
+        data = await block_flights.do(cache_key, fetch)
+        return aligned_offset, data
 
     # -----------------------------------------------------
 
     @staticmethod
     async def stream_parallel(
         client,
-        message,
+        document: TelegramDocument,
         request: Request,
         start_offset: int,
         total_bytes: int,
-        max_concurrent: int
+        max_concurrent: int,
+        sender_pool: DcSenderPool | None = None,
+        refresh_document: Callable[[], Awaitable[TelegramDocument]] | None = None,
+        scheduler: AccountScheduler | None = None,
+        priority: str = Priority.INTERACTIVE,
     ) -> AsyncGenerator[bytes, None]:
 
-        document = message.document
-
-        location = InputDocumentFileLocation(
-            id=document.id,
-            access_hash=document.access_hash,
-            file_reference=document.file_reference,
-            thumb_size=""
-        )
-
         file_size = document.size
 
         if total_bytes <= 0:
             return
 
-        request_size = FileStreamManager.get_request_size(file_size)
+        # Starting point from the size thresholds; the tuner adapts block
+        # size and depth to the measured client drain rate and RPC latency
+        tuner = StreamTuner(
+            document.id,
+            file_size,
+            FileStreamManager.get_request_size(file_size),
+            max_concurrent,
+        )
 
         end_offset = min(start_offset + total_bytes, file_size)
-        aligned_start = (start_offset // request_size) * request_size
-
-        offsets = [
-            offset for offset in range(aligned_start, end_offset, request_size)
-            if offset < file_size
-        ]
 
-        semaphore = asyncio.Semaphore(max_concurrent)
+        # Shared by every in-flight fetch so one refresh fixes them all
+        current = {"document": document, "location": document.location()}
+        refresh_lock = asyncio.Lock()
 
-        async def fetch(offset):
-            async with semaphore:
+        async def fetch_block(offset: int, size: int):
+            used = current["document"]
+            try:
                 return await FileStreamManager.download_chunk(
                     client,
-                    location,
+                    current["location"],
                     offset,
                     file_size,
-                    request_size
+                    size,
+                    used.dc_id,
+                    sender_pool,
+                    on_rpc_latency=tuner.on_fetch,
+                    scheduler=scheduler,
+                    priority=priority,
                 )
+            except errors.FileReferenceExpiredError:
+                if refresh_document is None:
+                    raise
+                async with refresh_lock:
+                    if current["document"] is used:
+                        logger.info(f"File reference expired for document {used.id} — refreshing")
+                        fresh = await refresh_document()
+                        current.update(document=fresh, location=fresh.location())
+
+            return await FileStreamManager.download_chunk(
+                client,
+                current["location"],
+                offset,
+                file_size,
+                size,
+                current["document"].dc_id,
+                sender_pool,
+                on_rpc_latency=tuner.on_fetch,
+                scheduler=scheduler,
+                priority=priority,
+            )
 
-        # Reduced batch size to prevent flood wait
-        batch_size = max_concurrent * 2
-
-        bytes_sent = 0
-        total_chunks = len(offsets)
-
-        for batch_start in range(0, total_chunks, batch_size):
-
-            if await request.is_disconnected():
-                logger.info("Client disconnected, stopping stream")
-                return
-
-            batch_offsets = offsets[batch_start:batch_start + batch_size]
-
-            tasks = [fetch(offset) for offset in batch_offsets]
-
-            results = []
-
-            for coro in asyncio.as_completed(tasks):
-                try:
-                    result = await coro
-                    results.append(result)
-                except asyncio.CancelledError:
-                    logger.info("Streaming cancelled")
-                    return
-
-            results.sort(key=lambda x: x[0])
+        # Sliding window: keep `tuner.depth` block fetches in flight and
+        # yield each block as soon as it is the next one in order.
+        pending = collections.deque()
+        first_block = tuner.block_for(0)
+        next_offset = (start_offset // first_block) * first_block
 
-            for offset, data in results:
+        def schedule():
+            nonlocal next_offset
+            while len(pending) < tuner.depth and next_offset < end_offset:
+                size = tuner.block_for(next_offset)
+                pending.append(asyncio.create_task(fetch_block(next_offset, size)))
+                next_offset += size
 
-                if await request.is_disconnected():
-                    logger.info("Client disconnected during stream")
-                    return
+        last_disconnect_check = time.monotonic()
+        drain = 0.0
 
-                if not data or bytes_sent >= total_bytes:
+        try:
+            schedule()
+
+            while pending:
+                waited_at = time.monotonic()
+                offset, data = await pending.popleft()
+                stall = time.monotonic() - waited_at
+                tuner.on_block(len(data), stall, drain)
+                schedule()
+
+                # Polling the ASGI receive channel per block is wasteful —
+                # check at most once per interval
+                now = time.monotonic()
+                if now - last_disconnect_check >= FileStreamManager.DISCONNECT_CHECK_INTERVAL:
+                    last_disconnect_check = now
+                    if await request.is_disconnected():
+                        logger.info("Client disconnected, stopping stream")
+                        return
+
+                drain = 0.0
+                if not data:
                     continue
 
-                data_start = offset
-                data_end = offset + len(data)
-
-                send_start = max(data_start, start_offset)
-                send_end = min(data_end, end_offset)
+                send_start = max(offset, start_offset)
+                send_end = min(offset + len(data), end_offset)
 
                 if send_start >= send_end:
                     continue
 
-                chunk = data[send_start - data_start:send_end - data_start]
-
-                bytes_sent += len(chunk)
+                yielded_at = time.monotonic()
+                yield data[send_start - offset:send_end - offset]
+                # Time the consumer (ASGI send → socket) took to take the block
+                drain = time.monotonic() - yielded_at
 
-                yield chunk
+        except asyncio.CancelledError:
+            logger.info("Streaming cancelled")
+            raise
 
-            # Small delay between batches to prevent flood wait
-            if batch_start + batch_size < total_chunks:
-                await asyncio.sleep(0.05)
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
 
 
     # -----------------------------------------------------
@@ -184,63 +333,102 @@ class FileStreamManager:
         disposition: str = "inline"
     ):
 
-        client, file, message = await tele_storage_service.get_telegram_message(
+        client, file, document = await tele_storage_service.get_telegram_document(
             file_id,
             user_id,
             db
         )
 
-        file_size = message.file.size
-        mime_type = message.file.mime_type
-        file_name = getattr(message.file, "name", f"file_{file_id}")
-
-        if range_header:
-
-            match = re.match(r"bytes=(\d+)-(\d*)", range_header)
-
-            if match:
-
-                start = int(match.group(1))
-                end = int(match.group(2)) if match.group(2) else file_size - 1
-
-                end = min(end, file_size - 1)
-                start = max(0, start)
-
-                if start >= file_size or start > end:
-                    start, end = 0, file_size - 1
-                    status_code = 200
-                else:
-                    status_code = 206
+        file_size = document.size
+        mime_type = document.mime_type
+        file_name = document.name or f"file_{file_id}"
 
-                content_length = end - start + 1
+        # The stream outlives this request's DB session — capture what a
+        # file-reference refresh needs now
+        chat_id, message_id = file.telegram_chat_id, file.telegram_message_id
+        scheduler = telegram_client_manager.get_scheduler(file.user_id)
 
-            else:
-                start, end = 0, file_size - 1
-                content_length = file_size
-                status_code = 200
+        async def refresh_document():
+            return await tele_storage_service.fetch_telegram_document(
+                client, file_id, chat_id, message_id, scheduler
+            )
 
-        else:
-            start, end = 0, file_size - 1
-            content_length = file_size
-            status_code = 200
+        # ── Validators / conditional requests ──
+        etag = make_etag(file.content_hash, document.id)
+        last_modified = file.uploaded_at
+        cache_headers = {"ETag": etag, "Cache-Control": "private, max-age=3600"}
+        if last_modified is not None:
+            cache_headers["Last-Modified"] = http_date(last_modified)
+
+        if is_not_modified(request.headers, etag, last_modified):
+            return Response(status_code=304, headers=cache_headers)
+
+        # ── Ranges (ignored when If-Range names a stale validator) ──
+        ranges = None
+        if range_header and if_range_matches(request.headers, etag, last_modified):
+            try:
+                ranges = parse_range_header(range_header, file_size)
+            except RangeNotSatisfiable:
+                return Response(
+                    status_code=416,
+                    headers={**cache_headers, "Content-Range": f"bytes */{file_size}"},
+                )
 
         params = FileStreamManager.get_optimal_params(file_size, mime_type)
+        sender_pool = telegram_client_manager.get_sender_pool(file.user_id, client)
+        # In-browser viewing outranks attachment downloads on the same account
+        priority = Priority.INTERACTIVE if disposition == "inline" else Priority.DOWNLOAD
+
+        def open_stream(start: int, length: int):
+            return FileStreamManager.stream_parallel(
+                client=client,
+                document=document,
+                request=request,
+                start_offset=start,
+                total_bytes=length,
+                max_concurrent=params["concurrent"],
+                sender_pool=sender_pool,
+                refresh_document=refresh_document,
+                scheduler=scheduler,
+                priority=priority,
+            )
 
         logger.info(
             f"Streaming | "
             f"size={file_size / 1_000_000:.1f}MB | "
             f"concurrency={params['concurrent']} | "
-            f"range={start}-{end}"
+            f"ranges={ranges or 'full'}"
         )
 
-        file_iterator = FileStreamManager.stream_parallel(
-            client=client,
-            message=message,
-            request=request,
-            start_offset=start,
-            total_bytes=content_length,
-            max_concurrent=params["concurrent"]
-        )
+        if ranges and len(ranges) > 1:
+            status_code = 206
+            content_type = mime_type or "application/octet-stream"
+            boundary = new_boundary()
+            content_length = multipart_length(boundary, content_type, ranges, file_size)
+            media_type = f"multipart/byteranges; boundary={boundary}"
+            content_range = None   # carried by each part instead
+
+            async def multipart_iterator():
+                for start, end in ranges:
+                    yield part_header(boundary, content_type, start, end, file_size)
+                    async for piece in open_stream(start, end - start + 1):
+                        yield piece
+                    yield b"\r\n"
+                yield closing_boundary(boundary)
+
+            file_iterator = multipart_iterator()
+        else:
+            if ranges:
+                (start, end), = ranges
+                status_code = 206
+                content_range = f"bytes {start}-{end}/{file_size}"
+            else:
+                start, end = 0, file_size - 1
+                status_code = 200
+                content_range = None
+            content_length = end - start + 1
+            media_type = mime_type
+            file_iterator = open_stream(start, content_length)
 
         # Properly encode filename for Content-Disposition header
         # Use RFC 5987 encoding for non-ASCII characters
@@ -257,15 +445,19 @@ class FileStreamManager:
             "Content-Length": str(content_length),
             "Accept-Ranges": "bytes",
             "Content-Disposition": content_disposition,
-            "Cache-Control": "private, max-age=3600"
+            **cache_headers,
         }
 
-        if status_code == 206:
-            headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+        if content_range:
+            headers["Content-Range"] = content_range
+
+        # HEAD: headers only — answered from the location cache, no Telegram RPC
+        if request.method == "HEAD":
+            return Response(status_code=status_code, headers=headers, media_type=media_type)
 
         return StreamingResponse(
             file_iterator,
-            media_type=mime_type,
+            media_type=media_type,
             status_code=status_code,
             headers=headers
         )
@@ -0,0 +1,127 @@
+"""
+Hedged block fetches.
+
+Now and then one GetFileRequest takes seconds instead of milliseconds and the
+ordered stream stalls behind it.  When a fetch is still running after the
+configured latency percentile for its DC, a duplicate is sent (through a
+different pooled sender where possible); whichever answers first wins and
+the other is cancelled.
+
+Hedges are paid for from a token bucket that gains ``budget`` tokens per
+fetch, so they never exceed that fraction of the block-fetch volume.
+"""
+
+import asyncio
+import collections
+import time
+from typing import Awaitable, Callable, Deque, Dict, Optional
+
+from app.config import settings
+
+
+def _consume(task: asyncio.Task):
+    if not task.cancelled():
+        task.exception()   # a losing fetch's failure is not worth reporting
+
+
+class FetchHedger:
+
+    WINDOW = 256          # latency samples kept per DC
+    MIN_SAMPLES = 20      # no hedging until the percentile means something
+    MIN_DELAY = 0.15      # seconds — never hedge faster than this
+    MAX_TOKENS = 10.0     # burst of hedges allowed after a quiet period
+
+    def __init__(self, percentile: float, budget: float):
+        self.percentile = min(max(percentile, 0.5), 0.999)
+        self.budget = max(0.0, budget)
+
+        self._latencies: Dict[int, Deque[float]] = {}
+        self._tokens = self.MAX_TOKENS
+
+        self.fetches = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.over_budget = 0
+
+    # ── Latency tracking ─────────────────────────────────────────
+
+    def _observe(self, dc_id: int, latency: float):
+        window = self._latencies.get(dc_id)
+        if window is None:
+            window = self._latencies[dc_id] = collections.deque(maxlen=self.WINDOW)
+        window.append(latency)
+
+    def threshold(self, dc_id: int) -> Optional[float]:
+        """Delay after which a fetch to *dc_id* is hedged (None: not enough data)."""
+        window = self._latencies.get(dc_id)
+        if not window or len(window) < self.MIN_SAMPLES:
+            return None
+        ordered = sorted(window)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile))
+        return max(self.MIN_DELAY, ordered[index])
+
+    async def _timed(self, dc_id: int, send: Callable[[], Awaitable]):
+        started = time.monotonic()
+        result = await send()
+        self._observe(dc_id, time.monotonic() - started)
+        return result
+
+    # ── Fetching ─────────────────────────────────────────────────
+
+    async def run(self, dc_id: int, send: Callable[[], Awaitable]):
+        """Run *send*, racing a second call against it if it is slow."""
+        self.fetches += 1
+        self._tokens = min(self.MAX_TOKENS, self._tokens + self.budget)
+
+        primary = asyncio.create_task(self._timed(dc_id, send))
+        tasks = [primary]
+        try:
+            delay = self.threshold(dc_id)
+            if delay is not None:
+                await asyncio.wait({primary}, timeout=delay)
+            if delay is None or primary.done():
+                return await primary
+
+            if self._tokens < 1:
+                self.over_budget += 1
+                return await primary
+
+            self._tokens -= 1
+            self.hedged += 1
+            hedge = asyncio.create_task(self._timed(dc_id, send))
+            tasks.append(hedge)
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        return task.result()
+
+            # Both failed — report the original request's error
+            hedge.exception()
+            return primary.result()
+
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                    task.add_done_callback(_consume)
+
+    def stats(self) -> dict:
+        return {
+            "fetches": self.fetches,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "over_budget": self.over_budget,
+            "thresholds_ms": {
+                dc_id: round(delay * 1000, 1)
+                for dc_id in self._latencies
+                if (delay := self.threshold(dc_id)) is not None
+            },
+        }
+
+
+fetch_hedger = FetchHedger(settings.download_hedge_percentile, settings.download_hedge_budget)
@@ -0,0 +1,168 @@
+"""
+HTTP conditional-request and Range helpers for file streaming (RFC 9110).
+
+  - strong ETags derived from the file's content hash
+  - If-None-Match / If-Modified-Since → 304
+  - If-Range → serve the full representation when the validator is stale
+  - Range with several ranges → multipart/byteranges
+"""
+
+import secrets
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import List, Optional, Tuple
+
+MAX_RANGES = 32   # more than this and we serve the whole file instead
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+# ── Validators ───────────────────────────────────────────────────
+
+def make_etag(content_hash: Optional[str], document_id: int) -> str:
+    # Telegram documents are immutable, so the document id is a safe fallback
+    return f'"{content_hash or f"tg-{document_id}"}"'
+
+
+def http_date(value: Optional[datetime]) -> Optional[str]:
+    if value is None:
+        return None
+    return format_datetime(value.replace(microsecond=0), usegmt=True)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # asctime and zone-less dates parse naive; HTTP dates are always GMT
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def _parse_http_date(value: str) -> Optional[datetime]:
+    try:
+        return _as_utc(parsedate_to_datetime(value))
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _etag_list(header: str) -> List[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def _weak_equal(a: str, b: str) -> bool:
+    return a.removeprefix("W/") == b.removeprefix("W/")
+
+
+def is_not_modified(headers, etag: str, last_modified: Optional[datetime]) -> bool:
+    """True when the client's cached copy is current (→ 304)."""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = _etag_list(if_none_match)
+        return "*" in tags or any(_weak_equal(tag, etag) for tag in tags)
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        since = _parse_http_date(if_modified_since)
+        if since is not None:
+            return _as_utc(last_modified).replace(microsecond=0) <= since
+    return False
+
+
+def if_range_matches(headers, etag: str, last_modified: Optional[datetime]) -> bool:
+    """False when If-Range names a stale validator, i.e. the Range must be ignored."""
+    if_range = headers.get("if-range")
+    if if_range is None:
+        return True
+
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        # Strong comparison only
+        return not if_range.startswith("W/") and if_range == etag
+
+    since = _parse_http_date(if_range)
+    return (
+        since is not None
+        and last_modified is not None
+        and _as_utc(last_modified).replace(microsecond=0) == since
+    )
+
+
+# ── Range parsing ────────────────────────────────────────────────
+
+def parse_range_header(header: str, file_size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Parse ``bytes=…`` into sorted, merged inclusive (start, end) pairs.
+    Returns None when the header should be ignored (malformed, non-bytes
+    unit, too many ranges); raises RangeNotSatisfiable when no range
+    overlaps the file.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+
+    items = [item.strip() for item in spec.split(",") if item.strip()]
+    if not items or len(items) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for item in items:
+        first, dash, last = item.partition("-")
+        if not dash:
+            return None
+        first, last = first.strip(), last.strip()
+        if (first and not first.isdigit()) or (last and not last.isdigit()) or not (first or last):
+            return None
+
+        if not first:
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length == 0:
+                continue
+            start, end = max(0, file_size - length), file_size - 1
+        else:
+            start = int(first)
+            if last and int(last) < start:
+                return None
+            end = min(int(last), file_size - 1) if last else file_size - 1
+
+        if start < file_size:
+            ranges.append((start, end))
+
+    if not ranges:
+        raise RangeNotSatisfiable()
+
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+# ── multipart/byteranges ─────────────────────────────────────────
+
+def new_boundary() -> str:
+    return secrets.token_hex(16)
+
+
+def part_header(boundary: str, content_type: str, start: int, end: int, file_size: int) -> bytes:
+    return (
+        f"--{boundary}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Range: bytes {start}-{end}/{file_size}\r\n"
+        f"\r\n"
+    ).encode()
+
+
+def closing_boundary(boundary: str) -> bytes:
+    return f"--{boundary}--\r\n".encode()
+
+
+def multipart_length(boundary: str, content_type: str, ranges: List[Tuple[int, int]], file_size: int) -> int:
+    total = len(closing_boundary(boundary))
+    for start, end in ranges:
+        total += len(part_header(boundary, content_type, start, end, file_size))
+        total += end - start + 1 + 2   # body + trailing CRLF
+    return total
@@ -0,0 +1,65 @@
+"""
+In-process single-flight for block fetches.
+
+Concurrent callers asking for the same key share one running fetch instead
+of each sending its own GetFileRequest.  The fetch runs in its own task so a
+caller that goes away (closed stream, cancelled Range request) does not
+cancel it for the others; it is only cancelled once *every* caller is gone.
+"""
+
+import asyncio
+from typing import Awaitable, Callable
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+
+    def __init__(self):
+        self._flights: dict[str, _Flight] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]):
+        flight = self._flights.get(key)
+        if flight is None:
+            task = asyncio.create_task(fn())
+            flight = _Flight(task)
+            self._flights[key] = flight
+            task.add_done_callback(lambda t, k=key: self._finish(k, t))
+            self.started += 1
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Nobody wants it any more; later callers start a fresh fetch
+                self._flights.pop(key, None)
+                flight.task.cancel()
+
+    def _finish(self, key: str, task: asyncio.Task):
+        flight = self._flights.get(key)
+        if flight is not None and flight.task is task:
+            del self._flights[key]
+        if not task.cancelled():
+            task.exception()   # retrieved here so an orphaned failure is not reported as unhandled
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._flights),
+            "started": self.started,
+            "coalesced": self.coalesced,
+        }
+
+
+block_flights = SingleFlight()
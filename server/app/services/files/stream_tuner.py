@@ -0,0 +1,139 @@
+"""
+Adaptive block size / in-flight depth for one download stream.
+
+The streaming loop reports two timings per block:
+
+  stall — how long it waited for the next block to arrive from Telegram
+  drain — how long the client took to consume the previous block
+
+If the loop mostly stalls, Telegram is the bottleneck and the stream grows
+(bigger blocks first, then more in flight) unless RPC latency is already
+climbing.  If it rarely stalls, the client is the bottleneck and the stream
+shrinks, so a slow mobile client does not hold many 1 MB requests open.
+
+Block sizes stay powers of two between MIN_BLOCK and Telegram's 1 MB limit,
+and a new size only takes effect at an offset aligned to it.  Every decision
+is pushed to the ``stream:tuning`` Redis list for later analysis.
+"""
+
+import json
+import time
+
+from app.logger import logger
+from app.services.redis.RedisService import redis_service
+
+TUNING_LOG_KEY = "stream:tuning"
+TUNING_LOG_LIMIT = 5000
+
+
+class StreamTuner:
+
+    MIN_BLOCK = 128 * 1024
+    MAX_BLOCK = 1024 * 1024      # upload.getFile limit
+    MIN_DEPTH = 1
+    MAX_DEPTH = 8
+    DECISION_INTERVAL = 1.0      # seconds between decisions
+    MIN_SAMPLES = 4              # blocks observed before the first decision
+    GROW_STALL = 0.5             # stall fraction above which the stream grows
+    SHRINK_STALL = 0.1           # stall fraction below which it shrinks
+    LATENCY_CEILING = 2.0        # don't grow while latency exceeds best × this
+    EWMA_ALPHA = 0.3
+
+    def __init__(self, document_id: int, file_size: int, block_size: int, depth: int):
+        self.document_id = document_id
+        self.file_size = file_size
+        self.block_size = min(max(block_size, self.MIN_BLOCK), self.MAX_BLOCK)
+        self.depth = min(max(depth, self.MIN_DEPTH), self.MAX_DEPTH)
+
+        self._stall = 0.0
+        self._drain = 0.0
+        self._bytes = 0
+        self._samples = 0
+        self._latency: float | None = None
+        self._best_latency: float | None = None
+        self._last_decision = time.monotonic()
+        self.decisions = 0
+
+    def block_for(self, offset: int) -> int:
+        """Block size to request at *offset* — shrinks until aligned to the target size."""
+        size = self.block_size
+        while size > self.MIN_BLOCK and offset % size:
+            size //= 2
+        return size
+
+    # ── Measurements ─────────────────────────────────────────────
+
+    def on_fetch(self, latency: float):
+        if self._latency is None:
+            self._latency = latency
+        else:
+            self._latency += self.EWMA_ALPHA * (latency - self._latency)
+        if self._best_latency is None or self._latency < self._best_latency:
+            self._best_latency = self._latency
+
+    def on_block(self, nbytes: int, stall: float, drain: float):
+        self._stall += stall
+        self._drain += drain
+        self._bytes += nbytes
+        self._samples += 1
+
+        now = time.monotonic()
+        if self._samples >= self.MIN_SAMPLES and now - self._last_decision >= self.DECISION_INTERVAL:
+            self._decide(now)
+
+    # ── Decisions ────────────────────────────────────────────────
+
+    def _decide(self, now: float):
+        elapsed = self._stall + self._drain
+        stall_fraction = self._stall / elapsed if elapsed > 0 else 0.0
+        drain_rate = self._bytes / self._drain if self._drain > 0 else None
+        congested = (
+            self._latency is not None
+            and self._best_latency is not None
+            and self._latency > self._best_latency * self.LATENCY_CEILING
+        )
+
+        block, depth, reason = self.block_size, self.depth, None
+        if stall_fraction > self.GROW_STALL and not congested:
+            if block < self.MAX_BLOCK:
+                block, reason = block * 2, "producer-bound: larger blocks"
+            elif depth < self.MAX_DEPTH:
+                depth, reason = depth + 1, "producer-bound: deeper window"
+        elif stall_fraction < self.SHRINK_STALL:
+            if depth > self.MIN_DEPTH:
+                depth, reason = depth - 1, "client-bound: shallower window"
+            elif block > self.MIN_BLOCK:
+                block, reason = block // 2, "client-bound: smaller blocks"
+        elif congested and depth > self.MIN_DEPTH:
+            depth, reason = depth - 1, "latency rising: shallower window"
+
+        if reason:
+            self.block_size, self.depth = block, depth
+            self.decisions += 1
+            self._record({
+                "ts": time.time(),
+                "document_id": self.document_id,
+                "file_size": self.file_size,
+                "block_size": block,
+                "depth": depth,
+                "reason": reason,
+                "stall_fraction": round(stall_fraction, 3),
+                "drain_mbps": round(drain_rate / 1_000_000, 2) if drain_rate else None,
+                "latency_ms": round(self._latency * 1000, 1) if self._latency else None,
+            })
+
+        self._stall = self._drain = 0.0
+        self._bytes = self._samples = 0
+        self._last_decision = now
+
+    @staticmethod
+    def _record(decision: dict):
+        logger.debug(f"Stream tuning | {decision}")
+        try:
+            client = redis_service.get_client()
+            pipe = client.pipeline(transaction=False)
+            pipe.lpush(TUNING_LOG_KEY, json.dumps(decision))
+            pipe.ltrim(TUNING_LOG_KEY, 0, TUNING_LOG_LIMIT - 1)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to record stream tuning decision: {e}")
@@ -0,0 +1,294 @@
+"""
+Storage backends for the background job queue.
+
+RedisStreamBackend (production)
+  jobs:stream            → Redis Stream, consumed through the jobs:workers group
+  jobs:delayed           → ZSET of job payloads scored by the time they become due
+  jobs:active            → ZSET of running job ids scored by lease expiry (global cap)
+  jobs:active:user:{id}  → same, per user (per-user cap)
+  jobs:dead              → capped LIST of jobs that exhausted their attempts
+
+  A delivered message stays in the group's pending list until it is acked.
+  Workers heartbeat long jobs with XCLAIM (resetting the idle time); a message
+  idle for longer than the visibility timeout is re-delivered with XAUTOCLAIM.
+
+InMemoryBackend (tests / single-process development)
+  Same contract backed by plain dicts, so the queue and worker can be
+  exercised without a Redis server.
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import time
+import uuid
+
+from redis.exceptions import ResponseError
+
+from app.logger import logger
+from app.services.redis.RedisService import redis_service
+
+STREAM_KEY = "jobs:stream"
+GROUP_NAME = "jobs:workers"
+DELAYED_KEY = "jobs:delayed"
+ACTIVE_KEY = "jobs:active"
+DEAD_KEY = "jobs:dead"
+DEAD_LETTER_LIMIT = 1000
+
+
+def _user_active_key(user_id) -> str:
+    return f"{ACTIVE_KEY}:user:{user_id}"
+
+
+_PROMOTE_DUE_LUA = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for _, payload in ipairs(due) do
+  redis.call('ZREM', KEYS[1], payload)
+  redis.call('XADD', KEYS[2], '*', 'job', payload)
+end
+return #due
+"""
+
+# KEYS: global leases, user leases
+# ARGV: now, lease_until, job_id, global_cap, user_cap, user_key_ttl
+_ACQUIRE_SLOT_LUA = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+if redis.call('ZSCORE', KEYS[1], ARGV[3]) then
+  return 0
+end
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[4]) then
+  return 0
+end
+if redis.call('ZCARD', KEYS[2]) >= tonumber(ARGV[5]) then
+  return 0
+end
+redis.call('ZADD', KEYS[1], ARGV[2], ARGV[3])
+redis.call('ZADD', KEYS[2], ARGV[2], ARGV[3])
+redis.call('EXPIRE', KEYS[2], tonumber(ARGV[6]))
+return 1
+"""
+
+
+class RedisStreamBackend:
+
+    def __init__(self):
+        self._client = redis_service.get_client()
+        self._promote_script = self._client.register_script(_PROMOTE_DUE_LUA)
+        self._acquire_script = self._client.register_script(_ACQUIRE_SLOT_LUA)
+        self._group_ready = False
+
+    # Redis calls are blocking — keep them off the event loop
+    @staticmethod
+    async def _run(fn, *args, **kwargs):
+        return await asyncio.to_thread(fn, *args, **kwargs)
+
+    def _ensure_group(self):
+        if self._group_ready:
+            return
+        try:
+            self._client.xgroup_create(STREAM_KEY, GROUP_NAME, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    @staticmethod
+    def _decode(entries) -> list[tuple[str, dict]]:
+        return [(msg_id, json.loads(fields["job"])) for msg_id, fields in entries if fields]
+
+    # ── Producing ────────────────────────────────────────────────
+
+    async def enqueue(self, job: dict):
+        await self._run(self._client.xadd, STREAM_KEY, {"job": json.dumps(job)})
+
+    async def enqueue_delayed(self, job: dict, delay: float):
+        await self._run(self._client.zadd, DELAYED_KEY, {json.dumps(job): time.time() + delay})
+
+    async def promote_due(self, limit: int = 100) -> int:
+        return await self._run(
+            self._promote_script, keys=[DELAYED_KEY, STREAM_KEY], args=[time.time(), limit]
+        )
+
+    # ── Consuming ────────────────────────────────────────────────
+
+    async def read(self, consumer: str, count: int, block_ms: int) -> list[tuple[str, dict]]:
+        def _read():
+            self._ensure_group()
+            result = self._client.xreadgroup(
+                GROUP_NAME, consumer, {STREAM_KEY: ">"}, count=count, block=block_ms
+            )
+            return self._decode(result[0][1]) if result else []
+
+        return await self._run(_read)
+
+    async def claim_stale(self, consumer: str, min_idle_ms: int, count: int) -> list[tuple[str, dict]]:
+        def _claim():
+            self._ensure_group()
+            _, entries, *_ = self._client.xautoclaim(
+                STREAM_KEY, GROUP_NAME, consumer, min_idle_ms, start_id="0-0", count=count
+            )
+            return self._decode(entries)
+
+        return await self._run(_claim)
+
+    async def touch(self, msg_id: str, consumer: str, job: dict, lease_seconds: float):
+        """Heartbeat: reset the message idle time and extend the concurrency lease."""
+        def _touch():
+            pipe = self._client.pipeline(transaction=False)
+            pipe.xclaim(STREAM_KEY, GROUP_NAME, consumer, 0, [msg_id], justid=True)
+            lease_until = time.time() + lease_seconds
+            pipe.zadd(ACTIVE_KEY, {job["id"]: lease_until}, xx=True)
+            pipe.zadd(_user_active_key(job["user_id"]), {job["id"]: lease_until}, xx=True)
+            pipe.execute()
+
+        await self._run(_touch)
+
+    async def ack(self, msg_id: str):
+        def _ack():
+            pipe = self._client.pipeline(transaction=False)
+            pipe.xack(STREAM_KEY, GROUP_NAME, msg_id)
+            pipe.xdel(STREAM_KEY, msg_id)
+            pipe.execute()
+
+        await self._run(_ack)
+
+    async def requeue(self, msg_id: str, job: dict, delay: float):
+        """Schedule *job* again after *delay* seconds and drop the current delivery."""
+        def _requeue():
+            pipe = self._client.pipeline(transaction=True)
+            pipe.zadd(DELAYED_KEY, {json.dumps(job): time.time() + delay})
+            pipe.xack(STREAM_KEY, GROUP_NAME, msg_id)
+            pipe.xdel(STREAM_KEY, msg_id)
+            pipe.execute()
+
+        await self._run(_requeue)
+
+    async def bury(self, msg_id: str, job: dict, error: str):
+        def _bury():
+            pipe = self._client.pipeline(transaction=True)
+            pipe.lpush(DEAD_KEY, json.dumps({**job, "error": error, "failed_at": time.time()}))
+            pipe.ltrim(DEAD_KEY, 0, DEAD_LETTER_LIMIT - 1)
+            pipe.xack(STREAM_KEY, GROUP_NAME, msg_id)
+            pipe.xdel(STREAM_KEY, msg_id)
+            pipe.execute()
+
+        await self._run(_bury)
+
+    # ── Concurrency caps ─────────────────────────────────────────
+
+    async def acquire_slot(self, job: dict, global_cap: int, user_cap: int, lease_seconds: float) -> bool:
+        now = time.time()
+        acquired = await self._run(
+            self._acquire_script,
+            keys=[ACTIVE_KEY, _user_active_key(job["user_id"])],
+            args=[now, now + lease_seconds, job["id"], global_cap, user_cap, int(lease_seconds * 2)],
+        )
+        return bool(acquired)
+
+    async def release_slot(self, job: dict):
+        def _release():
+            pipe = self._client.pipeline(transaction=False)
+            pipe.zrem(ACTIVE_KEY, job["id"])
+            pipe.zrem(_user_active_key(job["user_id"]), job["id"])
+            pipe.execute()
+
+        try:
+            await self._run(_release)
+        except Exception as e:
+            # The lease simply expires if this fails
+            logger.warning(f"Failed to release job slot {job['id']}: {e}")
+
+
+class InMemoryBackend:
+
+    def __init__(self):
+        self._ready: list[str] = []                        # msg ids in delivery order
+        self._messages: dict[str, dict] = {}               # msg id → job
+        self._pending: dict[str, tuple[str, float]] = {}   # msg id → (consumer, last touched)
+        self._delayed: list[tuple[float, int, dict]] = []  # heap of (due, seq, job)
+        self._seq = itertools.count()
+        self._active: dict[str, tuple[object, float]] = {} # job id → (user id, lease until)
+        self.dead: list[dict] = []
+        self._changed = asyncio.Event()
+
+    def _add(self, job: dict):
+        msg_id = uuid.uuid4().hex
+        self._messages[msg_id] = job
+        self._ready.append(msg_id)
+        self._changed.set()
+
+    async def enqueue(self, job: dict):
+        self._add(json.loads(json.dumps(job)))
+
+    async def enqueue_delayed(self, job: dict, delay: float):
+        heapq.heappush(self._delayed, (time.time() + delay, next(self._seq), json.loads(json.dumps(job))))
+
+    async def promote_due(self, limit: int = 100) -> int:
+        moved = 0
+        now = time.time()
+        while self._delayed and self._delayed[0][0] <= now and moved < limit:
+            _, _, job = heapq.heappop(self._delayed)
+            self._add(job)
+            moved += 1
+        return moved
+
+    async def read(self, consumer: str, count: int, block_ms: int) -> list[tuple[str, dict]]:
+        if not self._ready:
+            self._changed.clear()
+            try:
+                async with asyncio.timeout(block_ms / 1000):
+                    await self._changed.wait()
+            except TimeoutError:
+                return []
+
+        delivered = []
+        while self._ready and len(delivered) < count:
+            msg_id = self._ready.pop(0)
+            self._pending[msg_id] = (consumer, time.monotonic())
+            delivered.append((msg_id, self._messages[msg_id]))
+        return delivered
+
+    async def claim_stale(self, consumer: str, min_idle_ms: int, count: int) -> list[tuple[str, dict]]:
+        claimed = []
+        now = time.monotonic()
+        for msg_id, (_, touched) in list(self._pending.items()):
+            if len(claimed) >= count:
+                break
+            if (now - touched) * 1000 >= min_idle_ms:
+                self._pending[msg_id] = (consumer, now)
+                claimed.append((msg_id, self._messages[msg_id]))
+        return claimed
+
+    async def touch(self, msg_id: str, consumer: str, job: dict, lease_seconds: float):
+        if msg_id in self._pending:
+            self._pending[msg_id] = (consumer, time.monotonic())
+        if job["id"] in self._active:
+            self._active[job["id"]] = (job["user_id"], time.time() + lease_seconds)
+
+    async def ack(self, msg_id: str):
+        self._pending.pop(msg_id, None)
+        self._messages.pop(msg_id, None)
+
+    async def requeue(self, msg_id: str, job: dict, delay: float):
+        await self.enqueue_delayed(job, delay)
+        await self.ack(msg_id)
+
+    async def bury(self, msg_id: str, job: dict, error: str):
+        self.dead.append({**job, "error": error, "failed_at": time.time()})
+        del self.dead[:-DEAD_LETTER_LIMIT]
+        await self.ack(msg_id)
+
+    async def acquire_slot(self, job: dict, global_cap: int, user_cap: int, lease_seconds: float) -> bool:
+        now = time.time()
+        self._active = {k: v for k, v in self._active.items() if v[1] > now}
+        if job["id"] in self._active or len(self._active) >= global_cap:
+            return False
+        if sum(1 for uid, _ in self._active.values() if uid == job["user_id"]) >= user_cap:
+            return False
+        self._active[job["id"]] = (job["user_id"], now + lease_seconds)
+        return True
+
+    async def release_slot(self, job: dict):
+        self._active.pop(job["id"], None)
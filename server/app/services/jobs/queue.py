@@ -0,0 +1,41 @@
+import time
+import uuid
+
+from app.config import settings
+from app.logger import logger
+from app.services.jobs.backends import InMemoryBackend, RedisStreamBackend
+
+
+class JobType:
+    CHUNKED_UPLOAD = "chunked_upload"     # MinIO → Telegram transfer of a completed upload
+
+
+class JobQueue:
+    """Producer side of the background job queue."""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    async def submit(self, job_type: str, user_id: int, **args) -> str:
+        job = {
+            "id": uuid.uuid4().hex,
+            "type": job_type,
+            "user_id": user_id,
+            "args": args,
+            "attempt": 0,
+            "enqueued_at": time.time(),
+        }
+        await self.backend.enqueue(job)
+        logger.info(f"Job queued | type={job_type} | id={job['id']} | user={user_id}")
+        return job["id"]
+
+
+def create_backend():
+    if settings.job_backend == "memory":
+        return InMemoryBackend()
+    if settings.job_backend == "redis":
+        return RedisStreamBackend()
+    raise ValueError(f"Unknown job backend: {settings.job_backend}")
+
+
+job_queue = JobQueue(create_backend())
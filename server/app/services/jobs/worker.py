@@ -0,0 +1,158 @@
+import asyncio
+import os
+import socket
+
+from app.config import settings
+from app.logger import logger
+from app.services.jobs.queue import JobType, job_queue
+
+
+async def _run_chunked_upload(job: dict, final_attempt: bool):
+    from app.services.telegram.telegram_upload_service import upload_service
+    from app.services.upload.upload_state import upload_state
+
+    upload_id = job["args"]["upload_id"]
+    meta = upload_state.get_meta(upload_id)
+    if not meta:
+        logger.warning(f"Upload {upload_id} expired before its job ran — dropping job {job['id']}")
+        return
+
+    await upload_service.process_chunked_upload(
+        upload_id, meta, job["user_id"], final_attempt=final_attempt
+    )
+
+
+JOB_HANDLERS = {
+    JobType.CHUNKED_UPLOAD: _run_chunked_upload,
+}
+
+
+class JobWorker:
+    """
+    Consumes the job queue.
+
+    Each process runs up to ``job_worker_concurrency`` jobs; before a job starts
+    it must also take a lease under the global and per-user caps, otherwise it
+    is pushed back with a short delay.  Running jobs heartbeat so the message
+    is only re-delivered if the worker running it disappears.
+    """
+
+    CAP_RETRY_DELAY = 2.0   # seconds before a job blocked by a cap is retried
+    READ_BLOCK_MS = 2000
+
+    def __init__(self, backend=None, handlers=None, concurrency: int | None = None):
+        self.backend = backend or job_queue.backend
+        self.handlers = handlers or JOB_HANDLERS
+        self.concurrency = concurrency or settings.job_worker_concurrency
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._tasks: set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+
+    @property
+    def _visibility_ms(self) -> int:
+        return settings.job_visibility_timeout * 1000
+
+    # ── Loop ─────────────────────────────────────────────────────
+
+    async def run(self):
+        logger.info(
+            f"Job worker started | consumer={self.consumer} | backend={settings.job_backend} | "
+            f"concurrency={self.concurrency}"
+        )
+        while not self._stopping.is_set():
+            await self._slots.acquire()
+            try:
+                await self.backend.promote_due()
+                messages = await self.backend.claim_stale(self.consumer, self._visibility_ms, 1)
+                if not messages:
+                    messages = await self.backend.read(self.consumer, 1, self.READ_BLOCK_MS)
+            except asyncio.CancelledError:
+                self._slots.release()
+                raise
+            except Exception as e:
+                self._slots.release()
+                logger.error(f"Job worker poll failed: {e}", exc_info=True)
+                await asyncio.sleep(1)
+                continue
+
+            if not messages:
+                self._slots.release()
+                continue
+
+            for msg_id, job in messages:
+                task = asyncio.create_task(self._execute(msg_id, job))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def stop(self, grace: float = 30):
+        """Stop polling and give running jobs *grace* seconds to finish."""
+        self._stopping.set()
+        if self._tasks:
+            _, still_running = await asyncio.wait(self._tasks, timeout=grace)
+            for task in still_running:
+                # Not acked — re-delivered to another worker after the visibility timeout
+                task.cancel()
+            await asyncio.gather(*still_running, return_exceptions=True)
+
+    # ── Execution ────────────────────────────────────────────────
+
+    async def _heartbeat(self, msg_id: str, job: dict):
+        interval = max(1, settings.job_visibility_timeout / 4)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.backend.touch(msg_id, self.consumer, job, settings.job_visibility_timeout)
+            except Exception as e:
+                logger.warning(f"Job heartbeat failed | id={job['id']}: {e}")
+
+    async def _execute(self, msg_id: str, job: dict):
+        try:
+            handler = self.handlers.get(job.get("type"))
+            if handler is None:
+                logger.error(f"No handler for job type {job.get('type')} — burying {job.get('id')}")
+                await self.backend.bury(msg_id, job, "unknown job type")
+                return
+
+            acquired = await self.backend.acquire_slot(
+                job,
+                settings.job_global_concurrency,
+                settings.job_user_concurrency,
+                settings.job_visibility_timeout,
+            )
+            if not acquired:
+                await self.backend.requeue(msg_id, job, self.CAP_RETRY_DELAY)
+                return
+
+            heartbeat = asyncio.create_task(self._heartbeat(msg_id, job))
+            attempt = job.get("attempt", 0) + 1
+            try:
+                logger.info(f"Job start | type={job['type']} | id={job['id']} | attempt={attempt}")
+                await handler(job, final_attempt=attempt >= settings.job_max_attempts)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt >= settings.job_max_attempts:
+                    logger.error(f"Job failed permanently | id={job['id']} | attempts={attempt}: {e}")
+                    await self.backend.bury(msg_id, job, str(e))
+                else:
+                    delay = min(
+                        settings.job_retry_base_delay * 2 ** (attempt - 1),
+                        settings.job_retry_max_delay,
+                    )
+                    logger.warning(f"Job failed | id={job['id']} | attempt={attempt} | retry in {delay:.0f}s: {e}")
+                    await self.backend.requeue(msg_id, {**job, "attempt": attempt}, delay)
+            else:
+                await self.backend.ack(msg_id)
+                logger.info(f"Job done | type={job['type']} | id={job['id']}")
+            finally:
+                heartbeat.cancel()
+                await self.backend.release_slot(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Backend trouble — leave the message pending so it is re-delivered
+            logger.error(f"Job bookkeeping failed | id={job.get('id')}: {e}", exc_info=True)
+        finally:
+            self._slots.release()
@@ -13,6 +13,7 @@ from app.logger import logger
 from app.models import TelegramSession, User
 from app.repositories.telegram.storage import storage_repository
 from app.services.redis.RedisService import redis_service
+from app.services.telegram.client_manager import telegram_client_manager
 
 
 class TelegramAuthService:
@@ -172,6 +173,9 @@ class TelegramAuthService:
 
             await self.db.commit()
 
+            # Drop any cached session / client built from the previous login
+            await telegram_client_manager.invalidate_session(self.user_id)
+
             return {
                 'success': True,
                 'message': 'Successfully connected to Telegram!',
@@ -0,0 +1,181 @@
+"""
+Telegram CDN downloads.
+
+Popular files are offloaded to CDN DCs.  When a GetFileRequest is sent with
+``cdn_supported=True`` the origin DC may answer with FileCdnRedirect instead
+of bytes; the rest of the file is then fetched from the CDN DC with
+GetCdnFileRequest (https://core.telegram.org/cdn):
+
+  - CDN bytes are AES-256-CTR encrypted with the redirect's key; the IV is
+    the redirect's first 12 IV bytes followed by ``offset / 16`` big-endian
+  - every 128 KB part is checked against a SHA-256 from the origin DC
+    (sent with the redirect, later via GetCdnFileHashesRequest)
+  - CdnFileReuploadNeeded is answered with ReuploadCdnFileRequest on the
+    origin DC, then the CDN request is retried
+
+Redirects are remembered per document so later blocks go straight to the
+CDN.  Any CDN failure drops the redirect and the document is fetched from
+the origin DC for a while.
+"""
+
+import hashlib
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Tuple
+
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from telethon.tl.functions.upload import (
+    GetCdnFileHashesRequest,
+    GetCdnFileRequest,
+    ReuploadCdnFileRequest,
+)
+from telethon.tl.types.upload import CdnFileReuploadNeeded
+
+from app.logger import logger
+from app.services.telegram.sender_pool import DcSenderPool
+
+
+class CdnVerificationError(Exception):
+    pass
+
+
+@dataclass
+class CdnFile:
+    dc_id: int
+    file_token: bytes
+    key: bytes
+    iv: bytes
+    expires_at: float
+    hashes: Dict[int, Tuple[int, bytes]] = field(default_factory=dict)   # offset → (limit, sha256)
+
+    def add_hashes(self, file_hashes):
+        for h in file_hashes:
+            self.hashes[h.offset] = (h.limit, h.hash)
+
+    def decrypt(self, offset: int, data: bytes) -> bytes:
+        iv = self.iv[:12] + (offset // 16).to_bytes(4, "big")
+        decryptor = Cipher(algorithms.AES(self.key), modes.CTR(iv)).decryptor()
+        return decryptor.update(data) + decryptor.finalize()
+
+
+class CdnDownloads:
+    REDIRECT_TTL = 60 * 60     # re-ask the origin DC for a fresh redirect hourly
+    FALLBACK_TTL = 60 * 10     # after a CDN failure, stay on the origin DC this long
+    MAX_ENTRIES = 5_000
+
+    def __init__(self):
+        self._files: Dict[int, CdnFile] = {}
+        self._origin_only: Dict[int, float] = {}
+
+        self.redirects = 0
+        self.cdn_blocks = 0
+        self.reuploads = 0
+        self.fallbacks = 0
+
+    # ── Redirect bookkeeping ─────────────────────────────────────
+
+    def supported(self, document_id: int) -> bool:
+        """False while a document is pinned to its origin DC after a CDN failure."""
+        until = self._origin_only.get(document_id)
+        if until is None:
+            return True
+        if until <= time.monotonic():
+            del self._origin_only[document_id]
+            return True
+        return False
+
+    def get(self, document_id: int) -> CdnFile | None:
+        cdn_file = self._files.get(document_id)
+        if cdn_file is not None and cdn_file.expires_at <= time.monotonic():
+            del self._files[document_id]
+            return None
+        return cdn_file
+
+    def remember(self, document_id: int, redirect) -> CdnFile:
+        if len(self._files) >= self.MAX_ENTRIES:
+            self._files.clear()
+        cdn_file = CdnFile(
+            dc_id=redirect.dc_id,
+            file_token=redirect.file_token,
+            key=redirect.encryption_key,
+            iv=redirect.encryption_iv,
+            expires_at=time.monotonic() + self.REDIRECT_TTL,
+        )
+        cdn_file.add_hashes(redirect.file_hashes)
+        self._files[document_id] = cdn_file
+        self.redirects += 1
+        logger.info(f"🌐 CDN redirect | document={document_id} | CDN DC={redirect.dc_id}")
+        return cdn_file
+
+    def fall_back(self, document_id: int, reason: Exception):
+        self._files.pop(document_id, None)
+        if len(self._origin_only) >= self.MAX_ENTRIES:
+            self._origin_only.clear()
+        self._origin_only[document_id] = time.monotonic() + self.FALLBACK_TTL
+        self.fallbacks += 1
+        logger.warning(f"CDN download failed for document {document_id}, using origin DC: {reason!r}")
+
+    # ── Fetching ─────────────────────────────────────────────────
+
+    async def fetch(
+        self,
+        pool: DcSenderPool,
+        origin_dc: int | None,
+        cdn_file: CdnFile,
+        offset: int,
+        limit: int,
+        used: list | None = None,
+    ) -> bytes:
+        """Fetch, decrypt and verify [offset, offset + limit) from the CDN."""
+        request = GetCdnFileRequest(file_token=cdn_file.file_token, offset=offset, limit=limit)
+        result = await pool.call_cdn(cdn_file.dc_id, request, used)
+
+        if isinstance(result, CdnFileReuploadNeeded):
+            self.reuploads += 1
+            file_hashes = await pool.call(
+                origin_dc,
+                ReuploadCdnFileRequest(file_token=cdn_file.file_token, request_token=result.request_token),
+            )
+            cdn_file.add_hashes(file_hashes)
+            result = await pool.call_cdn(cdn_file.dc_id, request, used)
+            if isinstance(result, CdnFileReuploadNeeded):
+                raise CdnVerificationError("CDN still needs a reupload")
+
+        data = cdn_file.decrypt(offset, result.bytes)
+        await self._verify(pool, origin_dc, cdn_file, offset, data)
+        self.cdn_blocks += 1
+        return data
+
+    async def _verify(self, pool: DcSenderPool, origin_dc: int | None, cdn_file: CdnFile, offset: int, data: bytes):
+        end = offset + len(data)
+        position = offset
+        while position < end:
+            if position not in cdn_file.hashes:
+                file_hashes = await pool.call(
+                    origin_dc,
+                    GetCdnFileHashesRequest(file_token=cdn_file.file_token, offset=position),
+                )
+                cdn_file.add_hashes(file_hashes)
+                if position not in cdn_file.hashes:
+                    raise CdnVerificationError(f"no CDN hash for offset {position}")
+
+            limit, expected = cdn_file.hashes[position]
+            if limit <= 0:
+                raise CdnVerificationError(f"empty CDN hash range at offset {position}")
+            part = data[position - offset:position - offset + limit]
+            if hashlib.sha256(part).digest() != expected:
+                raise CdnVerificationError(f"CDN part at offset {position} failed its hash check")
+            position += limit
+
+    def stats(self) -> dict:
+        return {
+            "redirected_documents": len(self._files),
+            "origin_only_documents": len(self._origin_only),
+            "redirects": self.redirects,
+            "cdn_blocks": self.cdn_blocks,
+            "reuploads": self.reuploads,
+            "fallbacks": self.fallbacks,
+        }
+
+
+cdn_downloads = CdnDownloads()
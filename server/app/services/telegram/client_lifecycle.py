@@ -0,0 +1,187 @@
+"""
+Background lifecycle of cached Telegram clients.
+
+Without it a client is only checked when a request needs it, so the first
+request after a dropped connection pays for the reconnect, and the first
+request after a restart pays for connect + is_user_authorized.  Every
+``telegram_client_check_interval`` seconds the lifecycle task:
+
+  - disconnects clients unused for ``telegram_client_idle_timeout``
+  - pings the idle rest through their account scheduler and reconnects any
+    that don't answer
+  - records recent activity in ``TelegramSession.last_connected``
+
+The process that owns clients for background work — the gateway, else a
+dedicated job worker — connects the clients of the most recently active
+users (by ``last_connected``) on startup so their first request finds a
+warm connection.  API workers never pre-warm, and a Redis lock keeps
+several job workers from all doing it.
+"""
+
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+from telethon.tl.functions import PingRequest
+
+from app.config import settings
+from app.db.db import AsyncSessionLocal
+from app.logger import logger
+from app.models import TelegramSession
+from app.services.redis.RedisService import redis_service
+from app.services.telegram.client_manager import telegram_client_manager
+from app.services.telegram.gateway.client import telegram_gateway
+from app.services.telegram.rpc_scheduler import Priority
+
+
+class ClientLifecycle:
+
+    PING_TIMEOUT = 10        # seconds before a ping counts as failed
+    PREWARM_CONCURRENCY = 4  # clients connected at once during pre-warming
+    PREWARM_LOCK_KEY = "telegram_prewarm_lock"
+    PREWARM_LOCK_TTL = 300   # seconds — one pre-warm per deployment wave
+
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+        self.evicted = 0
+        self.reconnected = 0
+        self.prewarmed = 0
+
+    def start(self, prewarm: bool = False):
+        if telegram_gateway.enabled:
+            # Clients live in the gateway process, which runs its own lifecycle
+            return
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(prewarm))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self._record_activity()
+
+    async def _run(self, prewarm: bool):
+        if prewarm:
+            try:
+                await self.prewarm()
+            except Exception as e:
+                logger.error(f"Telegram client pre-warming failed: {e}")
+
+        while True:
+            await asyncio.sleep(settings.telegram_client_check_interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Telegram client sweep failed: {e}")
+
+    # ── Sweep ────────────────────────────────────────────────────
+
+    async def sweep(self):
+        for user_id, client in telegram_client_manager.cached_clients():
+            if telegram_client_manager.idle_seconds(user_id) > settings.telegram_client_idle_timeout:
+                await telegram_client_manager.close_client(user_id, reason="Idle-evicted")
+                self.evicted += 1
+                continue
+            await self._check(user_id, client)
+
+        await self._record_activity()
+
+    async def _check(self, user_id: int, client):
+        scheduler = telegram_client_manager.get_scheduler(user_id)
+        if not scheduler.idle or scheduler.flood_wait_remaining():
+            # RPCs in flight exercise the connection; a paused account must stay quiet
+            return
+
+        try:
+            if client.is_connected():
+                async with scheduler.slot(Priority.INTERACTIVE):
+                    await asyncio.wait_for(
+                        client(PingRequest(ping_id=random.getrandbits(63))),
+                        self.PING_TIMEOUT,
+                    )
+                return
+        except Exception as e:
+            logger.warning(f"Ping failed for Telegram client of user {user_id}: {e!r}")
+
+        try:
+            await client.disconnect()
+            await client.connect()
+            self.reconnected += 1
+            logger.info(f"🔁 Reconnected Telegram client for user {user_id}")
+        except Exception as e:
+            # Leave it to the next get_client to build a fresh one
+            logger.error(f"Reconnect failed for user {user_id}: {e}")
+            await telegram_client_manager.close_client(user_id, reason="Dropped unreachable")
+
+    async def _record_activity(self):
+        user_ids = telegram_client_manager.drain_touched()
+        if not user_ids:
+            return
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(TelegramSession)
+                    .where(TelegramSession.user_id.in_(user_ids))
+                    .values(last_connected=datetime.now(timezone.utc))
+                )
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"Failed to record Telegram activity for {len(user_ids)} users: {e}")
+
+    # ── Pre-warming ──────────────────────────────────────────────
+
+    async def prewarm(self):
+        if settings.telegram_prewarm_clients <= 0:
+            return
+        lock = redis_service.get_client().set(
+            self.PREWARM_LOCK_KEY, "1", nx=True, ex=self.PREWARM_LOCK_TTL
+        )
+        if not lock:
+            logger.info("Telegram clients are being pre-warmed by another process")
+            return
+
+        since = datetime.now(timezone.utc) - timedelta(seconds=settings.telegram_prewarm_window)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(TelegramSession.user_id)
+                .where(TelegramSession.is_active.is_(True))
+                .where(TelegramSession.last_connected >= since)
+                .order_by(TelegramSession.last_connected.desc())
+                .limit(settings.telegram_prewarm_clients)
+            )
+            user_ids = list(result.scalars())
+
+        if not user_ids:
+            return
+
+        started = asyncio.get_running_loop().time()
+        slots = asyncio.Semaphore(self.PREWARM_CONCURRENCY)
+
+        async def warm(user_id: int):
+            async with slots:
+                try:
+                    async with AsyncSessionLocal() as db:
+                        # Pre-warming is not user activity
+                        await telegram_client_manager.get_client(user_id, db, record_activity=False)
+                    self.prewarmed += 1
+                except Exception as e:
+                    logger.warning(f"Could not pre-warm Telegram client for user {user_id}: {e}")
+
+        await asyncio.gather(*(warm(user_id) for user_id in user_ids))
+        logger.info(
+            f"🔥 Pre-warmed {self.prewarmed}/{len(user_ids)} Telegram clients "
+            f"in {asyncio.get_running_loop().time() - started:.1f}s"
+        )
+
+    def stats(self) -> dict:
+        return {
+            "cached_clients": len(telegram_client_manager.cached_clients()),
+            "evicted": self.evicted,
+            "reconnected": self.reconnected,
+            "prewarmed": self.prewarmed,
+        }
+
+
+client_lifecycle = ClientLifecycle()
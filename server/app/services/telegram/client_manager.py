@@ -1,18 +1,19 @@
 import asyncio
+import time
 from collections import OrderedDict
-from typing import Dict
+from typing import Dict, List, Set, Tuple
 
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from telethon import TelegramClient
 from telethon.network import ConnectionTcpAbridged
-from telethon.sessions import StringSession
 
 from app.config import settings
-from app.helpers.encryption import encryption
 from app.logger import logger
-from app.models import TelegramSession
-from app.services.redis.RedisService import redis_service
+from app.services.telegram.gateway.client import RemoteTelegramClient, telegram_gateway
+from app.services.telegram.persistent_session import RedisSession
+from app.services.telegram.rpc_scheduler import AccountScheduler
+from app.services.telegram.sender_pool import DcSenderPool
+from app.services.telegram.session_cache import session_cache
 from fastapi import HTTPException
 from starlette import status
 
@@ -43,11 +44,21 @@ class TelegramClientManager:
         # user_id -> asyncio.Lock
         self._user_locks: Dict[int, asyncio.Lock] = {}
 
-    # ------------------ helpers ------------------
+        # user_id -> transfer senders (extra home-DC and exported foreign-DC connections)
+        self._sender_pools: Dict[int, DcSenderPool] = {}
 
-    @staticmethod
-    def _get_redis_key(user_id: int) -> str:
-        return f"telegram_auth_{user_id}"
+        # user_id -> RPC scheduler shared by every transfer on the account
+        self._schedulers: Dict[int, AccountScheduler] = {}
+
+        # user_id -> monotonic time of the last get_client, plus the users
+        # seen since the lifecycle task last recorded activity
+        self._last_used: Dict[int, float] = {}
+        self._touched: Set[int] = set()
+
+        # Closes of replaced sender pools still in progress
+        self._closing: Set[asyncio.Task] = set()
+
+    # ------------------ helpers ------------------
 
     def _get_user_lock(self, user_id: int) -> asyncio.Lock:
         if user_id not in self._user_locks:
@@ -58,43 +69,115 @@ class TelegramClientManager:
 
     async def _evict_if_needed(self):
         while len(self._local_cache) > self.MAX_CLIENTS:
-            evicted_user_id, client = self._local_cache.popitem(last=False)
+            evicted_user_id = next(iter(self._local_cache))
+            await self.close_client(evicted_user_id, reason="LRU-evicted")
+
+    async def close_client(self, user_id: int, reason: str):
+        """Disconnect a cached client, keeping its session for the next get_client."""
+        client = self._local_cache.pop(user_id, None)
+        await self._close_sender_pool(user_id)
+        if client:
             try:
                 if client.is_connected():
                     await client.disconnect()
-                logger.info(f"LRU-evicted Telegram client for user {evicted_user_id}")
+                logger.info(f"{reason} Telegram client for user {user_id}")
             except Exception as e:
-                logger.error(
-                    f"Error disconnecting evicted client for user {evicted_user_id}: {e}"
-                )
+                logger.error(f"Error disconnecting client for user {user_id}: {e}")
 
-            # Cleanup lock
-            self._user_locks.pop(evicted_user_id, None)
+        # Cleanup lock
+        self._user_locks.pop(user_id, None)
+        self._last_used.pop(user_id, None)
+
+        # Keep a busy or paused scheduler — its FloodWait still applies
+        scheduler = self._schedulers.get(user_id)
+        if scheduler and scheduler.idle and not scheduler.flood_wait_remaining():
+            self._schedulers.pop(user_id, None)
+
+    # ------------------ activity ------------------
+
+    def _touch(self, user_id: int, record_activity: bool = True):
+        self._last_used[user_id] = time.monotonic()
+        if record_activity:
+            self._touched.add(user_id)
+
+    def drain_touched(self) -> Set[int]:
+        """Users that asked for a client since the last call."""
+        touched, self._touched = self._touched, set()
+        return touched
+
+    def idle_seconds(self, user_id: int) -> float:
+        """Time since the user's client was last requested or its scheduler last ran an RPC."""
+        last = self._last_used.get(user_id, 0.0)
+        scheduler = self._schedulers.get(user_id)
+        if scheduler is not None:
+            if not scheduler.idle:
+                return 0.0
+            last = max(last, scheduler.last_active)
+        return time.monotonic() - last
+
+    def cached_clients(self) -> List[Tuple[int, TelegramClient]]:
+        return list(self._local_cache.items())
 
     # ------------------ invalidation ------------------
 
     async def _invalidate_client(self, user_id: int):
+        """Drop the client *and* the shared cached session, e.g. after a re-login."""
+        session_cache.invalidate(user_id)
+        await self.close_client(user_id, reason="Invalidated")
+
+    # ------------------ DC sender pools ------------------
+
+    def get_sender_pool(self, user_id: int, client: TelegramClient) -> DcSenderPool:
+        """Per-client pool of transfer senders: extra home-DC connections plus exported ones to other DCs."""
+        if isinstance(client, RemoteTelegramClient):
+            return client.sender_pool
+        pool = self._sender_pools.get(user_id)
+        if pool is None or pool.client is not client:
+            if pool is not None:
+                # The client was replaced; its senders are useless now
+                task = asyncio.create_task(self._close_pool(user_id, pool))
+                self._closing.add(task)
+                task.add_done_callback(self._closing.discard)
+            pool = DcSenderPool(client, settings.telegram_dc_senders, settings.telegram_transfer_senders)
+            self._sender_pools[user_id] = pool
+        return pool
+
+    async def _close_sender_pool(self, user_id: int):
+        pool = self._sender_pools.pop(user_id, None)
+        if pool:
+            await self._close_pool(user_id, pool)
+
+    @staticmethod
+    async def _close_pool(user_id: int, pool: DcSenderPool):
         try:
-            redis_service.delete_key(self._get_redis_key(user_id))
+            await pool.close()
         except Exception as e:
-            logger.warning(f"Failed to delete Redis key for user {user_id}: {e}")
+            logger.warning(f"Error closing DC senders for user {user_id}: {e}")
 
-        client = self._local_cache.pop(user_id, None)
-        if client:
-            try:
-                if client.is_connected():
-                    await client.disconnect()
-                logger.info(f"Invalidated Telegram client for user {user_id}")
-            except Exception as e:
-                logger.error(f"Error disconnecting client for user {user_id}: {e}")
+    # ------------------ RPC scheduling ------------------
 
-        self._user_locks.pop(user_id, None)
+    def get_scheduler(self, user_id: int) -> AccountScheduler:
+        """
+        Per-account RPC scheduler. Outlives the client itself so a FloodWait
+        pause survives a reconnect.
+        """
+        scheduler = self._schedulers.get(user_id)
+        if scheduler is None:
+            scheduler = AccountScheduler(settings.telegram_account_concurrency)
+            self._schedulers[user_id] = scheduler
+        return scheduler
+
+    def get_scheduler_stats(self, user_id: int) -> dict | None:
+        scheduler = self._schedulers.get(user_id)
+        return scheduler.stats() if scheduler else None
 
     # ------------------ client creation ------------------
 
     async def create_client(self, user_id: int, session_string: str) -> TelegramClient:
         client = TelegramClient(
-            StringSession(session_string),
+            # Entities and update state survive across clients, so a cold client
+            # can reach the storage channel without resolving it first
+            RedisSession(user_id, session_string),
             settings.telegram_api_id,
             settings.telegram_api_hash,
             connection=ConnectionTcpAbridged,
@@ -111,7 +194,7 @@ class TelegramClientManager:
 
             if not await client.is_user_authorized():
                 await client.disconnect()
-                redis_service.delete_key(self._get_redis_key(user_id))
+                session_cache.invalidate(user_id)
                 raise TelegramUnauthorizedError("Telegram session is not authorized")
 
             logger.info(
@@ -132,36 +215,7 @@ class TelegramClientManager:
     # ------------------ session resolution ------------------
 
     async def _get_session_string(self, user_id: int, db: AsyncSession) -> str | None:
-        redis_data = redis_service.get_key(self._get_redis_key(user_id), as_json=True)
-        if redis_data:
-            return redis_data.get("client_session")
-
-        logger.debug(f"Session for user {user_id} not in Redis, fetching from DB")
-        return await self._fetch_session_from_db(user_id, db)
-
-    async def _fetch_session_from_db(
-            self, user_id: int, db: AsyncSession
-    ) -> str | None:
-        result = await db.execute(
-            select(TelegramSession).where(TelegramSession.user_id == user_id)
-        )
-
-        record = result.scalars().one_or_none()
-        if not record:
-            return None
-
-        session_string = None
-
-        if record.encrypted_session:
-            session_string = encryption.decrypt(record.encrypted_session)
-
-        redis_service.set_key(
-            self._get_redis_key(user_id),
-            {"session_string": session_string},
-            ttl=1800,
-        )
-
-        return session_string
+        return await session_cache.get(user_id, db)
 
     async def has_session(self, user_id: int, db: AsyncSession) -> bool:
         """Check if a user has a Telegram session without throwing an error"""
@@ -174,7 +228,15 @@ class TelegramClientManager:
 
     # ------------------ public API ------------------
 
-    async def get_client(self, user_id: int, db: AsyncSession) -> TelegramClient:
+    async def get_client(self, user_id: int, db: AsyncSession, record_activity: bool = True) -> TelegramClient:
+        """
+        The user's connected client.  *record_activity* False (pre-warming)
+        keeps it out of the activity recorded in ``last_connected``.
+        """
+        if telegram_gateway.enabled:
+            # The gateway process owns every client; this worker only proxies
+            return telegram_gateway.client(user_id)
+
         # Fast path (update LRU)
         if user_id in self._local_cache:
             client = self._local_cache[user_id]
@@ -185,11 +247,13 @@ class TelegramClientManager:
                     await client.connect()
                 except Exception as e:
                     logger.error(f"Failed to reconnect cached client for user {user_id}: {e}")
-                    # If reconnection fails, invalidate and create a new client
-                    await self._invalidate_client(user_id)
-                    return await self.get_client(user_id, db)
+                    # If reconnection fails, drop it and create a new client
+                    # from the still-valid cached session
+                    await self.close_client(user_id, reason="Dropped unreachable")
+                    return await self.get_client(user_id, db, record_activity)
 
             self._local_cache.move_to_end(user_id)
+            self._touch(user_id, record_activity)
             return client
 
         lock = self._get_user_lock(user_id)
@@ -208,12 +272,13 @@ class TelegramClientManager:
                                 await client.connect()
                             except Exception as e:
                                 logger.error(f"Failed to reconnect cached client for user {user_id}: {e}")
-                                await self._invalidate_client(user_id)
+                                await self.close_client(user_id, reason="Dropped unreachable")
                                 # Recursive call to create new client
-                                return await self.get_client(user_id, db)
+                                return await self.get_client(user_id, db, record_activity)
 
 
                         self._local_cache.move_to_end(user_id)
+                        self._touch(user_id, record_activity)
                         return client
 
                     session_string = await self._get_session_string(user_id, db)
@@ -227,6 +292,7 @@ class TelegramClientManager:
                     client = await self.create_client(user_id, session_string)
 
                     self._local_cache[user_id] = client
+                    self._touch(user_id, record_activity)
                     await self._evict_if_needed()
 
                     return client
@@ -237,13 +303,22 @@ class TelegramClientManager:
             logger.error(f"Error getting Telegram client for user {user_id}: {e}")
             raise
 
+    async def invalidate_session(self, user_id: int):
+        """Forget the cached session and client, e.g. after the account was re-linked."""
+        await self._invalidate_client(user_id)
+        # Access hashes belong to the previous account
+        RedisSession.clear(user_id)
+
     async def refresh_session(self, user_id: int, db: AsyncSession) -> TelegramClient:
         await self._invalidate_client(user_id)
         return await self.get_client(user_id, db)
 
     async def clean_up_all_local_cache(self):
+        # Shutdown: other processes keep using the shared session cache
         for user_id in list(self._local_cache.keys()):
-            await self._invalidate_client(user_id)
+            await self.close_client(user_id, reason="Closed")
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
 
 
 telegram_client_manager = TelegramClientManager()
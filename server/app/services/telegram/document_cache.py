@@ -0,0 +1,117 @@
+"""
+Cache of Telegram document locations per UserFile.
+
+Streaming only needs the document's id / access_hash / file_reference / dc_id
+(plus size and mime type for the response headers), but resolving them costs
+a full ``get_messages`` RPC.  They are cached in two tiers:
+
+  process → dict of UserFile id → (expires_at, TelegramDocument), PROCESS_TTL
+  Redis   → doc_location:{file_id} JSON, REDIS_TTL
+
+A FILE_REFERENCE_EXPIRED error while downloading invalidates both tiers and
+the location is fetched again from the message.
+"""
+
+import base64
+import json
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional, Tuple
+
+from telethon.tl.types import InputDocumentFileLocation
+
+from app.logger import logger
+from app.services.redis.RedisService import redis_service
+
+
+@dataclass
+class TelegramDocument:
+    id: int
+    access_hash: int
+    file_reference: bytes
+    dc_id: int
+    size: int
+    mime_type: Optional[str]
+    name: Optional[str]
+
+    @classmethod
+    def from_message(cls, message) -> "TelegramDocument":
+        document = message.document
+        return cls(
+            id=document.id,
+            access_hash=document.access_hash,
+            file_reference=document.file_reference,
+            dc_id=document.dc_id,
+            size=message.file.size,
+            mime_type=message.file.mime_type,
+            name=getattr(message.file, "name", None),
+        )
+
+    def location(self) -> InputDocumentFileLocation:
+        return InputDocumentFileLocation(
+            id=self.id,
+            access_hash=self.access_hash,
+            file_reference=self.file_reference,
+            thumb_size="",
+        )
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data["file_reference"] = base64.b64encode(self.file_reference).decode()
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw: str) -> "TelegramDocument":
+        data = json.loads(raw)
+        data["file_reference"] = base64.b64decode(data["file_reference"])
+        return cls(**data)
+
+
+class DocumentLocationCache:
+    PROCESS_TTL = 60          # seconds — short, so refreshed references propagate between workers
+    REDIS_TTL = 60 * 60 * 6   # 6 hours
+    MAX_LOCAL_ENTRIES = 10_000
+
+    def __init__(self):
+        self._local: Dict[int, Tuple[float, TelegramDocument]] = {}
+
+    @staticmethod
+    def _redis_key(file_id: int) -> str:
+        return f"doc_location:{file_id}"
+
+    def get(self, file_id: int) -> Optional[TelegramDocument]:
+        entry = self._local.get(file_id)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+
+        raw = redis_service.get_key(self._redis_key(file_id))
+        if not raw:
+            return None
+        try:
+            document = TelegramDocument.from_json(raw)
+        except (ValueError, TypeError, KeyError) as e:
+            logger.warning(f"Discarding malformed document location for file {file_id}: {e}")
+            self.invalidate(file_id)
+            return None
+
+        self._remember(file_id, document)
+        return document
+
+    def set(self, file_id: int, document: TelegramDocument):
+        self._remember(file_id, document)
+        redis_service.set_key(self._redis_key(file_id), document.to_json(), ttl=self.REDIS_TTL)
+
+    def invalidate(self, file_id: int):
+        self._local.pop(file_id, None)
+        redis_service.delete_key(self._redis_key(file_id))
+
+    def _remember(self, file_id: int, document: TelegramDocument):
+        if len(self._local) >= self.MAX_LOCAL_ENTRIES:
+            now = time.monotonic()
+            self._local = {k: v for k, v in self._local.items() if v[0] > now}
+            if len(self._local) >= self.MAX_LOCAL_ENTRIES:
+                self._local.clear()
+        self._local[file_id] = (time.monotonic() + self.PROCESS_TTL, document)
+
+
+document_cache = DocumentLocationCache()
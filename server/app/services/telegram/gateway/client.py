@@ -0,0 +1,205 @@
+"""
+API-worker side of the Telegram gateway.
+
+With ``telegram_gateway_socket`` set, workers hold no MTProto connections of
+their own: ``telegram_client_manager.get_client`` hands out a
+RemoteTelegramClient whose RPCs are forwarded over one multiplexed Unix
+socket connection to the gateway process (``python -m app.gateway``).
+
+Only the surface the app uses is proxied:
+
+  client(request)                      → any raw TL request
+  sender_pool.call / call_cdn          → part uploads and block fetches over the
+                                         gateway's transfer senders / CDN
+  send_file / get_messages / delete_messages
+
+The priority and cost of the scheduler slot held by the caller go along with
+every call, so the gateway schedules all workers' traffic for an account
+together.  A cancelled call is cancelled in the gateway too.
+"""
+
+import asyncio
+import itertools
+from typing import Dict, Optional, Tuple
+
+from telethon.tl.types import PeerChannel
+
+from app.config import settings
+from app.logger import logger
+from app.services.telegram.gateway.protocol import (
+    GatewayError,
+    encode_frame,
+    pack_tl,
+    raise_error,
+    read_frame,
+    unpack_tl,
+)
+from app.services.telegram.rpc_scheduler import Priority, current_slot
+
+
+class GatewayConnection:
+
+    def __init__(self, path: str, max_in_flight: int):
+        self.path = path
+        self._slots = asyncio.Semaphore(max(1, max_in_flight))
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._connect_lock = asyncio.Lock()
+
+    async def _ensure_connected(self) -> asyncio.StreamWriter:
+        if self._writer is not None and not self._writer.is_closing():
+            return self._writer
+        async with self._connect_lock:
+            if self._writer is None or self._writer.is_closing():
+                try:
+                    reader, writer = await asyncio.open_unix_connection(self.path)
+                except OSError as e:
+                    raise GatewayError(f"Telegram gateway unreachable at {self.path}: {e}") from e
+                self._writer = writer
+                self._reader_task = asyncio.create_task(self._read_loop(reader, writer))
+                logger.info(f"🔗 Connected to Telegram gateway at {self.path}")
+        return self._writer
+
+    async def _read_loop(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                header, body = await read_frame(reader)
+                future = self._pending.get(header.pop("id", None))
+                if future is not None and not future.done():
+                    future.set_result((header, body))
+        except asyncio.CancelledError:
+            raise
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError) as e:
+            logger.warning(f"Telegram gateway connection lost: {e!r}")
+        finally:
+            writer.close()
+            if self._writer is writer:
+                self._writer = None
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(GatewayError("Telegram gateway connection lost"))
+
+    async def request(self, header: dict, body: bytes = b"") -> Tuple[dict, bytes]:
+        async with self._slots:
+            writer = await self._ensure_connected()
+            request_id = next(self._ids)
+            future = asyncio.get_running_loop().create_future()
+            self._pending[request_id] = future
+            try:
+                writer.write(encode_frame({**header, "id": request_id}, body))
+                await writer.drain()
+                return await future
+            finally:
+                self._pending.pop(request_id, None)
+                if (future.cancelled() or not future.done()) and not writer.is_closing():
+                    # Caller went away — stop the gateway working on it
+                    writer.write(encode_frame({"op": "cancel", "id": request_id}))
+
+    async def close(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class RemoteSenderPool:
+    """Stands in for DcSenderPool; the gateway picks the actual sender."""
+
+    def __init__(self, client: "RemoteTelegramClient"):
+        self.client = client
+
+    async def call(self, dc_id: int | None, request, used: list | None = None):
+        return await self.client._invoke(request, dc_id=dc_id, pooled=True)
+
+    async def call_cdn(self, dc_id: int, request, used: list | None = None):
+        return await self.client._invoke(request, dc_id=dc_id, pooled=True, cdn=True)
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {}
+
+
+class RemoteTelegramClient:
+
+    def __init__(self, connection: GatewayConnection, user_id: int):
+        self.connection = connection
+        self.user_id = user_id
+        self.sender_pool = RemoteSenderPool(self)
+
+    async def _request(self, op: str, body: bytes = b"", request=None, **args):
+        priority, nbytes = current_slot.get() or (Priority.INTERACTIVE, 0)
+        header, result = await self.connection.request(
+            {"op": op, "user_id": self.user_id, "priority": priority, "nbytes": nbytes, **args},
+            body,
+        )
+        if header.get("error"):
+            raise_error(header, request)
+        return header, unpack_tl(result)
+
+    async def _invoke(self, request, dc_id: int | None = None, pooled: bool = False, cdn: bool = False):
+        _, result = await self._request(
+            "invoke", bytes(request), request, dc_id=dc_id, pooled=pooled, cdn=cdn
+        )
+        return result
+
+    # ── TelegramClient surface ───────────────────────────────────
+
+    async def __call__(self, request, ordered: bool = False):
+        return await self._invoke(request)
+
+    async def send_file(self, entity: PeerChannel, file, force_document: bool = True):
+        _, message = await self._request("send_file", pack_tl(file), chat_id=entity.channel_id)
+        return message
+
+    async def get_messages(self, entity: PeerChannel, ids: int):
+        _, message = await self._request("get_messages", chat_id=entity.channel_id, message_id=ids)
+        return message
+
+    async def delete_messages(self, entity: PeerChannel, message_ids, revoke: bool = True):
+        _, affected = await self._request(
+            "delete_messages",
+            chat_id=entity.channel_id,
+            message_ids=list(message_ids),
+            revoke=revoke,
+        )
+        return affected
+
+    def is_connected(self) -> bool:
+        return True
+
+    async def disconnect(self):
+        pass
+
+
+class TelegramGateway:
+
+    def __init__(self):
+        # Set in the gateway process itself, which owns the real clients
+        self.serving = False
+        self._connection: Optional[GatewayConnection] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(settings.telegram_gateway_socket) and not self.serving
+
+    def client(self, user_id: int) -> RemoteTelegramClient:
+        if self._connection is None:
+            self._connection = GatewayConnection(
+                settings.telegram_gateway_socket,
+                settings.telegram_gateway_max_inflight,
+            )
+        return RemoteTelegramClient(self._connection, user_id)
+
+    async def close(self):
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+
+telegram_gateway = TelegramGateway()
@@ -0,0 +1,104 @@
+"""
+Wire format between API workers and the Telegram gateway.
+
+Every message is one frame on the Unix socket:
+
+  uint32 big-endian  total length of header + body
+  uint32 big-endian  header length
+  header             UTF-8 JSON — request id, operation, arguments / status
+  body               raw bytes — a serialised TL object (request or result)
+
+Requests and responses carry the same ``id`` so one connection multiplexes
+many concurrent calls.  Telethon errors are sent by class name and rebuilt on
+the worker side, so callers see the same exceptions (FloodWaitError,
+FileReferenceExpiredError, …) as with a local client.
+"""
+
+import asyncio
+import json
+import struct
+from typing import Any, Tuple
+
+from fastapi import HTTPException
+from telethon import errors
+from telethon.errors import rpcerrorlist
+from telethon.extensions import BinaryReader
+
+MAX_FRAME = 16 * 1024 * 1024   # a 1 MB block plus headers fits many times over
+
+_LENGTHS = struct.Struct(">II")
+_BOOL_TRUE = 0x997275b5
+_BOOL_FALSE = 0xbc799737
+_VECTOR = 0x1cb5c415
+
+
+class GatewayError(ConnectionError):
+    """The gateway is unreachable or failed outside of Telegram itself."""
+
+
+# ── Framing ──────────────────────────────────────────────────────
+
+def encode_frame(header: dict, body: bytes = b"") -> bytes:
+    raw_header = json.dumps(header, separators=(",", ":")).encode()
+    return _LENGTHS.pack(len(raw_header) + len(body), len(raw_header)) + raw_header + body
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[dict, bytes]:
+    total, header_length = _LENGTHS.unpack(await reader.readexactly(_LENGTHS.size))
+    if total > MAX_FRAME or header_length > total:
+        raise GatewayError(f"Malformed gateway frame ({total} bytes, header {header_length})")
+    payload = await reader.readexactly(total)
+    return json.loads(payload[:header_length]), payload[header_length:]
+
+
+# ── TL values ────────────────────────────────────────────────────
+
+def pack_tl(value: Any) -> bytes:
+    if value is None:
+        return b""
+    if isinstance(value, bool):
+        return struct.pack("<I", _BOOL_TRUE if value else _BOOL_FALSE)
+    if isinstance(value, list):
+        return struct.pack("<Ii", _VECTOR, len(value)) + b"".join(pack_tl(item) for item in value)
+    return bytes(value)
+
+
+def unpack_tl(data: bytes) -> Any:
+    if not data:
+        return None
+    return BinaryReader(data).tgread_object()
+
+
+# ── Errors ───────────────────────────────────────────────────────
+
+def error_header(e: Exception) -> dict:
+    if isinstance(e, errors.RPCError):
+        # Captured values (FloodWait seconds, FILE_MIGRATE dc, …) are the only ints
+        capture = next(
+            (v for k, v in vars(e).items() if k not in ("request", "code") and isinstance(v, int)),
+            None,
+        )
+        return {
+            "error": "rpc",
+            "name": type(e).__name__,
+            "code": e.code,
+            "message": e.message,
+            "capture": capture,
+        }
+    if isinstance(e, HTTPException):
+        return {"error": "http", "status": e.status_code, "detail": e.detail}
+    return {"error": "gateway", "detail": repr(e)}
+
+
+def raise_error(header: dict, request=None):
+    kind = header["error"]
+    if kind == "rpc":
+        cls = getattr(rpcerrorlist, header["name"], None)
+        if cls is None or not issubclass(cls, errors.RPCError):
+            raise errors.RPCError(request, header["message"], header["code"])
+        if header.get("capture") is not None:
+            raise cls(request=request, capture=header["capture"])
+        raise cls(request=request)
+    if kind == "http":
+        raise HTTPException(status_code=header["status"], detail=header["detail"])
+    raise GatewayError(header.get("detail") or "Telegram gateway error")
@@ -0,0 +1,158 @@
+"""
+Gateway side: owns every user's TelegramClient for all API workers.
+
+Each worker keeps one connection to the socket and multiplexes its calls
+over it.  Calls run concurrently as tasks, up to ``max_in_flight`` per
+connection; past that the gateway stops reading from the socket, so a busy
+worker is slowed down by the kernel buffer instead of queueing without
+bound.  All RPCs for an account go through that account's AccountScheduler
+here, in one process, so priorities and FloodWait pauses hold across
+workers.
+"""
+
+import asyncio
+import os
+from typing import Dict
+
+from telethon.tl.types import PeerChannel
+
+from app.db.db import AsyncSessionLocal
+from app.logger import logger
+from app.services.telegram.client_manager import telegram_client_manager
+from app.services.telegram.gateway.protocol import (
+    encode_frame,
+    error_header,
+    pack_tl,
+    read_frame,
+    unpack_tl,
+)
+from app.services.telegram.rpc_scheduler import Priority
+
+
+class GatewayServer:
+
+    OPERATIONS = {"invoke", "send_file", "get_messages", "delete_messages"}
+
+    def __init__(self, path: str, max_in_flight: int):
+        self.path = path
+        self.max_in_flight = max(1, max_in_flight)
+        self._server: asyncio.AbstractServer | None = None
+        self._connections: Dict[asyncio.StreamWriter, asyncio.Task] = {}
+        self.served = 0
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)   # stale socket from a previous run
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+        os.chmod(self.path, 0o660)
+        logger.info(f"🚪 Telegram gateway listening on {self.path}")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            handlers = list(self._connections.values())
+            for writer in list(self._connections):
+                writer.close()   # ends each connection's read loop
+            await asyncio.gather(*handlers, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    # ── Connections ──────────────────────────────────────────────
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections[writer] = asyncio.current_task()
+        slots = asyncio.Semaphore(self.max_in_flight)
+        tasks: Dict[int, asyncio.Task] = {}
+
+        try:
+            while True:
+                try:
+                    header, body = await read_frame(reader)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+
+                request_id = header.get("id")
+                if header.get("op") == "cancel":
+                    task = tasks.get(request_id)
+                    if task is not None:
+                        task.cancel()
+                    continue
+
+                # Backpressure: don't read the next frame until a slot frees up
+                await slots.acquire()
+                task = asyncio.create_task(self._serve(header, body, writer))
+                tasks[request_id] = task
+                task.add_done_callback(lambda _, rid=request_id: (tasks.pop(rid, None), slots.release()))
+
+        except Exception as e:
+            logger.error(f"Telegram gateway connection failed: {e!r}")
+
+        finally:
+            self._connections.pop(writer, None)
+            pending = list(tasks.values())
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            writer.close()
+
+    async def _serve(self, header: dict, body: bytes, writer: asyncio.StreamWriter):
+        request_id = header.get("id")
+        try:
+            result = await self._dispatch(header, body)
+            frame = encode_frame({"id": request_id}, pack_tl(result))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            frame = encode_frame({"id": request_id, **error_header(e)})
+
+        self.served += 1
+        if writer.is_closing():
+            return
+        try:
+            writer.write(frame)
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    # ── Operations ───────────────────────────────────────────────
+
+    @staticmethod
+    async def _get_client(user_id: int):
+        async with AsyncSessionLocal() as db:
+            return await telegram_client_manager.get_client(user_id, db)
+
+    async def _dispatch(self, header: dict, body: bytes):
+        op = header.get("op")
+        if op not in self.OPERATIONS:
+            raise ValueError(f"Unknown gateway operation {op!r}")
+
+        user_id = header["user_id"]
+        client = await self._get_client(user_id)
+        scheduler = telegram_client_manager.get_scheduler(user_id)
+        priority = header.get("priority") or Priority.INTERACTIVE
+        if priority not in scheduler.WEIGHTS:
+            priority = Priority.INTERACTIVE
+
+        async with scheduler.slot(priority, header.get("nbytes") or 0):
+            if op == "invoke":
+                request = unpack_tl(body)
+                dc_id = header.get("dc_id")
+                if not header.get("pooled"):
+                    return await client(request)
+                pool = telegram_client_manager.get_sender_pool(user_id, client)
+                if header.get("cdn"):
+                    return await pool.call_cdn(dc_id, request)
+                return await pool.call(dc_id, request)
+
+            entity = PeerChannel(int(header["chat_id"]))
+
+            if op == "send_file":
+                return await client.send_file(entity, unpack_tl(body), force_document=True)
+
+            if op == "get_messages":
+                return await client.get_messages(entity, ids=header["message_id"])
+
+            # delete_messages
+            return await client.delete_messages(entity, header["message_ids"], revoke=header.get("revoke", True))
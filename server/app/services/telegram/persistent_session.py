@@ -0,0 +1,98 @@
+"""
+Telethon session that keeps entities and update state in Redis.
+
+A plain StringSession only carries the DC and auth key, so every new client
+starts without the access hash of the user's storage channel and has to
+resolve it (GetChannelsRequest) before its first send_file / get_messages.
+RedisSession loads what earlier clients learned when it is built and writes
+back anything new:
+
+  telegram_entities:{user_id}      id → [access_hash, username, phone, name]
+  telegram_update_state:{user_id}  entity id → [pts, qts, date, seq, unread_count]
+
+The auth key still comes from the encrypted session string.  Access hashes
+are only valid for the account that saw them, so both keys are dropped when
+the account is re-linked.
+"""
+
+from datetime import datetime, timezone
+
+from telethon.sessions import StringSession
+from telethon.tl.types.updates import State
+
+from app.logger import logger
+from app.services.redis.RedisService import redis_service
+
+
+class RedisSession(StringSession):
+
+    def __init__(self, user_id: int, session_string: str):
+        super().__init__(session_string)
+        self.user_id = user_id
+        self._load()
+
+    @staticmethod
+    def _entities_key(user_id: int) -> str:
+        return f"telegram_entities:{user_id}"
+
+    @staticmethod
+    def _update_state_key(user_id: int) -> str:
+        return f"telegram_update_state:{user_id}"
+
+    def _load(self):
+        for entity_id, row in redis_service.hgetall(self._entities_key(self.user_id), as_json=True).items():
+            try:
+                self._entities.add((int(entity_id), *row))
+            except (TypeError, ValueError):
+                continue
+
+        for entity_id, row in redis_service.hgetall(self._update_state_key(self.user_id), as_json=True).items():
+            try:
+                pts, qts, date, seq, unread_count = row
+                self._update_states[int(entity_id)] = State(
+                    pts=pts,
+                    qts=qts,
+                    date=datetime.fromtimestamp(date, tz=timezone.utc),
+                    seq=seq,
+                    unread_count=unread_count,
+                )
+            except (TypeError, ValueError):
+                continue
+
+        if self._entities:
+            logger.debug(f"Loaded {len(self._entities)} Telegram entities for user {self.user_id}")
+
+    # ── Session overrides ────────────────────────────────────────
+
+    def process_entities(self, tlo):
+        # Called after every RPC; only rows that are new or changed hit Redis
+        rows = set(self._entities_to_rows(tlo)) - self._entities
+        if not rows:
+            return
+
+        known = {row[0]: row for row in self._entities}
+        for row in rows:
+            entity_id, entity_hash = row[0], row[1]
+            if entity_hash is None:
+                continue
+            stale = known.get(entity_id)
+            if stale is not None:
+                self._entities.discard(stale)
+            self._entities.add(row)
+            redis_service.hset(self._entities_key(self.user_id), str(entity_id), list(row[1:]))
+
+    def set_update_state(self, entity_id, state):
+        super().set_update_state(entity_id, state)
+        redis_service.hset(
+            self._update_state_key(self.user_id),
+            str(entity_id),
+            [state.pts, state.qts, state.date.timestamp(), state.seq, state.unread_count],
+        )
+
+    # ── Invalidation ─────────────────────────────────────────────
+
+    @classmethod
+    def clear(cls, user_id: int):
+        """Forget everything stored for the user's previous account."""
+        redis_service.delete_key(cls._entities_key(user_id))
+        redis_service.delete_key(cls._update_state_key(user_id))
@@ -0,0 +1,167 @@
+"""
+Per-Telegram-account RPC scheduler.
+
+Every RPC a user's client sends (upload parts, download blocks, message
+lookups) takes a slot here first.  Slots are shared by three priority
+classes and handed out by start-time fair queuing, weighted per class:
+
+  interactive → in-browser viewing / share-link playback / metadata lookups
+  download    → attachment downloads
+  upload      → background part uploads
+
+so a bulk download or upload can use the whole account when nothing else is
+running, but a video preview still gets most of the slots as soon as it asks.
+The cost of a request is its payload size, so a 1 MB block weighs more than a
+128 KB one.
+
+A FloodWait seen by any request pauses dispatch for the whole account until
+the wait is over, instead of every caller discovering it separately.
+
+The priority and cost of the slot being held are published in
+``current_slot`` so a proxy (the Telegram gateway) can forward them.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from telethon.errors import FloodWaitError
+
+from app.logger import logger
+
+
+# (priority, nbytes) of the slot held by the running task, if any
+current_slot: ContextVar[Optional[Tuple[str, int]]] = ContextVar("current_slot", default=None)
+
+
+class Priority:
+    INTERACTIVE = "interactive"
+    DOWNLOAD = "download"
+    UPLOAD = "upload"
+
+
+class AccountScheduler:
+
+    WEIGHTS = {
+        Priority.INTERACTIVE: 8,
+        Priority.DOWNLOAD: 2,
+        Priority.UPLOAD: 1,
+    }
+    COST_UNIT = 128 * 1024   # bytes per unit of cost; metadata RPCs cost one unit
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self.in_use = 0
+
+        self._heap: list = []                      # (start_tag, seq, priority, future)
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._finish: Dict[str, float] = {p: 0.0 for p in self.WEIGHTS}
+        self._paused_until = 0.0
+        self._wakeup: asyncio.TimerHandle | None = None
+
+        self._in_flight: Dict[str, int] = {p: 0 for p in self.WEIGHTS}
+        self._dispatched: Dict[str, int] = {p: 0 for p in self.WEIGHTS}
+        self._flood_waits = 0
+        self.last_active = time.monotonic()
+
+    @property
+    def idle(self) -> bool:
+        return self.in_use == 0 and not self._heap
+
+    # ── Slots ────────────────────────────────────────────────────
+
+    @asynccontextmanager
+    async def slot(self, priority: str, nbytes: int = 0):
+        """Hold one account slot for the duration of an RPC."""
+        await self._acquire(priority, nbytes)
+        token = current_slot.set((priority, nbytes))
+        try:
+            yield
+        except FloodWaitError as e:
+            self.on_flood_wait(e.seconds)
+            raise
+        finally:
+            current_slot.reset(token)
+            self._release(priority)
+
+    async def _acquire(self, priority: str, nbytes: int):
+        cost = max(1, nbytes // self.COST_UNIT)
+        start = max(self._virtual_time, self._finish[priority])
+        self._finish[priority] = start + cost / self.WEIGHTS[priority]
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (start, next(self._seq), priority, future))
+        self._dispatch()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as we were cancelled — hand the slot back
+                self._release(priority)
+            raise
+
+    def _release(self, priority: str):
+        self.last_active = time.monotonic()
+        self.in_use -= 1
+        self._in_flight[priority] -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            if self._wakeup is None:
+                self._wakeup = asyncio.get_running_loop().call_later(delay, self._resume)
+            return
+
+        while self.in_use < self.capacity and self._heap:
+            start, _, priority, future = heapq.heappop(self._heap)
+            if future.done():   # waiter cancelled while queued
+                continue
+            self._virtual_time = max(self._virtual_time, start)
+            self.in_use += 1
+            self._in_flight[priority] += 1
+            self._dispatched[priority] += 1
+            future.set_result(None)
+
+    def _resume(self):
+        self._wakeup = None
+        self._dispatch()
+
+    # ── FloodWait ────────────────────────────────────────────────
+
+    def on_flood_wait(self, seconds: int):
+        until = time.monotonic() + seconds + 1
+        if until <= self._paused_until:
+            return
+        self._flood_waits += 1
+        self._paused_until = until
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+        logger.warning(f"⏳ FloodWait {seconds}s — pausing all RPCs for this account")
+
+    def flood_wait_remaining(self) -> float:
+        return max(0.0, self._paused_until - time.monotonic())
+
+    # ── Reporting ────────────────────────────────────────────────
+
+    def stats(self) -> dict:
+        queued = {p: 0 for p in self.WEIGHTS}
+        for _, _, priority, future in self._heap:
+            if not future.done():
+                queued[priority] += 1
+        return {
+            "capacity": self.capacity,
+            "in_use": self.in_use,
+            "in_flight": dict(self._in_flight),
+            "queued": queued,
+            "dispatched": dict(self._dispatched),
+            "flood_waits": self._flood_waits,
+            "paused_for": round(self.flood_wait_remaining(), 1),
+        }
@@ -0,0 +1,194 @@
+"""
+Pooled MTProto senders for a client's file transfers.
+
+Telegram stores each document on one DC (``document.dc_id``).  Requests for
+it sent through the client's main connection either get proxied or fail with
+FILE_MIGRATE, so downloads go to the file's own DC instead: the pool keeps up
+to ``size`` MTProto senders per DC, each authorised with an exported auth
+key, and hands out the least busy one so parallel block fetches spread over
+several connections.  A hedged duplicate of a request is steered to a
+different sender than the original.
+
+Requests for the home DC — part uploads and blocks of local files — go over
+up to ``home_size`` extra connections to the home DC instead of queueing
+behind everything else on the client's single socket.  These reuse (a copy
+of) the session's auth key in their own MTProto session, so they need no
+authorisation export; with ``home_size`` 0 the client itself is used.  CDN
+DCs get their own pooled senders: they hold no user authorisation, just a
+fresh auth key negotiated with the CDN's public RSA key.
+"""
+
+import asyncio
+from typing import Dict, List
+
+from telethon import TelegramClient, errors
+from telethon.crypto import AuthKey, rsa
+from telethon.network import MTProtoSender
+from telethon.tl.alltlobjects import LAYER
+from telethon.tl.functions import InvokeWithLayerRequest
+from telethon.tl.functions.help import GetCdnConfigRequest, GetConfigRequest
+
+from app.logger import logger
+
+
+class _PooledSender:
+    __slots__ = ("sender", "in_flight")
+
+    def __init__(self, sender):
+        self.sender = sender
+        self.in_flight = 0
+
+
+class DcSenderPool:
+
+    def __init__(self, client: TelegramClient, size: int, home_size: int = 0):
+        self.client = client
+        self.size = max(1, size)
+        self.home_size = max(0, home_size)
+        self._senders: Dict[int, List[_PooledSender]] = {}
+        self._cdn_senders: Dict[int, List[_PooledSender]] = {}
+        self._cdn_keys_loaded = False
+        # Creating a sender mutates the client's init request — one at a time
+        self._create_lock = asyncio.Lock()
+
+    @property
+    def home_dc(self) -> int:
+        return self.client.session.dc_id
+
+    # ── Senders ──────────────────────────────────────────────────
+
+    def _pick(self, senders: List[_PooledSender], avoid: list, limit: int) -> _PooledSender | None:
+        """An idle sender, else the least busy one once the pool is full."""
+        candidates = [s for s in senders if s not in avoid] or senders
+        idle = [s for s in candidates if s.in_flight == 0]
+        if idle:
+            return idle[0]
+        if len(senders) >= limit:
+            return min(candidates, key=lambda s: s.in_flight)
+        return None
+
+    async def _create_home_sender(self):
+        session = self.client.session
+        # A copy, so a sender that loses its key can't wipe the client's
+        sender = MTProtoSender(AuthKey(session.auth_key.key), loggers=self.client._log)
+        await sender.connect(self.client._connection(
+            session.server_address,
+            session.port,
+            session.dc_id,
+            loggers=self.client._log,
+            proxy=self.client._proxy,
+            local_addr=self.client._local_addr,
+        ))
+        # New MTProto session on an authorised key: only initConnection is needed
+        self.client._init_request.query = GetConfigRequest()
+        await sender.send(InvokeWithLayerRequest(LAYER, self.client._init_request))
+        return sender
+
+    async def _create_cdn_sender(self, dc_id: int):
+        if not self._cdn_keys_loaded:
+            # Telethon only registers the key of the first CDN DC it meets
+            config = await self.client(GetCdnConfigRequest())
+            for key in config.public_keys:
+                rsa.add_key(key.public_key, old=False)
+            self._cdn_keys_loaded = True
+
+        dc = await self.client._get_dc(dc_id, cdn=True)
+        sender = MTProtoSender(None, loggers=self.client._log)
+        await sender.connect(self.client._connection(
+            dc.ip_address,
+            dc.port,
+            dc.id,
+            loggers=self.client._log,
+            proxy=self.client._proxy,
+            local_addr=self.client._local_addr,
+        ))
+        return sender
+
+    async def _acquire(self, dc_id: int, avoid: list, cdn: bool = False) -> _PooledSender:
+        pools = self._cdn_senders if cdn else self._senders
+        senders = pools.setdefault(dc_id, [])
+        home = not cdn and dc_id == self.home_dc
+        limit = self.home_size if home else self.size
+        pooled = self._pick(senders, avoid, limit)
+        if pooled is None:
+            async with self._create_lock:
+                pooled = self._pick(senders, avoid, limit)
+                if pooled is None:
+                    if cdn:
+                        sender = await self._create_cdn_sender(dc_id)
+                    elif home:
+                        sender = await self._create_home_sender()
+                    else:
+                        sender = await self.client._create_exported_sender(dc_id)
+                    sender.dc_id = dc_id
+                    pooled = _PooledSender(sender)
+                    senders.append(pooled)
+                    kind = "CDN" if cdn else "Home" if home else "Exported"
+                    logger.info(f"🔌 {kind} sender opened | DC={dc_id} | pool={len(senders)}/{limit}")
+
+        pooled.in_flight += 1
+        return pooled
+
+    async def _discard(self, dc_id: int, pooled: _PooledSender, cdn: bool = False):
+        senders = (self._cdn_senders if cdn else self._senders).get(dc_id, [])
+        if pooled in senders:
+            senders.remove(pooled)
+        try:
+            await pooled.sender.disconnect()
+        except Exception:
+            pass
+
+    # ── Requests ─────────────────────────────────────────────────
+
+    async def call(self, dc_id: int | None, request, used: list | None = None):
+        """
+        Send transfer *request* to *dc_id* (home DC when None or equal).
+        Senders in *used* are avoided when another is available, and the one
+        chosen is appended to it.
+        """
+        if dc_id is None or dc_id == self.home_dc:
+            try:
+                if not self.home_size:
+                    return await self.client(request)
+                return await self._send(self.home_dc, request, used, cdn=False)
+            except errors.FileMigrateError as e:
+                dc_id = e.new_dc
+
+        return await self._send(dc_id, request, used, cdn=False)
+
+    async def call_cdn(self, dc_id: int, request, used: list | None = None):
+        """Send *request* (GetCdnFileRequest) to CDN DC *dc_id*."""
+        return await self._send(dc_id, request, used, cdn=True)
+
+    async def _send(self, dc_id: int, request, used: list | None, cdn: bool):
+        if used is None:
+            used = []
+        pooled = await self._acquire(dc_id, used, cdn)
+        used.append(pooled)
+        try:
+            return await self.client._call(pooled.sender, request)
+        except (ConnectionError, errors.AuthKeyUnregisteredError):
+            # Broken or de-authorised connection — replace it on the next call
+            await self._discard(dc_id, pooled, cdn)
+            raise
+        finally:
+            pooled.in_flight -= 1
+
+    async def close(self):
+        for cdn, pools in ((False, self._senders), (True, self._cdn_senders)):
+            for dc_id, senders in list(pools.items()):
+                for pooled in list(senders):
+                    await self._discard(dc_id, pooled, cdn)
+            pools.clear()
+
+    def stats(self) -> dict:
+        stats = {
+            f"home-{dc_id}" if dc_id == self.home_dc else dc_id: {
+                "senders": len(senders),
+                "in_flight": sum(s.in_flight for s in senders),
+            }
+            for dc_id, senders in self._senders.items()
+        }
+        for dc_id, senders in self._cdn_senders.items():
+            stats[f"cdn-{dc_id}"] = {"senders": len(senders), "in_flight": sum(s.in_flight for s in senders)}
+        return stats
@@ -0,0 +1,95 @@
+"""
+Cache of users' Telegram session strings.
+
+Building a client needs the user's StringSession, which lives encrypted in
+``telegram_sessions``.  It is cached in two tiers so a client recreated after
+an eviction or restart needs no database round trip:
+
+  process → user_id → (expires_at, session string), PROCESS_TTL
+  Redis   → telegram_session:{user_id} holding the *encrypted* blob, REDIS_TTL
+
+The Redis key is separate from ``telegram_auth_{user_id}``, which holds the
+login flow's pending phone-code state.  Re-login, refresh and unauthorized
+sessions invalidate both tiers.
+"""
+
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.helpers.encryption import encryption
+from app.logger import logger
+from app.models import TelegramSession
+from app.services.redis.RedisService import redis_service
+
+
+class SessionCache:
+    PROCESS_TTL = 60           # seconds — short, so other workers see invalidations quickly
+    REDIS_TTL = 60 * 60 * 6    # 6 hours
+
+    def __init__(self):
+        self._local: Dict[int, Tuple[float, str]] = {}
+
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.db_loads = 0
+        self.misses = 0
+
+    @staticmethod
+    def _redis_key(user_id: int) -> str:
+        return f"telegram_session:{user_id}"
+
+    async def get(self, user_id: int, db: AsyncSession) -> Optional[str]:
+        entry = self._local.get(user_id)
+        if entry and entry[0] > time.monotonic():
+            self.local_hits += 1
+            return entry[1]
+
+        encrypted = redis_service.get_key(self._redis_key(user_id))
+        if encrypted:
+            try:
+                session_string = encryption.decrypt(encrypted)
+                self.redis_hits += 1
+                self._remember(user_id, session_string)
+                return session_string
+            except Exception as e:
+                logger.warning(f"Discarding undecryptable cached session for user {user_id}: {e}")
+                self.invalidate(user_id)
+
+        logger.debug(f"Session for user {user_id} not cached, fetching from DB")
+        result = await db.execute(
+            select(TelegramSession.encrypted_session).where(TelegramSession.user_id == user_id)
+        )
+        encrypted = result.scalar_one_or_none()
+        if not encrypted:
+            self.misses += 1
+            return None
+
+        self.db_loads += 1
+        session_string = encryption.decrypt(encrypted)
+        redis_service.set_key(self._redis_key(user_id), encrypted, ttl=self.REDIS_TTL)
+        self._remember(user_id, session_string)
+        return session_string
+
+    def invalidate(self, user_id: int):
+        self._local.pop(user_id, None)
+        redis_service.delete_key(self._redis_key(user_id))
+
+    def _remember(self, user_id: int, session_string: str):
+        self._local[user_id] = (time.monotonic() + self.PROCESS_TTL, session_string)
+
+    def stats(self) -> dict:
+        lookups = self.local_hits + self.redis_hits + self.db_loads + self.misses
+        return {
+            "local_entries": len(self._local),
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "db_loads": self.db_loads,
+            "misses": self.misses,
+            "hit_ratio": round((self.local_hits + self.redis_hits) / lookups, 3) if lookups else None,
+        }
+
+
+session_cache = SessionCache()
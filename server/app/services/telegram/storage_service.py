@@ -5,6 +5,8 @@ from app.logger import logger
 from app.models import UserFile
 from app.repositories.telegram.storage import storage_repository
 from app.services.telegram.client_manager import telegram_client_manager
+from app.services.telegram.document_cache import TelegramDocument, document_cache
+from app.services.telegram.rpc_scheduler import AccountScheduler, Priority
 
 
 class TelegramStorageService:
@@ -13,6 +15,7 @@ class TelegramStorageService:
     async def remove_files_from_channel(user_id: int, db: AsyncSession, file_hashes: list):
         try:
             client = await telegram_client_manager.get_client(user_id, db)
+            scheduler = telegram_client_manager.get_scheduler(user_id)
             results = []
 
             for file_hash in file_hashes:
@@ -26,11 +29,12 @@ class TelegramStorageService:
 
                 entity = PeerChannel(int(existing_file.telegram_chat_id))
 
-                result = await client.delete_messages(
-                    entity,
-                    [existing_file.telegram_message_id],
-                    revoke=True
-                )
+                async with scheduler.slot(Priority.INTERACTIVE):
+                    result = await client.delete_messages(
+                        entity,
+                        [existing_file.telegram_message_id],
+                        revoke=True
+                    )
 
                 results.append(result)
 
@@ -56,11 +60,59 @@ class TelegramStorageService:
 
         entity = PeerChannel(int(file.telegram_chat_id))
 
-        message = await client.get_messages(entity, ids=file.telegram_message_id)
+        async with telegram_client_manager.get_scheduler(file.user_id).slot(Priority.INTERACTIVE):
+            message = await client.get_messages(entity, ids=file.telegram_message_id)
 
         if not message or not message.file:
             raise HTTPException(status_code=404, detail="Telegram file missing")
 
         return client, file, message
 
+    @staticmethod
+    async def get_telegram_document(file_id: int, user_id: int | None, db):
+        """
+        Like get_telegram_message, but only resolves the document location —
+        served from the location cache when possible (no get_messages RPC).
+        """
+        file = await db.get(UserFile, file_id)
+
+        if not file:
+            raise HTTPException(status_code=404, detail="File not found")
+
+        # Only enforce ownership when user_id exists
+        if user_id is not None and file.user_id != user_id:
+            raise HTTPException(status_code=403, detail="Access denied")
+
+        client = await telegram_client_manager.get_client(file.user_id, db)
+
+        document = document_cache.get(file_id)
+        if document is None:
+            document = await TelegramStorageService.fetch_telegram_document(
+                client, file_id, file.telegram_chat_id, file.telegram_message_id,
+                telegram_client_manager.get_scheduler(file.user_id),
+            )
+
+        return client, file, document
+
+    @staticmethod
+    async def fetch_telegram_document(
+        client,
+        file_id: int,
+        chat_id,
+        message_id: int,
+        scheduler: AccountScheduler,
+    ) -> TelegramDocument:
+        """Resolve the document from its message and refresh the location cache."""
+        entity = PeerChannel(int(chat_id))
+        async with scheduler.slot(Priority.INTERACTIVE):
+            message = await client.get_messages(entity, ids=message_id)
+
+        if not message or not message.file or not message.document:
+            document_cache.invalidate(file_id)
+            raise HTTPException(status_code=404, detail="Telegram file missing")
+
+        document = TelegramDocument.from_message(message)
+        document_cache.set(file_id, document)
+        return document
+
 tele_storage_service = TelegramStorageService()
\ No newline at end of file
@@ -1,13 +1,16 @@
 import asyncio
+import hashlib
 import math
 import os
 import time
+from contextlib import aclosing
+from functools import partial
 from typing import BinaryIO
 
 from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from telethon import TelegramClient
-from telethon.errors import FloodWaitError
+from telethon.errors import FloodWaitError, TimedOutError
 from telethon.tl.functions.channels import CreateChannelRequest
 from telethon.tl.functions.upload import SaveBigFilePartRequest
 from telethon.tl.types import (InputFileBig,PeerChannel)
@@ -16,6 +19,12 @@ from app.models import UserStorageChannel, UserFile
 from app.repositories.telegram.storage import storage_repository
 from app.services.telegram.client_manager import telegram_client_manager
 from app.services.telegram.file_manager import file_manager
+from app.services.telegram.gateway.client import RemoteTelegramClient
+from app.services.telegram.rpc_scheduler import AccountScheduler, Priority
+from app.services.telegram.sender_pool import DcSenderPool
+from app.services.telegram.upload_concurrency import AdaptiveConcurrency
+from app.services.upload.memory_budget import upload_memory_budget
+from app.services.upload.part_relay import MinioPartRelay
 from app.storage import storage
 from app.db.db import AsyncSessionLocal
 
@@ -23,9 +32,13 @@ from app.db.db import AsyncSessionLocal
 class TelegramUploadService:
 
     SAFE_PART_SIZE_KB = 1024
+    PART_SIZE = 512 * 1024        # Telegram maximum part size
     DEFAULT_WORKERS = 4
-    UPLOAD_CONCURRENCY = 12       # Concurrent Telegram part uploads
+    UPLOAD_CONCURRENCY = 12       # Starting window for concurrent Telegram part uploads
+    MIN_UPLOAD_CONCURRENCY = 2    # AIMD floor after FloodWait / timeouts
+    MAX_UPLOAD_CONCURRENCY = 32   # AIMD ceiling on fast links
     PART_DELAY_SECONDS = 0.0      # No artificial delay — rely on semaphore + retry backoff
+    ACK_FLUSH_PARTS = 16          # Acknowledged parts batched per Redis bitmap write
 
     @staticmethod
     async def _create_storage_location(user_id, db):
@@ -84,7 +97,7 @@ class TelegramUploadService:
 
         client = await telegram_client_manager.get_client(user_id, db)
 
-        if not isinstance(client, TelegramClient):
+        if not isinstance(client, (TelegramClient, RemoteTelegramClient)):
             raise TypeError(f"Invalid client type: {type(client)}")
 
         logger.info(
@@ -99,13 +112,19 @@ class TelegramUploadService:
             entity = PeerChannel(int(chat_id))
 
             upload_start = time.time()
+            controller = TelegramUploadService._new_controller()
 
             message = await TelegramUploadService._ultra_fast_upload(
-            client, file, file_name, file_size, entity)
+                client, file, file_name, file_size, entity,
+                telegram_client_manager.get_scheduler(user_id),
+                telegram_client_manager.get_sender_pool(user_id, client),
+                controller=controller,
+            )
 
-            workers_used = TelegramUploadService.UPLOAD_CONCURRENCY
+            transfer = controller.stats()
+            workers_used = transfer["window"]
 
-            part_size_used = 512
+            part_size_used = TelegramUploadService.PART_SIZE // 1024
 
             upload_time = time.time() - upload_start
             total_time = time.time() - total_start
@@ -113,7 +132,8 @@ class TelegramUploadService:
 
             logger.info(
                 f"🎉 Upload complete | time={upload_time:.2f}s | "
-                f"speed={speed:.2f}MB/s | workers={workers_used} | part_size={part_size_used}KB"
+                f"speed={speed:.2f}MB/s | workers={workers_used} | peak={transfer['peak_window']} | "
+                f"flood_waits={transfer['flood_waits']} | part_size={part_size_used}KB"
             )
 
 
@@ -137,59 +157,205 @@ class TelegramUploadService:
             logger.error(f"⏳ Rate limited | wait={e.seconds}s")
             raise Exception(f"Rate limited. Wait {e.seconds} seconds.")
 
+        except HTTPException:
+            raise
+
         except Exception as e:
             logger.error(f"Upload failed: {e}", exc_info=True)
             raise
 
 
+    @staticmethod
+    def _new_controller() -> AdaptiveConcurrency:
+        return AdaptiveConcurrency(
+            initial=TelegramUploadService.UPLOAD_CONCURRENCY,
+            minimum=TelegramUploadService.MIN_UPLOAD_CONCURRENCY,
+            maximum=TelegramUploadService.MAX_UPLOAD_CONCURRENCY,
+        )
+
+    @staticmethod
+    async def _save_part(
+        sender_pool: DcSenderPool,
+        file_id: int,
+        index: int,
+        total_parts: int,
+        data,
+        controller: AdaptiveConcurrency,
+        scheduler: AccountScheduler,
+    ):
+        """
+        Send one SaveBigFilePartRequest inside a controller slot and an
+        account-scheduler slot, retrying FloodWait and transient errors and
+        feeding the outcome back to the controller.  Each attempt goes to a
+        different home-DC connection of *sender_pool* when it has one.
+        """
+        retries = 5
+        # Telethon only serialises ``bytes``; relay parts arrive as
+        # memoryview slices and are materialised just for the request.
+        payload = data if isinstance(data, bytes) else bytes(data)
+        used = []
+
+        for attempt in range(retries):
+            await controller.acquire()
+            try:
+                async with scheduler.slot(Priority.UPLOAD, len(payload)):
+                    started = time.monotonic()
+                    await sender_pool.call(
+                        None,
+                        SaveBigFilePartRequest(
+                            file_id=file_id,
+                            file_part=index,
+                            file_total_parts=total_parts,
+                            bytes=payload
+                        ),
+                        used,
+                    )
+                await controller.on_success(time.monotonic() - started, len(payload))
+                return
+            except FloodWaitError as e:
+                await controller.on_flood_wait(e.seconds)
+                logger.warning(
+                    f"⏳ Flood wait on part {index}, pausing uploads {e.seconds + 1}s "
+                    f"(attempt {attempt + 1}/{retries}) | window→{controller.limit}"
+                )
+            except (TimeoutError, TimedOutError) as e:
+                await controller.on_timeout()
+                if attempt == retries - 1:
+                    raise
+                logger.warning(f"Part {index} timed out ({e}), window→{controller.limit}")
+            except Exception:
+                if attempt == retries - 1:
+                    raise
+                await asyncio.sleep(0.5 * (attempt + 1))
+            finally:
+                await controller.release()
+
+        raise Exception(f"Part {index} was still flood-limited after {retries} attempts")
+
+    @staticmethod
+    async def _upload_parts(
+        sender_pool: DcSenderPool,
+        file_id: int,
+        total_parts: int,
+        parts,
+        controller: AdaptiveConcurrency,
+        scheduler: AccountScheduler,
+        on_part_uploaded=None,
+    ):
+        """
+        Drain *parts* — an async iterator of ``(index, data, release)`` — into
+        Telegram workers whose effective width is set by *controller*.
+
+        The hand-off queue holds at most UPLOAD_CONCURRENCY parts, so one upload
+        never has more than ``UPLOAD_CONCURRENCY + MAX_UPLOAD_CONCURRENCY`` parts
+        in memory.  ``release`` is called once a part is acknowledged (or dropped
+        on failure) so the source can return its memory reservation.
+        """
+        concurrency = controller.maximum
+        queue: asyncio.Queue = asyncio.Queue(maxsize=TelegramUploadService.UPLOAD_CONCURRENCY)
+
+        async def producer():
+            async with aclosing(parts) as source:
+                async for item in source:
+                    try:
+                        await queue.put(item)
+                    except BaseException:
+                        item[2]()
+                        raise
+            for _ in range(concurrency):
+                await queue.put(None)
+
+        async def consumer():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                index, data, release = item
+                try:
+                    await TelegramUploadService._save_part(
+                        sender_pool, file_id, index, total_parts, data, controller, scheduler
+                    )
+                finally:
+                    release()
+                if on_part_uploaded:
+                    await on_part_uploaded(index)
+
+        tasks = [asyncio.create_task(producer())]
+        tasks += [asyncio.create_task(consumer()) for _ in range(concurrency)]
+
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+            # Hand back reservations of parts that never reached a worker
+            while not queue.empty():
+                item = queue.get_nowait()
+                if item is not None:
+                    item[2]()
+
+    @staticmethod
+    def _sha256_file(file: BinaryIO, block_size: int = 1024 * 1024) -> str:
+        """SHA-256 of *file*, read block by block; leaves it rewound."""
+        hasher = hashlib.sha256()
+        file.seek(0)
+        while block := file.read(block_size):
+            hasher.update(block)
+        file.seek(0)
+        return hasher.hexdigest()
+
+    @staticmethod
+    async def _read_file_parts(file: BinaryIO, part_size: int):
+        """
+        Yield ``(index, data, release)`` parts read from *file* in a worker thread.
+
+        Each read first reserves *part_size* bytes from the process-wide upload
+        budget.
+        """
+        loop = asyncio.get_running_loop()
+        index = 0
+        while True:
+            reserved = await upload_memory_budget.acquire(part_size)
+            try:
+                data = await loop.run_in_executor(None, file.read, part_size)
+            except BaseException:
+                upload_memory_budget.release(reserved)
+                raise
+
+            if not data:
+                upload_memory_budget.release(reserved)
+                return
+
+            yield index, data, partial(upload_memory_budget.release, reserved)
+            index += 1
+
     @staticmethod
     async def _ultra_fast_upload(
         client: TelegramClient,
         file: BinaryIO,
         file_name: str,
         file_size: int,
-        entity
+        entity,
+        scheduler: AccountScheduler,
+        sender_pool: DcSenderPool,
+        controller: AdaptiveConcurrency | None = None,
     ):
-        part_size = 512 * 1024  # 512 KB — Telegram maximum part size
+        """Stream *file* to Telegram part by part without buffering it."""
+        part_size = TelegramUploadService.PART_SIZE
 
         file_id = int.from_bytes(os.urandom(8), "big", signed=True)
-
-        # Pre-read all parts so total_parts is accurate (needed by the API).
-        # We read lazily in a thread so we don't block the event loop.
-        loop = asyncio.get_running_loop()
-        parts: list[bytes] = await loop.run_in_executor(
-            None,
-            lambda: [chunk for chunk in iter(lambda: file.read(part_size), b"")]
+        total_parts = max(1, math.ceil(file_size / part_size))
+
+        await TelegramUploadService._upload_parts(
+            sender_pool,
+            file_id,
+            total_parts,
+            TelegramUploadService._read_file_parts(file, part_size),
+            controller or TelegramUploadService._new_controller(),
+            scheduler,
         )
-        total_parts = len(parts)
-
-        semaphore = asyncio.Semaphore(TelegramUploadService.UPLOAD_CONCURRENCY)
-
-        async def upload_part(index: int, data: bytes):
-            async with semaphore:
-                retries = 5
-                for attempt in range(retries):
-                    try:
-                        await client(
-                            SaveBigFilePartRequest(
-                                file_id=file_id,
-                                file_part=index,
-                                file_total_parts=total_parts,
-                                bytes=data
-                            )
-                        )
-                        return
-                    except FloodWaitError as e:
-                        wait = e.seconds + 1
-                        logger.warning(f"⏳ Flood wait on part {index}, sleeping {wait}s (attempt {attempt + 1}/{retries})")
-                        await asyncio.sleep(wait)
-                    except Exception:
-                        if attempt == retries - 1:
-                            raise
-                        await asyncio.sleep(0.5 * (attempt + 1))
-
-        # Upload ALL parts concurrently (bounded by semaphore) — no batching overhead
-        await asyncio.gather(*[upload_part(i, data) for i, data in enumerate(parts)])
 
         input_file = InputFileBig(
             id=file_id,
@@ -197,14 +363,15 @@ class TelegramUploadService:
             name=file_name
         )
 
-        return await client.send_file(
-            entity,
-            input_file,
-            force_document=True
-        )
+        async with scheduler.slot(Priority.UPLOAD):
+            return await client.send_file(
+                entity,
+                input_file,
+                force_document=True
+            )
 
 
-    async def upload_file(self, file_metadata, file, raw_file ,file_hash, user_id: int, db: AsyncSession):
+    async def upload_file(self, file_metadata, raw_file, user_id: int, db: AsyncSession):
         try:
 
             upload_file = await file_manager.is_valid_file(raw_file)
@@ -212,6 +379,11 @@ class TelegramUploadService:
             if not upload_file:
                 raise HTTPException(status_code=400, detail="Invalid file")
 
+            # Hash the spooled file in a worker thread before any part is
+            # sent, so duplicates are caught without uploading them
+            file_hash = await asyncio.get_running_loop().run_in_executor(
+                None, TelegramUploadService._sha256_file, raw_file.file
+            )
 
             # Check if file already exists in current folder
             is_duplicate = await storage_repository.is_file_exists(
@@ -228,7 +400,6 @@ class TelegramUploadService:
                 file_metadata.parent_id, user_id, db, file_hash
             )
 
-
             if existing_file:
                 new_metadata = UserFile(
                     user_id=existing_file.user_id,
@@ -248,12 +419,14 @@ class TelegramUploadService:
 
                 return result
 
+            await raw_file.seek(0)
+
             result = await self.upload_to_telegram(
-                file=file,
+                file=raw_file.file,
                 file_name=upload_file.get("name"),
                 file_size=upload_file.get("size"),
                 user_id=user_id,
-                db=db
+                db=db,
             )
 
             if result.get("status") == "success" :
@@ -291,16 +464,26 @@ class TelegramUploadService:
 
     async def ultra_fast_stream_upload(
             self,
-            generator,
+            relay: MinioPartRelay,
             file_name: str,
             file_size: int,
             user_id: int,
             db: AsyncSession,
-            on_progress=None,   # optional async callable(percent: float, message: str)
+            on_progress=None,   # optional async callable(percent: float, message: str, transfer: dict)
+            file_id: int | None = None,
+            on_parts_acked=None,  # optional callable(indices: list[int]), called in batches
+            before_send=None,     # optional async callable; returning False skips send_file
     ):
+        """
+        Send every part the relay hands out, then the message.
+
+        Passing the *file_id* of an earlier attempt together with a relay that
+        skips the parts acknowledged back then resumes that transfer.  Returns
+        None when *before_send* vetoed the message.
+        """
         client = await telegram_client_manager.get_client(user_id, db)
 
-        if not isinstance(client, TelegramClient):
+        if not isinstance(client, (TelegramClient, RemoteTelegramClient)):
             raise TypeError(f"Invalid client type: {type(client)}")
 
         logger.info(
@@ -312,103 +495,76 @@ class TelegramUploadService:
             chat_id = await self._get_storage_location(user_id, db)
             entity = PeerChannel(int(chat_id))
 
-            part_size = 512 * 1024  # 512 KB — Telegram maximum
-            file_id = int.from_bytes(os.urandom(8), "big", signed=True)
-
-            # ── Compute total_parts upfront from file_size ──────────────────
-            total_parts = math.ceil(file_size / part_size)
+            if file_id is None:
+                file_id = int.from_bytes(os.urandom(8), "big", signed=True)
+            total_parts = relay.total_parts
+            controller = TelegramUploadService._new_controller()
+            scheduler = telegram_client_manager.get_scheduler(user_id)
+            sender_pool = telegram_client_manager.get_sender_pool(user_id, client)
 
             logger.info(
                 f"Streaming | size={file_size / 1_000_000:.1f}MB | "
-                f"parts={total_parts} | part_size={part_size // 1024}KB | "
-                f"concurrency={TelegramUploadService.UPLOAD_CONCURRENCY}"
+                f"parts={relay.pending_parts}/{total_parts} | part_size={relay.part_size // 1024}KB | "
+                f"concurrency={controller.limit}-{controller.maximum} | "
+                f"prefetch={relay.prefetch}x{relay.fetch_parts} parts"
             )
 
-            # ── Producer/consumer pipeline ───────────────────────────────────
-            # The generator (MinIO reads) produces parts into a bounded queue.
-            # Telegram upload workers consume from that queue concurrently.
-            # Both sides run truly in parallel — MinIO and Telegram I/O overlap.
-
-            QUEUE_DEPTH = TelegramUploadService.UPLOAD_CONCURRENCY * 2
-            queue: asyncio.Queue[tuple[int, bytes] | None] = asyncio.Queue(maxsize=QUEUE_DEPTH)
+            # ── Relay → Telegram pipeline ────────────────────────────────────
+            # The relay keeps a window of part-aligned MinIO range reads in
+            # flight while the Telegram workers drain its memoryview parts,
+            # so MinIO and Telegram I/O overlap under a fixed memory ceiling.
 
-            upload_semaphore = asyncio.Semaphore(TelegramUploadService.UPLOAD_CONCURRENCY)
-            completed_parts = 0
+            completed_parts = total_parts - relay.pending_parts
             progress_interval = max(1, total_parts // 20)   # report every ~5 %
+            acked: list[int] = []
 
-            # ── Producer: read generator → assemble 512 KB parts → enqueue ──
-            async def producer():
-                buffer = b""
-                index = 0
-                async for chunk in generator:
-                    buffer += chunk
-                    while len(buffer) >= part_size:
-                        await queue.put((index, buffer[:part_size]))
-                        buffer = buffer[part_size:]
-                        index += 1
-                if buffer:
-                    await queue.put((index, buffer))
-                    index += 1
-                # Signal consumers that production is done
-                for _ in range(TelegramUploadService.UPLOAD_CONCURRENCY):
-                    await queue.put(None)
-
-            # ── Consumer: dequeue parts → upload to Telegram ─────────────────
-            async def consumer():
+            def flush_acked():
+                if on_parts_acked and acked:
+                    on_parts_acked(list(acked))
+                    acked.clear()
+
+            async def on_part_uploaded(index: int):
                 nonlocal completed_parts
-                while True:
-                    item = await queue.get()
-                    if item is None:
-                        queue.task_done()
-                        return
-                    index, data = item
-                    try:
-                        async with upload_semaphore:
-                            retries = 5
-                            for attempt in range(retries):
-                                try:
-                                    await client(
-                                        SaveBigFilePartRequest(
-                                            file_id=file_id,
-                                            file_part=index,
-                                            file_total_parts=total_parts,
-                                            bytes=data,
-                                        )
-                                    )
-                                    completed_parts += 1
-                                    if on_progress and (
-                                        completed_parts % progress_interval == 0
-                                        or completed_parts == total_parts
-                                    ):
-                                        pct = 15 + round((completed_parts / total_parts) * 75, 1)
-                                        await on_progress(
-                                            pct,
-                                            f"Uploading… {round(completed_parts / total_parts * 100)}%"
-                                        )
-                                    break
-                                except FloodWaitError as e:
-                                    wait = e.seconds + 1
-                                    logger.warning(
-                                        f"⏳ Flood wait on part {index}, sleeping {wait}s "
-                                        f"(attempt {attempt + 1}/{retries})"
-                                    )
-                                    await asyncio.sleep(wait)
-                                except Exception:
-                                    if attempt == retries - 1:
-                                        raise
-                                    await asyncio.sleep(0.5 * (attempt + 1))
-                    finally:
-                        queue.task_done()
-
-            # Run producer + N consumers concurrently
-            consumers = [
-                asyncio.ensure_future(consumer())
-                for _ in range(TelegramUploadService.UPLOAD_CONCURRENCY)
-            ]
-            await asyncio.gather(producer(), *consumers)
+                completed_parts += 1
+                acked.append(index)
+                if len(acked) >= TelegramUploadService.ACK_FLUSH_PARTS:
+                    flush_acked()
+                if on_progress and (
+                    completed_parts % progress_interval == 0
+                    or completed_parts == total_parts
+                ):
+                    pct = 15 + round((completed_parts / total_parts) * 75, 1)
+                    await on_progress(
+                        pct,
+                        f"Uploading… {round(completed_parts / total_parts * 100)}%",
+                        controller.stats(),
+                    )
+
+            try:
+                await TelegramUploadService._upload_parts(
+                    sender_pool,
+                    file_id,
+                    total_parts,
+                    relay.parts(),
+                    controller,
+                    scheduler,
+                    on_part_uploaded=on_part_uploaded,
+                )
+            finally:
+                # Persist what Telegram already holds, even when a part failed
+                try:
+                    flush_acked()
+                except Exception as e:
+                    logger.warning(f"Could not record acknowledged parts: {e}")
+
+            logger.info(f"Telegram parts done | {controller.stats()}")
+
+            if before_send is not None and await before_send() is False:
+                return None
 
             input_file = InputFileBig(id=file_id, parts=total_parts, name=file_name)
-            return await client.send_file(entity, input_file, force_document=True)
+            async with scheduler.slot(Priority.UPLOAD):
+                return await client.send_file(entity, input_file, force_document=True)
 
         except FloodWaitError as e:
             logger.error(f"⏳ Rate limited | wait={e.seconds}s")
@@ -418,43 +574,20 @@ class TelegramUploadService:
             raise
 
 
-    @staticmethod
-    async def merged_stream(storage, upload_id: str, total_chunks: int, prefetch: int = 4):
-        """
-        Yield 512 KB Telegram parts assembled from MinIO chunks.
-
-        *prefetch* chunks are downloaded from MinIO in parallel while the
-        previous chunk is being consumed, eliminating the sequential
-        MinIO-download → Telegram-upload pipeline stall.
-        """
-        loop = asyncio.get_running_loop()
-        semaphore = asyncio.Semaphore(prefetch)
-
-        async def _fetch(i: int) -> bytes:
-            async with semaphore:
-                return await storage.get_chunk_bytes(upload_id, i)
-
-        # Start all fetches immediately; asyncio.gather preserves order
-        chunk_futures = [asyncio.ensure_future(_fetch(i)) for i in range(total_chunks)]
-
-        for fut in chunk_futures:
-            data = await fut
-            yield data
-
-
-
     async def process_upload(self, upload_id: str, meta: dict, user_id: int):
         """Run as a background task with its own DB session."""
         try:
             async with AsyncSessionLocal() as db:
-                generator = self.merged_stream(
+                relay = MinioPartRelay(
                     storage,
                     upload_id,
-                    meta["total_chunks"]
+                    file_size=meta["file_size"],
+                    chunk_size=meta["chunk_size"],
+                    part_size=TelegramUploadService.PART_SIZE,
                 )
 
                 await self.ultra_fast_stream_upload(
-                    generator=generator,
+                    relay=relay,
                     file_name=meta["file_name"],
                     file_size=meta["file_size"],
                     user_id=user_id,
@@ -468,10 +601,55 @@ class TelegramUploadService:
             logger.error(f"Background upload failed for upload_id={upload_id}: {e}", exc_info=True)
 
 
-    async def process_chunked_upload(self, upload_id: str, meta: dict, user_id: int):
+    @staticmethod
+    async def _stored_upload_matches(upload_id: str, meta: dict, content_hash: str) -> bool:
+        """Hash the stored chunks in one sequential pass and compare with *content_hash*."""
+        hasher = hashlib.sha256()
+        relay = MinioPartRelay(
+            storage,
+            upload_id,
+            file_size=meta["file_size"],
+            chunk_size=meta["chunk_size"],
+            part_size=TelegramUploadService.PART_SIZE,
+            hasher=hasher,
+        )
+        async with aclosing(relay.parts()) as parts:
+            async for _, _, release in parts:
+                release()
+        return hasher.hexdigest() == content_hash
+
+    @staticmethod
+    async def reuse_channel_file(channel_file, file_name: str, parent_id, user_id: int, db: AsyncSession) -> dict:
+        """Create a UserFile that points at an already-uploaded Telegram message."""
+        new_metadata = UserFile(
+            user_id=channel_file.user_id,
+            telegram_message_id=channel_file.telegram_message_id,
+            telegram_chat_id=channel_file.telegram_chat_id,
+            name=file_name,
+            size=channel_file.size,
+            mime_type=channel_file.mime_type,
+            content_hash=channel_file.content_hash,
+            folder_path=channel_file.folder_path,
+            parent_id=parent_id,
+        )
+        record = await storage_repository.save_file_record(
+            user_id, new_metadata, channel_file.content_hash, db
+        )
+        return {
+            "id": record.id,
+            "name": record.name,
+            "size": record.size,
+            "mime_type": record.mime_type,
+            "parent_id": record.parent_id,
+        }
+
+    async def process_chunked_upload(self, upload_id: str, meta: dict, user_id: int, final_attempt: bool = True):
         """
         Background job: stream chunks from MinIO → upload to Telegram → save DB record → cleanup.
         Updates Redis progress throughout so the client can poll /upload/status.
+
+        Errors are re-raised so the job worker can retry; only the *final_attempt*
+        marks the upload failed.
         """
         from app.services.upload.upload_state import upload_state
 
@@ -486,15 +664,17 @@ class TelegramUploadService:
                     parent_id = None
                 else:
                     parent_id = int(parent_id) if parent_id else None
-                total_chunks = meta["total_chunks"]
-
-                # ── 1. Ensure all chunks are available in MinIO ──
-                upload_state.update_processing_progress(upload_id, 5, "Validating chunks…")
-                await storage.wait_for_all_chunks(upload_id, total_chunks)
 
-                # ── 2. Check for duplicate files ──
+                # ── 1. Check for duplicate files ──
+                # (chunk presence was already verified at /complete)
                 upload_state.update_processing_progress(upload_id, 10, "Checking duplicates…")
 
+                async def reject_mismatch():
+                    upload_state.set_failed(upload_id, "Uploaded content does not match its content hash")
+                    await storage.delete_upload(upload_id)
+                    upload_state.cleanup(upload_id)
+                    logger.warning(f"Content hash mismatch for upload_id={upload_id} — rejected")
+
                 existing_file = await storage_repository.is_file_exists(
                     parent_id, user_id, db, content_hash
                 )
@@ -510,54 +690,78 @@ class TelegramUploadService:
                 )
 
                 if channel_file:
+                    # The claimed hash only links an existing file once the stored bytes back it
+                    if not await self._stored_upload_matches(upload_id, meta, content_hash):
+                        await reject_mismatch()
+                        return
+
                     # Reuse existing Telegram upload — just create a new DB record
-                    new_metadata = UserFile(
-                        user_id=channel_file.user_id,
-                        telegram_message_id=channel_file.telegram_message_id,
-                        telegram_chat_id=channel_file.telegram_chat_id,
-                        name=file_name,
-                        size=channel_file.size,
-                        mime_type=channel_file.mime_type,
-                        content_hash=channel_file.content_hash,
-                        folder_path=channel_file.folder_path,
-                        parent_id=parent_id,
-                    )
-                    record = await storage_repository.save_file_record(
-                        user_id, new_metadata, content_hash, db
+                    file_record = await self.reuse_channel_file(
+                        channel_file, file_name, parent_id, user_id, db
                     )
-                    file_record = {
-                        "id": record.id,
-                        "name": record.name,
-                        "size": record.size,
-                        "mime_type": record.mime_type,
-                        "parent_id": record.parent_id,
-                    }
                     upload_state.set_completed(upload_id, file_record)
                     await storage.delete_upload(upload_id)
                     upload_state.cleanup(upload_id)
                     logger.info(f"Dedup match — reused Telegram file for upload_id={upload_id}")
                     return
 
-                # ── 3. Stream from MinIO → Telegram ──
+                # ── 2. Stream from MinIO → Telegram (resumable) ──
                 upload_state.update_processing_progress(upload_id, 15, "Uploading to Telegram…")
 
-                generator = self.merged_stream(storage, upload_id, total_chunks)
+                total_parts = math.ceil(file_size / TelegramUploadService.PART_SIZE)
+                transfer = upload_state.get_telegram_upload(upload_id, total_parts)
+                message_id = transfer.get("message_id")
 
-                async def on_progress(pct: float, msg: str):
-                    upload_state.update_processing_progress(upload_id, pct, msg)
+                if message_id is None:
+                    # Hashed as it streams; checked before the message is sent
+                    hasher = hashlib.sha256()
+                    acked = upload_state.get_uploaded_parts(upload_id)
 
-                message = await self.ultra_fast_stream_upload(
-                    generator=generator,
-                    file_name=file_name,
-                    file_size=file_size,
-                    user_id=user_id,
-                    db=db,
-                    on_progress=on_progress,
-                )
+                    async def content_matches():
+                        return hasher.hexdigest() == content_hash
+
+                    if acked:
+                        logger.info(
+                            f"Resuming upload_id={upload_id} | "
+                            f"{len(acked)}/{total_parts} parts already on Telegram"
+                        )
+
+                    relay = MinioPartRelay(
+                        storage,
+                        upload_id,
+                        file_size=file_size,
+                        chunk_size=meta["chunk_size"],
+                        part_size=TelegramUploadService.PART_SIZE,
+                        skip=acked,
+                        hasher=hasher,
+                    )
+
+                    async def on_progress(pct: float, msg: str, transfer: dict | None = None):
+                        upload_state.update_processing_progress(upload_id, pct, msg, transfer)
+
+                    message = await self.ultra_fast_stream_upload(
+                        relay=relay,
+                        file_name=file_name,
+                        file_size=file_size,
+                        user_id=user_id,
+                        db=db,
+                        on_progress=on_progress,
+                        file_id=transfer["file_id"],
+                        on_parts_acked=lambda indices: upload_state.mark_parts_uploaded(upload_id, indices),
+                        before_send=content_matches,
+                    )
+                    if message is None:
+                        # Orphaned parts simply expire on Telegram's side
+                        await reject_mismatch()
+                        return
+                    message_id = message.id
+                    upload_state.set_telegram_message(upload_id, message_id)
+                else:
+                    logger.info(f"Resuming upload_id={upload_id} | message {message_id} already sent")
 
                 upload_state.update_processing_progress(upload_id, 85, "Saving file record…")
 
-                # ── 4. Save DB record ──
+                # ── 3. Save DB record ──
                 chat_id = None
                 storage_location = await storage_repository.get_storage_location(user_id, db)
                 if storage_location:
@@ -565,7 +769,7 @@ class TelegramUploadService:
 
                 user_file = UserFile(
                     user_id=user_id,
-                    telegram_message_id=message.id,
+                    telegram_message_id=message_id,
                     telegram_chat_id=chat_id or "",
                     name=file_name,
                     size=file_size,
@@ -586,11 +790,11 @@ class TelegramUploadService:
                     "parent_id": record.parent_id,
                 }
 
-                # ── 5. Cleanup MinIO chunks ──
+                # ── 4. Cleanup MinIO chunks ──
                 upload_state.update_processing_progress(upload_id, 95, "Cleaning up…")
                 await storage.delete_upload(upload_id)
 
-                # ── 6. Done ──
+                # ── 5. Done ──
                 upload_state.set_completed(upload_id, file_record)
                 upload_state.cleanup(upload_id)
                 logger.info(f"✅ Chunked upload complete | upload_id={upload_id} | file_id={record.id}")
@@ -598,8 +802,19 @@ class TelegramUploadService:
         except Exception as e:
             logger.error(f"Background chunked upload failed | upload_id={upload_id}: {e}", exc_info=True)
             try:
-                upload_state.set_failed(upload_id, str(e))
+                if final_attempt:
+                    upload_state.set_failed(upload_id, str(e))
+                    # Chunks and acknowledged parts are kept — calling /complete
+                    # again resumes from the first missing part.
+                    upload_state.release_complete_lock(upload_id)
+                else:
+                    upload_state.update_processing_progress(
+                        upload_id,
+                        (upload_state.get_status(upload_id) or {}).get("progress", 15),
+                        "Transfer interrupted — retrying…",
+                    )
             except Exception:
                 pass
+            raise
 
 upload_service = TelegramUploadService()
@@ -0,0 +1,128 @@
+"""
+Adaptive (AIMD) concurrency window for Telegram part uploads.
+
+Workers take a slot from the controller before every SaveBigFilePartRequest
+and report how it went:
+
+  - success with per-part latency at or below the best smoothed latency seen
+    so far (plus a tolerance) → additive increase, about +1 slot per window
+  - success with degrading latency → hold the window
+  - timeout → multiplicative decrease
+  - FloodWait → halve the window and pause *every* worker until the wait is
+    over, instead of letting each worker sleep on its own
+
+One controller is created per upload; ``stats()`` exposes the current window
+and throughput so progress reporting can surface them.
+"""
+
+import asyncio
+import time
+
+
+class AdaptiveConcurrency:
+
+    INCREASE_TOLERANCE = 1.15     # latency may drift this much above the best and still grow
+    TIMEOUT_BACKOFF = 0.7
+    FLOOD_BACKOFF = 0.5
+    EWMA_ALPHA = 0.2
+
+    def __init__(self, initial: int, minimum: int = 2, maximum: int = 32):
+        self.minimum = minimum
+        self.maximum = max(maximum, minimum)
+        self.window = float(min(max(initial, minimum), self.maximum))
+        self.in_flight = 0
+
+        self._cond = asyncio.Condition()
+        self._paused_until = 0.0
+        self._latency_ewma: float | None = None
+        self._best_latency: float | None = None
+
+        self._started_at = time.monotonic()
+        self._bytes_done = 0
+        self._parts_done = 0
+        self._flood_waits = 0
+        self._timeouts = 0
+        self._peak_window = self.window
+
+    @property
+    def limit(self) -> int:
+        return int(self.window)
+
+    # ── Slots ────────────────────────────────────────────────────
+
+    async def acquire(self):
+        async with self._cond:
+            while True:
+                delay = self._paused_until - time.monotonic()
+                if delay > 0:
+                    try:
+                        async with asyncio.timeout(delay):
+                            await self._cond.wait()
+                    except TimeoutError:
+                        pass
+                    continue
+
+                if self.in_flight < self.limit:
+                    self.in_flight += 1
+                    return
+
+                await self._cond.wait()
+
+    async def release(self):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+    # ── Feedback ─────────────────────────────────────────────────
+
+    async def on_success(self, latency: float, nbytes: int):
+        self._bytes_done += nbytes
+        self._parts_done += 1
+
+        if self._latency_ewma is None:
+            self._latency_ewma = latency
+        else:
+            self._latency_ewma += self.EWMA_ALPHA * (latency - self._latency_ewma)
+
+        if self._best_latency is None or self._latency_ewma < self._best_latency:
+            self._best_latency = self._latency_ewma
+
+        if self._latency_ewma <= self._best_latency * self.INCREASE_TOLERANCE:
+            previous = self.limit
+            self.window = min(self.maximum, self.window + 1 / self.window)
+            self._peak_window = max(self._peak_window, self.window)
+            if self.limit > previous:
+                async with self._cond:
+                    self._cond.notify_all()
+
+    async def on_timeout(self):
+        self._timeouts += 1
+        self.window = max(self.minimum, self.window * self.TIMEOUT_BACKOFF)
+
+    async def on_flood_wait(self, seconds: int):
+        self._flood_waits += 1
+        self.window = max(self.minimum, self.window * self.FLOOD_BACKOFF)
+        # Latency measured before the throttle is no longer a fair baseline
+        self._best_latency = None
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds + 1)
+        async with self._cond:
+            self._cond.notify_all()
+
+    # ── Reporting ────────────────────────────────────────────────
+
+    def throughput(self) -> float:
+        """Acknowledged bytes per second since the controller was created."""
+        elapsed = time.monotonic() - self._started_at
+        return self._bytes_done / elapsed if elapsed > 0 else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "window": self.limit,
+            "peak_window": int(self._peak_window),
+            "in_flight": self.in_flight,
+            "throughput_mbps": round(self.throughput() / 1_000_000, 2),
+            "latency_ms": round(self._latency_ewma * 1000, 1) if self._latency_ewma else None,
+            "parts": self._parts_done,
+            "flood_waits": self._flood_waits,
+            "timeouts": self._timeouts,
+        }
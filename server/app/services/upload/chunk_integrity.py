@@ -0,0 +1,96 @@
+"""
+Server-side integrity checks for uploaded chunks.
+
+``HashingReader`` wraps the file object handed to ``MinioStorage.save_chunk``;
+MinIO's put_object pulls from it on a worker thread, so the digests are
+computed as the chunk streams into storage instead of in a second pass.
+
+Clients may send one of these headers with a chunk:
+
+  Content-MD5: <base64 md5>                     (RFC 1864)
+  Digest: SHA-256=<base64>, MD5=<base64>        (RFC 3230)
+  Repr-Digest: sha-256=:<base64>:               (RFC 9530)
+
+Per-chunk SHA-256 digests are kept in the upload state.  The whole-file
+``content_hash`` the client claims is checked by the job worker, which hashes
+the file as it relays it to Telegram (see ``MinioPartRelay``).
+"""
+
+import base64
+import binascii
+import hashlib
+from typing import Optional
+
+
+class HashingReader:
+    """File-like wrapper that hashes every byte read through it."""
+
+    def __init__(self, raw, md5: bool = False):
+        self._raw = raw
+        self._sha256 = hashlib.sha256()
+        self._md5 = hashlib.md5() if md5 else None
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._raw.read(size)
+        if data:
+            self._sha256.update(data)
+            if self._md5 is not None:
+                self._md5.update(data)
+            self.bytes_read += len(data)
+        return data
+
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
+
+    @property
+    def md5(self) -> Optional[str]:
+        return self._md5.hexdigest() if self._md5 is not None else None
+
+
+def _b64_to_hex(value: str) -> Optional[str]:
+    try:
+        return base64.b64decode(value.strip(), validate=True).hex()
+    except (binascii.Error, ValueError):
+        return None
+
+
+def parse_expected_digests(headers) -> dict[str, str]:
+    """
+    Extract client-supplied digests from request headers.
+    Returns ``{"md5": hex, "sha256": hex}`` with whichever were present.
+    Raises ValueError for a malformed header.
+    """
+    expected = {}
+
+    content_md5 = headers.get("content-md5")
+    if content_md5:
+        expected["md5"] = _b64_to_hex(content_md5)
+
+    for header in ("repr-digest", "digest"):
+        value = headers.get(header)
+        if not value:
+            continue
+        for item in value.split(","):
+            algorithm, _, encoded = item.strip().partition("=")
+            algorithm = algorithm.strip().lower()
+            if algorithm not in ("sha-256", "md5"):
+                continue
+            # RFC 9530 wraps the value in colons (structured-field byte sequence)
+            digest = _b64_to_hex(encoded.strip().strip(":"))
+            expected["sha256" if algorithm == "sha-256" else "md5"] = digest
+
+    if any(v is None for v in expected.values()):
+        raise ValueError("Malformed digest header")
+    return expected
+
+
+def find_digest_mismatch(expected: dict[str, str], reader: HashingReader) -> Optional[str]:
+    """Name of the first algorithm whose digest does not match, or None."""
+    if "sha256" in expected and expected["sha256"] != reader.sha256:
+        return "sha256"
+    if "md5" in expected and expected["md5"] != reader.md5:
+        return "md5"
+    return None
+
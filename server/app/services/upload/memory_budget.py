@@ -0,0 +1,78 @@
+"""
+Byte budget for upload part buffers.
+
+Producers reserve bytes before they read a part into memory and release them
+once Telegram has acknowledged it, so the buffers held by every concurrent
+upload in this process stay under a fixed ceiling.  Waiters are served in
+FIFO order so one large upload cannot starve the others.
+"""
+
+import asyncio
+from collections import deque
+
+from app.config import settings
+
+
+class MemoryBudget:
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_use = 0
+        self._waiters: deque[tuple[int, asyncio.Future]] = deque()
+
+    async def acquire(self, nbytes: int) -> int:
+        """
+        Reserve *nbytes* and return the amount actually reserved — requests
+        larger than the whole budget are clamped so they can still proceed alone.
+        """
+        nbytes = min(nbytes, self.limit)
+
+        if not self._waiters and self.in_use + nbytes <= self.limit:
+            self.in_use += nbytes
+            return nbytes
+
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append((nbytes, fut))
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # Granted right before cancellation — hand the bytes back
+                self.release(nbytes)
+            raise
+        return nbytes
+
+    def try_acquire(self, nbytes: int) -> int:
+        """Reserve *nbytes* only if that is possible right now; returns 0 otherwise."""
+        nbytes = min(nbytes, self.limit)
+        if self._waiters or self.in_use + nbytes > self.limit:
+            return 0
+        self.in_use += nbytes
+        return nbytes
+
+    def release(self, nbytes: int):
+        self.in_use = max(0, self.in_use - nbytes)
+        self._wake()
+
+    def _wake(self):
+        while self._waiters:
+            nbytes, fut = self._waiters[0]
+            if fut.done():
+                self._waiters.popleft()
+                continue
+            if self.in_use + nbytes > self.limit:
+                break
+            self._waiters.popleft()
+            self.in_use += nbytes
+            fut.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_use": self.in_use,
+            "waiters": len(self._waiters),
+        }
+
+
+# Shared by every upload running in this process
+upload_memory_budget = MemoryBudget(settings.upload_memory_budget)
@@ -0,0 +1,210 @@
+"""
+MinIO → Telegram part relay for chunked uploads.
+
+The relay walks the assembled file in *segments* — byte ranges that are a
+whole number of Telegram parts long — and keeps a sliding window of segment
+fetches in flight.  Each segment is read from MinIO straight into one
+``bytearray`` and handed on as ``memoryview`` slices, one per Telegram part,
+so parts are never re-assembled or copied on the way through.
+
+Every segment reserves its size from a per-upload budget and from the
+process-wide ``upload_memory_budget`` before it is fetched, and gives the
+reservation back once all of its parts have been acknowledged.
+
+Parts listed in *skip* (acknowledged by Telegram in an earlier attempt) are
+neither fetched nor handed out, which is what makes uploads resumable.
+
+With a *hasher* every byte of the file is fed to it in order, off the event
+loop, so the server gets its own digest of the upload without a second pass.
+Skipped parts are then still fetched for the hash, just not handed out.
+"""
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass, field
+
+from app.config import settings
+from app.services.upload.memory_budget import MemoryBudget, upload_memory_budget
+
+
+@dataclass
+class _Segment:
+    start: int                 # file offset of the first byte
+    end: int                   # file offset one past the last byte
+    parts: list[int]           # Telegram part indices to hand out
+    reserved: list = field(default_factory=list)   # (budget, nbytes) pairs
+    remaining: int = 0
+
+    @property
+    def size(self) -> int:
+        return self.end - self.start
+
+
+class MinioPartRelay:
+
+    def __init__(
+        self,
+        storage,
+        upload_id: str,
+        file_size: int,
+        chunk_size: int,
+        part_size: int,
+        fetch_parts: int | None = None,
+        prefetch: int | None = None,
+        memory_limit: int | None = None,
+        skip: set[int] | None = None,
+        hasher=None,
+    ):
+        self.storage = storage
+        self.upload_id = upload_id
+        self.file_size = file_size
+        self.chunk_size = chunk_size
+        self.part_size = part_size
+        self.fetch_parts = max(1, fetch_parts or settings.upload_relay_fetch_parts)
+        self.prefetch = max(1, prefetch or settings.upload_relay_prefetch)
+        self.budget = MemoryBudget(memory_limit or settings.upload_memory_per_upload)
+        # Parts Telegram already acknowledged in an earlier attempt
+        self.skip = skip or set()
+        self.hasher = hasher
+
+    @property
+    def total_parts(self) -> int:
+        return max(1, -(-self.file_size // self.part_size))
+
+    # ── Planning ─────────────────────────────────────────────────
+
+    @property
+    def pending_parts(self) -> int:
+        return self.total_parts - len(self.skip)
+
+    def _plan(self) -> list[_Segment]:
+        """
+        Split the file into fetch windows of ``fetch_parts`` parts, shrinking
+        each window to the span of parts that still need sending.  Hashing
+        needs every window in full.
+        """
+        segments = []
+        for first in range(0, self.total_parts, self.fetch_parts):
+            last = min(first + self.fetch_parts, self.total_parts)
+            wanted = [i for i in range(first, last) if i not in self.skip]
+            if self.hasher is not None:
+                span = (first, last - 1)
+            elif wanted:
+                span = (wanted[0], wanted[-1])
+            else:
+                continue
+            segments.append(_Segment(
+                start=span[0] * self.part_size,
+                end=min((span[1] + 1) * self.part_size, self.file_size),
+                parts=wanted,
+            ))
+        return segments
+
+    # ── Memory accounting ────────────────────────────────────────
+
+    async def _reserve(self, segment: _Segment, wait: bool) -> bool:
+        """
+        Reserve *segment* against the per-upload and process budgets.
+
+        Only waits when nothing is queued behind us (*wait*); otherwise the
+        bytes we would wait for may be held by segments that have not been
+        handed to the workers yet.
+        """
+        for budget in (self.budget, upload_memory_budget):
+            if wait:
+                nbytes = await budget.acquire(segment.size)
+            else:
+                nbytes = budget.try_acquire(segment.size)
+                if not nbytes:
+                    self._release(segment)
+                    return False
+            segment.reserved.append((budget, nbytes))
+        return True
+
+    @staticmethod
+    def _release(segment: _Segment):
+        while segment.reserved:
+            budget, nbytes = segment.reserved.pop()
+            budget.release(nbytes)
+
+    def _part_done(self, segment: _Segment):
+        segment.remaining -= 1
+        if segment.remaining <= 0:
+            self._release(segment)
+
+    # ── Fetching ─────────────────────────────────────────────────
+
+    async def _fetch(self, segment: _Segment) -> bytearray:
+        """Read a segment, spanning chunk boundaries if the chunk size requires it."""
+        buffer = bytearray(segment.size)
+        view = memoryview(buffer)
+
+        reads = []
+        offset = segment.start
+        while offset < segment.end:
+            chunk_index = offset // self.chunk_size
+            chunk_offset = offset - chunk_index * self.chunk_size
+            length = min(segment.end - offset, self.chunk_size - chunk_offset)
+            pos = offset - segment.start
+            reads.append(self.storage.read_chunk_range_into(
+                self.upload_id, chunk_index, chunk_offset, view[pos:pos + length]
+            ))
+            offset += length
+
+        await asyncio.gather(*reads)
+        return buffer
+
+    # ── Relay ────────────────────────────────────────────────────
+
+    async def parts(self):
+        """Yield ``(index, memoryview, release)`` for every Telegram part, in order."""
+        upcoming = deque(self._plan())
+        in_flight: deque[tuple[_Segment, asyncio.Task]] = deque()
+        current, unyielded = None, 0
+
+        try:
+            while upcoming or in_flight:
+                # Top up the prefetch window
+                while upcoming and len(in_flight) < self.prefetch:
+                    segment = upcoming[0]
+                    if not await self._reserve(segment, wait=not in_flight):
+                        break
+                    upcoming.popleft()
+                    in_flight.append((segment, asyncio.create_task(self._fetch(segment))))
+
+                segment, task = in_flight.popleft()
+                try:
+                    buffer = await task
+                except BaseException:
+                    self._release(segment)
+                    raise
+
+                view = memoryview(buffer)
+                if self.hasher is not None:
+                    await asyncio.get_running_loop().run_in_executor(None, self.hasher.update, view)
+                if not segment.parts:
+                    # Fetched only for the hash
+                    self._release(segment)
+                    continue
+
+                segment.remaining = len(segment.parts)
+                release = lambda s=segment: self._part_done(s)
+                current, unyielded = segment, segment.remaining
+
+                for index in segment.parts:
+                    lo = index * self.part_size - segment.start
+                    hi = min(lo + self.part_size, segment.size)
+                    unyielded -= 1
+                    yield index, view[lo:hi], release
+        finally:
+            # Parts of the current segment that were never handed out
+            if current is not None and unyielded > 0:
+                current.remaining -= unyielded
+                if current.remaining <= 0:
+                    self._release(current)
+
+            for segment, task in in_flight:
+                task.cancel()
+                self._release(segment)
+            if in_flight:
+                await asyncio.gather(*(task for _, task in in_flight), return_exceptions=True)
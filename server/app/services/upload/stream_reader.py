@@ -0,0 +1,53 @@
+"""
+Blocking file-like view over an async request body.
+
+MinIO's put_object is synchronous and runs on the storage thread pool; it
+pulls the chunk with ``read(n)``.  ``AsyncBodyReader`` serves those reads by
+fetching the next body piece from ``request.stream()`` on the event loop, so
+the body goes socket → MinIO without multipart parsing or a temp file, and
+at most one body piece is buffered at a time.
+"""
+
+import asyncio
+from typing import AsyncIterator
+
+
+class AsyncBodyReader:
+
+    def __init__(self, stream: AsyncIterator[bytes], length: int, loop: asyncio.AbstractEventLoop):
+        self._stream = stream
+        self._loop = loop
+        self.length = length
+        self._buffer = bytearray()
+        self._received = 0
+        self._eof = False
+
+    def _next_piece(self) -> bytes:
+        """Pull the next body piece from the event loop (called on a worker thread)."""
+        future = asyncio.run_coroutine_threadsafe(self._stream.__anext__(), self._loop)
+        try:
+            return future.result()
+        except StopAsyncIteration:
+            self._eof = True
+            return b""
+
+    def read(self, size: int = -1) -> bytes:
+        remaining = self.length - self._received + len(self._buffer)
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+
+        while len(self._buffer) < size and not self._eof:
+            piece = self._next_piece()
+            self._received += len(piece)
+            if self._received > self.length:
+                raise IOError(f"Request body exceeds Content-Length ({self.length} bytes)")
+            self._buffer += piece
+
+        if len(self._buffer) < size:
+            raise IOError(
+                f"Request body ended early: {self._received} of {self.length} bytes received"
+            )
+
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
@@ -4,16 +4,22 @@ Redis-backed upload state manager.
 Keys layout:
   upload:{upload_id}:meta   → JSON hash with file metadata + ownership
   upload:{upload_id}:chunks → Redis SET of received chunk indices
+  upload:{upload_id}:chunkinfo → Redis HASH index → JSON {size, etag, sha256} of each stored chunk
   upload:{upload_id}:status → JSON hash with processing state
   upload:{upload_id}:lock   → simple lock to prevent duplicate complete calls
+  upload:{upload_id}:tg     → JSON with the Telegram file_id / total_parts / message_id
+  upload:{upload_id}:parts  → Redis bitmap of parts Telegram acknowledged
 
 All keys expire after TTL_SECONDS so orphaned uploads are auto-cleaned.
 """
 
 import json
+import os
 import uuid
 import time
-from typing import Optional
+from typing import Iterable, Optional
+
+from redis.client import NEVER_DECODE
 
 from app.services.redis.RedisService import redis_service
 from app.logger import logger
@@ -44,6 +50,10 @@ class UploadState:
     def _chunks_key(upload_id: str) -> str:
         return f"upload:{upload_id}:chunks"
 
+    @staticmethod
+    def _chunk_info_key(upload_id: str) -> str:
+        return f"upload:{upload_id}:chunkinfo"
+
     @staticmethod
     def _status_key(upload_id: str) -> str:
         return f"upload:{upload_id}:status"
@@ -52,6 +62,14 @@ class UploadState:
     def _lock_key(upload_id: str) -> str:
         return f"upload:{upload_id}:lock"
 
+    @staticmethod
+    def _telegram_key(upload_id: str) -> str:
+        return f"upload:{upload_id}:tg"
+
+    @staticmethod
+    def _parts_key(upload_id: str) -> str:
+        return f"upload:{upload_id}:parts"
+
     # ── Init ─────────────────────────────────────────────────────
 
     def init_upload(
@@ -107,20 +125,30 @@ class UploadState:
 
     # ── Chunk tracking ───────────────────────────────────────────
 
-    def record_chunk(self, upload_id: str, chunk_index: int) -> int:
+    def record_chunk(
+        self,
+        upload_id: str,
+        chunk_index: int,
+        size: Optional[int] = None,
+        etag: Optional[str] = None,
+        sha256: Optional[str] = None,
+    ) -> int:
         """
-        Mark a chunk as received.
-        Uses a single pipeline round-trip: SADD + SCARD + status SET.
+        Mark a chunk as received and remember its size / checksum.
+        Uses a single pipeline round-trip: SADD + HSET + SCARD.
         Returns new count of received chunks.
         """
         client = redis_service.get_client()
         chunks_key = self._chunks_key(upload_id)
+        info_key = self._chunk_info_key(upload_id)
 
         # Pipeline: atomically add the chunk and count received chunks
         pipe = client.pipeline(transaction=False)
         pipe.sadd(chunks_key, str(chunk_index))
+        pipe.hset(info_key, str(chunk_index), json.dumps({"size": size, "etag": etag, "sha256": sha256}))
+        pipe.expire(info_key, TTL_SECONDS)
         pipe.scard(chunks_key)
-        _, received = pipe.execute()
+        *_, received = pipe.execute()
 
         # Avoid a separate GET for meta — total_chunks is embedded in meta key but
         # we read it only if the meta is still alive (avoids blocking on large uploads).
@@ -141,6 +169,69 @@ class UploadState:
 
         return received
 
+    def has_chunk(self, upload_id: str, chunk_index: int) -> bool:
+        client = redis_service.get_client()
+        return bool(client.sismember(self._chunks_key(upload_id), str(chunk_index)))
+
+    def get_chunk_manifest(self, upload_id: str) -> dict[int, dict]:
+        """
+        ``{chunk_index: {"size": ..., "etag": ..., "sha256": ...}}`` for every recorded chunk —
+        one round-trip, no matter how many chunks the upload has.
+        """
+        client = redis_service.get_client()
+        raw = client.hgetall(self._chunk_info_key(upload_id))
+        return {int(index): json.loads(info) for index, info in raw.items()}
+
+    @staticmethod
+    def expected_chunk_size(meta: dict, chunk_index: int) -> int:
+        """Size of *chunk_index* under the layout agreed at init (the last chunk is shorter)."""
+        if chunk_index == meta["total_chunks"] - 1:
+            return meta["file_size"] - meta["chunk_size"] * (meta["total_chunks"] - 1)
+        return meta["chunk_size"]
+
+    def find_chunk_problems(self, meta: dict, manifest: dict[int, dict]) -> list[int]:
+        """
+        Indices that are missing from *manifest* or whose recorded size does
+        not match the layout agreed at init.
+        """
+        problems = []
+        for index in range(meta["total_chunks"]):
+            info = manifest.get(index)
+            expected = self.expected_chunk_size(meta, index)
+            if info is None or (info.get("size") is not None and info["size"] != expected):
+                problems.append(index)
+        return problems
+
+    def reconcile_chunks(self, upload_id: str, stored: dict[int, dict]) -> dict[int, dict]:
+        """
+        Replace the recorded chunk state with what storage actually holds
+        (e.g. a chunk write that landed but whose Redis record was lost).
+        Digests recorded for an unchanged object are carried over.
+        """
+        client = redis_service.get_client()
+        chunks_key = self._chunks_key(upload_id)
+        info_key = self._chunk_info_key(upload_id)
+
+        recorded = self.get_chunk_manifest(upload_id)
+        stored = {
+            index: {
+                **info,
+                "sha256": recorded.get(index, {}).get("sha256")
+                if recorded.get(index, {}).get("etag") == info.get("etag") else None,
+            }
+            for index, info in stored.items()
+        }
+
+        pipe = client.pipeline(transaction=True)
+        pipe.delete(chunks_key, info_key)
+        if stored:
+            pipe.sadd(chunks_key, *[str(i) for i in stored])
+            pipe.hset(info_key, mapping={str(i): json.dumps(info) for i, info in stored.items()})
+        pipe.expire(chunks_key, TTL_SECONDS)
+        pipe.expire(info_key, TTL_SECONDS)
+        pipe.execute()
+        return dict(stored)
+
     def get_received_chunks(self, upload_id: str) -> set[int]:
         client = redis_service.get_client()
         raw = client.smembers(self._chunks_key(upload_id))
@@ -161,6 +252,16 @@ class UploadState:
             return None
         return json.loads(raw)
 
+    def update_meta(self, upload_id: str, fields: dict):
+        client = redis_service.get_client()
+        key = self._meta_key(upload_id)
+        raw = client.get(key)
+        if not raw:
+            return
+        meta = json.loads(raw)
+        meta.update(fields)
+        client.set(key, json.dumps(meta), keepttl=True)
+
     # ── Status ───────────────────────────────────────────────────
 
     def get_status(self, upload_id: str) -> Optional[dict]:
@@ -184,12 +285,22 @@ class UploadState:
             "message": "Uploading to storage…",
         })
 
-    def update_processing_progress(self, upload_id: str, progress: float, message: str = ""):
-        self._update_status(upload_id, {
+    def update_processing_progress(
+        self,
+        upload_id: str,
+        progress: float,
+        message: str = "",
+        transfer: Optional[dict] = None,
+    ):
+        fields = {
             "status": UploadStatus.PROCESSING,
             "progress": round(progress, 1),
             "message": message or f"Processing {round(progress, 1)}%",
-        })
+        }
+        if transfer is not None:
+            # Live Telegram pipeline stats: concurrency window, throughput, …
+            fields["transfer"] = transfer
+        self._update_status(upload_id, fields)
 
     def set_completed(self, upload_id: str, file_record: dict):
         self._update_status(upload_id, {
@@ -205,6 +316,64 @@ class UploadState:
             "message": error,
         })
 
+    # ── Telegram transfer (resumable) ────────────────────────────
+
+    def get_telegram_upload(self, upload_id: str, total_parts: int) -> dict:
+        """
+        Return the Telegram transfer state for this upload, creating it on the
+        first attempt.  The random file_id is what ties parts sent in different
+        attempts together, so it is only ever generated once (SET NX).
+        """
+        client = redis_service.get_client()
+        key = self._telegram_key(upload_id)
+        state = {
+            "file_id": int.from_bytes(os.urandom(8), "big", signed=True),
+            "total_parts": total_parts,
+            "message_id": None,
+        }
+        client.set(key, json.dumps(state), nx=True, ex=TTL_SECONDS)
+
+        current = json.loads(client.get(key))
+        if current["total_parts"] != total_parts:
+            # Part layout changed — earlier parts are useless, start over
+            client.delete(self._parts_key(upload_id))
+            client.set(key, json.dumps(state), ex=TTL_SECONDS)
+            return state
+        return current
+
+    def set_telegram_message(self, upload_id: str, message_id: int):
+        """Remember that send_file succeeded so a retry only re-saves the record."""
+        client = redis_service.get_client()
+        key = self._telegram_key(upload_id)
+        raw = client.get(key)
+        if not raw:
+            return
+        state = json.loads(raw)
+        state["message_id"] = message_id
+        client.set(key, json.dumps(state), ex=TTL_SECONDS)
+
+    def mark_parts_uploaded(self, upload_id: str, indices: Iterable[int]):
+        """Set the acknowledged parts in the bitmap — one pipelined round-trip."""
+        client = redis_service.get_client()
+        key = self._parts_key(upload_id)
+        pipe = client.pipeline(transaction=False)
+        for index in indices:
+            pipe.setbit(key, index, 1)
+        pipe.expire(key, TTL_SECONDS)
+        pipe.execute()
+
+    def get_uploaded_parts(self, upload_id: str) -> set[int]:
+        client = redis_service.get_client()
+        # The pool decodes responses; a bitmap is raw bytes
+        raw = client.execute_command("GET", self._parts_key(upload_id), **{NEVER_DECODE: []})
+        if not raw:
+            return set()
+        return {
+            (byte_index << 3) + bit
+            for byte_index, byte in enumerate(raw) if byte
+            for bit in range(8) if byte & (0x80 >> bit)
+        }
+
     # ── Lock (idempotent complete) ───────────────────────────────
 
     def acquire_complete_lock(self, upload_id: str) -> bool:
@@ -212,15 +381,22 @@ class UploadState:
         client = redis_service.get_client()
         return bool(client.set(self._lock_key(upload_id), "1", nx=True, ex=TTL_SECONDS))
 
+    def release_complete_lock(self, upload_id: str):
+        """Allow /complete to be called again, e.g. to resume a failed transfer."""
+        redis_service.delete_key(self._lock_key(upload_id))
+
     # ── Cleanup ──────────────────────────────────────────────────
 
     def cleanup(self, upload_id: str):
-        """Remove meta + chunks keys (status is kept for polling)."""
+        """Remove meta, chunk and transfer keys (status is kept for polling)."""
         client = redis_service.get_client()
         client.delete(
             self._meta_key(upload_id),
             self._chunks_key(upload_id),
+            self._chunk_info_key(upload_id),
             self._lock_key(upload_id),
+            self._telegram_key(upload_id),
+            self._parts_key(upload_id),
         )
 
 
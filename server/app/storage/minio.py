@@ -4,6 +4,8 @@ from minio import Minio
 from minio.deleteobjects import DeleteObject
 from minio.error import S3Error
 import asyncio
+from datetime import timedelta
+from urllib.parse import urlparse
 import urllib3
 
 from app.logger import logger
@@ -38,17 +40,38 @@ class MinioStorage:
             http_client=_http_client,   # shared pool — no more "pool is full" warnings
         )
         self.bucket = settings.minio_bucket
+        self.presign_client = self._create_presign_client()
+
+    @staticmethod
+    def _create_presign_client() -> Minio:
+        """
+        Client used only to sign URLs handed to browsers.  The signature covers
+        the host, so it must be built with the endpoint clients will reach.
+        Presigning is a local computation — this client never opens a connection.
+        """
+        endpoint, secure = settings.minio_endpoint, False
+        if settings.minio_public_endpoint:
+            parsed = urlparse(settings.minio_public_endpoint)
+            endpoint = parsed.netloc or parsed.path
+            secure = parsed.scheme == "https"
+        return Minio(
+            endpoint,
+            settings.minio_access_key,
+            settings.minio_secret_key,
+            secure=secure,
+            region=settings.minio_region,
+        )
 
     @staticmethod
     def _chunk_key(upload_id: str, chunk_index: int) -> str:
         return f"{upload_id}/chunk_{chunk_index}"
 
-    async def save_chunk(self, upload_id: str, chunk_index: int, file_obj, size: int):
-        """Upload a chunk to MinIO using the dedicated thread pool."""
+    async def save_chunk(self, upload_id: str, chunk_index: int, file_obj, size: int) -> str:
+        """Upload a chunk to MinIO using the dedicated thread pool. Returns the object ETag."""
         key = self._chunk_key(upload_id, chunk_index)
         loop = asyncio.get_running_loop()
 
-        await loop.run_in_executor(
+        result = await loop.run_in_executor(
             _minio_executor,
             lambda: self.client.put_object(
                 self.bucket,
@@ -57,6 +80,33 @@ class MinioStorage:
                 length=size,
             )
         )
+        return result.etag
+
+    def presign_chunk_urls(self, upload_id: str, total_chunks: int) -> list[str]:
+        """Presigned PUT URL for every chunk key, in chunk order."""
+        expires = timedelta(seconds=settings.minio_presign_expiry)
+        return [
+            self.presign_client.presigned_put_object(
+                self.bucket, self._chunk_key(upload_id, i), expires=expires
+            )
+            for i in range(total_chunks)
+        ]
+
+    async def stat_chunk(self, upload_id: str, chunk_index: int) -> dict | None:
+        """``{"size": ..., "etag": ...}`` of a stored chunk, or None if it is missing."""
+        key = self._chunk_key(upload_id, chunk_index)
+        loop = asyncio.get_running_loop()
+
+        try:
+            stat = await loop.run_in_executor(
+                _minio_executor,
+                lambda: self.client.stat_object(self.bucket, key)
+            )
+        except S3Error as e:
+            if e.code == "NoSuchKey":
+                return None
+            raise
+        return {"size": stat.size, "etag": (stat.etag or "").strip('"')}
 
     async def chunk_exists(self, upload_id: str, chunk_index: int) -> bool:
         """
@@ -78,6 +128,24 @@ class MinioStorage:
             logger.error(f"❌ Unexpected S3 error for {key}: {e}")
             raise
 
+    async def list_chunks(self, upload_id: str) -> dict[int, dict]:
+        """
+        List every stored chunk of an upload with a single LIST request.
+        Returns ``{chunk_index: {"size": ..., "etag": ...}}``.
+        """
+        prefix = f"{upload_id}/chunk_"
+        loop = asyncio.get_running_loop()
+
+        def _list():
+            chunks = {}
+            for obj in self.client.list_objects(self.bucket, prefix=prefix):
+                suffix = obj.object_name[len(prefix):]
+                if suffix.isdigit():
+                    chunks[int(suffix)] = {"size": obj.size, "etag": (obj.etag or "").strip('"')}
+            return chunks
+
+        return await loop.run_in_executor(_minio_executor, _list)
+
     async def chunks_exist_batch(self, upload_id: str, indices: list[int]) -> list[bool]:
         """
         Check multiple chunk indices concurrently.  Returns a bool list in the
@@ -131,6 +199,33 @@ class MinioStorage:
 
         return await loop.run_in_executor(_minio_executor, _read)
 
+    async def read_chunk_range_into(self, upload_id: str, chunk_index: int, offset: int, view: memoryview):
+        """
+        Fill *view* with ``len(view)`` bytes of a chunk starting at *offset*.
+        Reads straight into the caller's buffer, so no intermediate copies are made.
+        """
+        key = self._chunk_key(upload_id, chunk_index)
+        length = len(view)
+        loop = asyncio.get_running_loop()
+
+        def _read():
+            resp = self.client.get_object(self.bucket, key, offset=offset, length=length)
+            try:
+                filled = 0
+                while filled < length:
+                    n = resp.readinto(view[filled:])
+                    if not n:
+                        break
+                    filled += n
+            finally:
+                resp.close()
+                resp.release_conn()
+
+            if filled != length:
+                raise IOError(f"Short read on {key}: expected {length} bytes at {offset}, got {filled}")
+
+        await loop.run_in_executor(_minio_executor, _read)
+
     async def get_chunk_stream(self, upload_id, chunk_index):
         key = self._chunk_key(upload_id, chunk_index)
         loop = asyncio.get_running_loop()
@@ -140,6 +235,14 @@ class MinioStorage:
         )
         return response
 
+    async def delete_chunk(self, upload_id: str, chunk_index: int):
+        key = self._chunk_key(upload_id, chunk_index)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            _minio_executor,
+            lambda: self.client.remove_object(self.bucket, key)
+        )
+
     async def delete_upload(self, upload_id: str):
         prefix = f"{upload_id}/"
         loop = asyncio.get_running_loop()
@@ -0,0 +1,45 @@
+"""
+Dedicated background worker.
+
+Runs the MinIO → Telegram transfers queued by the API so they never compete
+with request handling.  Scale by starting more of these:
+
+    python -m app.worker
+"""
+
+import asyncio
+import signal
+
+from app.config import settings
+from app.db.db import check_db
+from app.logger import logger
+from app.services.jobs.worker import JobWorker
+from app.services.telegram.client_lifecycle import client_lifecycle
+from app.services.telegram.client_manager import telegram_client_manager
+
+
+async def main():
+    await check_db()
+
+    worker = JobWorker()
+    runner = asyncio.create_task(worker.run())
+    # Without a gateway the job workers pre-warm, one of them per deployment
+    client_lifecycle.start(prewarm=True)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await stop.wait()
+    logger.info("Stopping worker - waiting for running jobs...")
+    runner.cancel()
+    await asyncio.gather(runner, return_exceptions=True)
+    await worker.stop(grace=settings.job_shutdown_grace)
+    await client_lifecycle.stop()
+    await telegram_client_manager.clean_up_all_local_cache()
+    logger.info("Worker stopped")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
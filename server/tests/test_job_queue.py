@@ -0,0 +1,146 @@
+import asyncio
+import time
+
+import pytest
+
+from app.config import settings
+from app.services.jobs.backends import InMemoryBackend
+from app.services.jobs.queue import JobQueue, JobType
+from app.services.jobs.worker import JobWorker
+
+USER_ID = 7
+
+
+@pytest.fixture(autouse=True)
+def fast_jobs(monkeypatch):
+    monkeypatch.setattr(settings, "job_max_attempts", 3)
+    monkeypatch.setattr(settings, "job_retry_base_delay", 5.0)
+    monkeypatch.setattr(settings, "job_retry_max_delay", 300.0)
+    monkeypatch.setattr(settings, "job_visibility_timeout", 120)
+
+
+def _worker(backend, handler):
+    return JobWorker(backend=backend, handlers={JobType.CHUNKED_UPLOAD: handler}, concurrency=1)
+
+
+async def _submit_and_read(backend, consumer="worker-a"):
+    job_id = await JobQueue(backend).submit(JobType.CHUNKED_UPLOAD, USER_ID, upload_id="u1")
+    [(msg_id, job)] = await backend.read(consumer, 1, block_ms=10)
+    assert job["id"] == job_id
+    return msg_id, job
+
+
+async def _run_once(worker, msg_id, job):
+    # _execute releases a concurrency slot when it finishes
+    await worker._slots.acquire()
+    await worker._execute(msg_id, job)
+
+
+def test_submit_claim_ack():
+    async def scenario():
+        backend = InMemoryBackend()
+        seen = []
+
+        async def handler(job, final_attempt):
+            seen.append((job["args"], final_attempt))
+
+        msg_id, job = await _submit_and_read(backend)
+        assert job["type"] == JobType.CHUNKED_UPLOAD and job["user_id"] == USER_ID
+
+        await _run_once(_worker(backend, handler), msg_id, job)
+
+        assert seen == [({"upload_id": "u1"}, False)]
+        assert backend._pending == {} and backend._messages == {}
+        assert backend._active == {}
+        assert await backend.read("worker-a", 1, block_ms=10) == []
+
+    asyncio.run(scenario())
+
+
+def test_failed_job_is_retried_with_backoff():
+    async def scenario():
+        backend = InMemoryBackend()
+
+        async def handler(job, final_attempt):
+            raise RuntimeError("telegram unavailable")
+
+        worker = _worker(backend, handler)
+        msg_id, job = await _submit_and_read(backend)
+
+        start = time.time()
+        await _run_once(worker, msg_id, job)
+
+        # Acked and parked in the delayed set, not re-delivered straight away
+        assert backend._pending == {} and backend._ready == []
+        [(due, _, retry)] = backend._delayed
+        assert retry["id"] == job["id"] and retry["attempt"] == 1
+        first_delay = due - start
+        assert first_delay == pytest.approx(settings.job_retry_base_delay, abs=1)
+        assert await backend.promote_due() == 0
+
+        # Second failure doubles the delay
+        backend._delayed.clear()
+        await backend.enqueue(retry)
+        [(msg_id, job)] = await backend.read("worker-a", 1, block_ms=10)
+        await _run_once(worker, msg_id, job)
+        [(due, _, retry)] = backend._delayed
+        assert retry["attempt"] == 2
+        assert due - time.time() == pytest.approx(settings.job_retry_base_delay * 2, abs=1)
+
+    asyncio.run(scenario())
+
+
+def test_job_is_dead_lettered_after_max_attempts():
+    async def scenario():
+        backend = InMemoryBackend()
+        flags = []
+
+        async def handler(job, final_attempt):
+            flags.append(final_attempt)
+            raise RuntimeError("still failing")
+
+        worker = _worker(backend, handler)
+        msg_id, job = await _submit_and_read(backend)
+
+        for _ in range(settings.job_max_attempts):
+            await _run_once(worker, msg_id, job)
+            if not backend._delayed:
+                break
+            # Skip the backoff wait
+            _, _, job = backend._delayed.pop()
+            await backend.enqueue(job)
+            [(msg_id, job)] = await backend.read("worker-a", 1, block_ms=10)
+
+        assert flags == [False, False, True]
+        [dead] = backend.dead
+        assert dead["id"] == job["id"] and dead["error"] == "still failing"
+        assert backend._pending == {} and backend._delayed == []
+        assert backend._active == {}
+
+    asyncio.run(scenario())
+
+
+def test_unacked_job_is_reclaimed_after_missed_heartbeat():
+    async def scenario():
+        backend = InMemoryBackend()
+        visibility_ms = 50
+
+        msg_id, job = await _submit_and_read(backend, consumer="worker-a")
+
+        # Still within the lease, or kept alive by a heartbeat — nobody else may take it
+        assert await backend.claim_stale("worker-b", visibility_ms, 1) == []
+        await asyncio.sleep(0.03)
+        await backend.touch(msg_id, "worker-a", job, lease_seconds=1)
+        await asyncio.sleep(0.03)
+        assert await backend.claim_stale("worker-b", visibility_ms, 1) == []
+
+        # worker-a stops heartbeating; once idle past the visibility timeout it is re-delivered
+        await asyncio.sleep(visibility_ms / 1000 + 0.02)
+        [(claimed_id, claimed)] = await backend.claim_stale("worker-b", visibility_ms, 1)
+        assert claimed_id == msg_id and claimed["id"] == job["id"]
+        assert backend._pending[msg_id][0] == "worker-b"
+
+        await backend.ack(claimed_id)
+        assert backend._pending == {}
+
+    asyncio.run(scenario())